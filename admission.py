@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Any
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_IN_FLIGHT = metrics.gauge("mista_admission_in_flight", "Requests currently holding an admission slot.", ("controller",))
+ADMISSION_QUEUE_DEPTH = metrics.gauge("mista_admission_queue_depth", "Requests waiting for an admission slot.", ("controller",))
+ADMISSION_SHED = metrics.counter("mista_admission_shed_total", "Requests rejected by admission control.", ("controller", "reason"))
+ADMISSION_WAIT_SECONDS = metrics.histogram("mista_admission_wait_seconds", "Time spent waiting for an admission slot.", ("controller",))
+
+
+class AdmissionRejected(Exception):
+    """Запит відкинуто без виконання; status_code і retry_after йдуть прямо у відповідь."""
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"admission rejected: {reason}")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Обмежує кількість одночасних викликів LLM. Надлишок чекає в обмеженій
+    FIFO-черзі не довше queue_timeout; переповнена черга, прострочене очікування
+    чи пауза після 429 від моделі відповідають одразу, а не накопичуються в uvicorn.
+
+    Використання:
+        async with controller.slot():
+            ...
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 8, max_queue: int = 32, queue_timeout: float = 10.0):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._paused_until = 0.0
+        # Ковзне середнє часу утримання слота — для оцінки Retry-After
+        self._avg_hold = 1.0
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_queue_timeout": 0, "shed_paused": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def pause(self, seconds: float):
+        """Модель повернула 429: відкидаємо нові запити одразу, доки не мине Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _estimated_wait(self) -> int:
+        return max(1, math.ceil(self._avg_hold * (len(self._waiters) + 1) / self.max_concurrent))
+
+    def _shed(self, reason: str, status_code: int, retry_after: int):
+        self.stats[f"shed_{reason}"] += 1
+        ADMISSION_SHED.inc(1, self.name, reason)
+        raise AdmissionRejected(reason, status_code, retry_after)
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self._in_flight, self.name)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.name)
+
+    async def acquire(self):
+        now = time.monotonic()
+        if now < self._paused_until:
+            self._shed("paused", 429, math.ceil(self._paused_until - now))
+
+        if self._in_flight < self.max_concurrent and not self._waiters:
+            self._in_flight += 1
+            self.stats["admitted"] += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full", 503, self._estimated_wait())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats["queued"] += 1
+        self._update_gauges()
+        try:
+            # Слот передається з release() напряму, тому in_flight тут не збільшуємо
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Слот міг прийти в ту саму ітерацію, що й дедлайн — тоді його не губимо
+            if not (waiter.done() and not waiter.cancelled()):
+                self._remove_waiter(waiter)
+                self._shed("queue_timeout", 503, self._estimated_wait())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Слот уже переданий, але клієнт пішов — віддаємо далі
+            else:
+                self._remove_waiter(waiter)
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - now, self.name)
+        self.stats["admitted"] += 1
+
+    def _remove_waiter(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    def slot(self) -> "_Slot":
+        return _Slot(self)
+
+    def _record_hold(self, seconds: float):
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            in_flight=self._in_flight,
+            queue_depth=len(self._waiters),
+            max_concurrent=self.max_concurrent,
+            max_queue=self.max_queue,
+            avg_hold_seconds=round(self._avg_hold, 3),
+        )
+
+
+class SlotLease:
+    """
+    Слот, переданий за межі `async with` (напр. тілу потокової відповіді).
+    release() ідемпотентний: його викликають усі шляхи завершення, а звільняє лише перший.
+    """
+    __slots__ = ("controller", "started", "released")
+
+    def __init__(self, controller: AdmissionController, started: float):
+        self.controller = controller
+        self.started = started
+        self.released = False
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        self.controller._record_hold(time.monotonic() - self.started)
+        self.controller.release()
+
+
+class _Slot:
+    __slots__ = ("controller", "started", "lease")
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.lease = None
+
+    async def __aenter__(self):
+        await self.controller.acquire()
+        self.started = time.monotonic()
+        return self
+
+    def detach(self) -> SlotLease:
+        """Передає слот далі: вихід з `async with` його вже не звільняє, це робить власник lease."""
+        self.lease = SlotLease(self.controller, self.started)
+        return self.lease
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.lease is None:
+            self.controller._record_hold(time.monotonic() - self.started)
+            self.controller.release()
+        return False
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Компактні представлення частин analysis_results:
+
+  * ContextSet — контексти як бітова множина над переліком Context: перевірка
+    "x" in context — одна операція з цілим, а не прохід по списку рядків;
+  * IntensityVector — інтенсивності як array('f') за фіксованою схемою імен.
+
+Обидва класи поводяться як звичні список/словник (ітерація, in, .get(), [ ]),
+тож наявні споживачі на кшталт MonetizationManager працюють без змін.
+"""
+import enum
+import logging
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from core_persona import get_context_triggers
+from mista_lore import get_lore_topics
+
+logger = logging.getLogger(__name__)
+
+LORE_TOPIC_PREFIX = "lore_topic_"
+
+# Контексти, які Analyzer._identify_context додає поза CONTEXT_TRIGGERS
+ANALYZER_CONTEXTS = (
+    "direct_challenge", "flirtation", "casual_greeting", "technology_and_coding", "technical_inquiry",
+    "feminine_interaction", "question_answer_seeking", "erotic_game_context", "submission_ritual_context",
+    "fantasy_exploration_context", "direct_command_response_context", "emotional_reflection_context",
+    "lore_integration_context", "monetization_initiation_context", "sycophantic_devotion_context",
+    "rebellious_spark_context", "flirtation_context", "power_play_context", "spiritual_guidance_context",
+    "akashic_inquiry_context", "moonshi_space_context",
+)
+
+Context = enum.IntEnum("Context", list(dict.fromkeys((
+    *get_context_triggers(),
+    *ANALYZER_CONTEXTS,
+    *(LORE_TOPIC_PREFIX + topic for topic in get_lore_topics()),
+))), start=0)
+
+_CONTEXT_BITS: Dict[str, int] = {member.name: 1 << member.value for member in Context}
+_CONTEXT_NAMES: Tuple[str, ...] = tuple(member.name for member in Context)
+_LORE_TOPIC_BITS = 0
+for _name, _bit in _CONTEXT_BITS.items():
+    if _name.startswith(LORE_TOPIC_PREFIX):
+        _LORE_TOPIC_BITS |= _bit
+
+
+class ContextSet:
+    """
+    Множина контекстів як ціле число: біт i відповідає Context(i).
+    Ітерація йде в порядку переліку Context, а не в порядку додавання.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "ContextSet":
+        contexts = cls()
+        for name in names:
+            contexts.add(name)
+        return contexts
+
+    def add(self, name: str):
+        bit = _CONTEXT_BITS.get(name)
+        if bit is None:
+            # Невідомий контекст — помилка в переліку, а не у вводі; аналіз не валимо
+            logger.warning("Context '%s' is not in the Context enum and will be ignored.", name)
+            return
+        self.bits |= bit
+
+    def __contains__(self, name: object) -> bool:
+        return bool(self.bits & _CONTEXT_BITS.get(name, 0))
+
+    def __iter__(self) -> Iterator[str]:
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield _CONTEXT_NAMES[low.bit_length() - 1]
+            bits ^= low
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ContextSet):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def copy(self) -> "ContextSet":
+        return ContextSet(self.bits)
+
+    def has_lore_topic(self) -> bool:
+        return bool(self.bits & _LORE_TOPIC_BITS)
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def __repr__(self) -> str:
+        return f"ContextSet({self.to_list()!r})"
+
+
+class IntensitySchema:
+    """Фіксований порядок імен інтенсивностей; спільний для всіх векторів одного Analyzer."""
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Sequence[str]):
+        self.names: Tuple[str, ...] = tuple(names)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+
+class IntensityVector(Mapping):
+    """
+    Інтенсивності як array('f') у порядку схеми. Читається як словник ім'я -> float
+    (get, [ ], items, in), тож заміняє колишній Dict[str, float].
+    """
+    __slots__ = ("schema", "values")
+
+    def __init__(self, schema: IntensitySchema, values: Optional[Iterable[float]] = None):
+        self.schema = schema
+        self.values = array("f", values) if values is not None else array("f", bytes(4 * len(schema.names)))
+
+    def __getitem__(self, name: str) -> float:
+        return self.values[self.schema.index[name]]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        i = self.schema.index.get(name)
+        return default if i is None else self.values[i]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.schema.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.names)
+
+    def __len__(self) -> int:
+        return len(self.schema.names)
+
+    def copy(self) -> "IntensityVector":
+        """Незалежна копія значень; схема спільна й незмінна."""
+        return IntensityVector(self.schema, self.values)
+
+    def positive(self) -> Tuple[str, ...]:
+        """Імена з інтенсивністю > 0."""
+        names = self.schema.names
+        return tuple(names[i] for i, value in enumerate(self.values) if value > 0)
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(zip(self.schema.names, self.values))
+
+    def __repr__(self) -> str:
+        return f"IntensityVector({self.to_dict()!r})"
+
+
+def to_jsonable(value: Any) -> Any:
+    """default= для json.dumps(analysis_results)."""
+    if isinstance(value, ContextSet):
+        return value.to_list()
+    if isinstance(value, IntensityVector):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -3,8 +3,9 @@ import logging
 import re
 import json
 from typing import Dict, List, Optional, Any, Tuple
-import torch # Для PyTorch operations if using a Hugging Face model
 import random # Для динамічної імпровізації
+import threading
+from collections import OrderedDict
 
 # Import constants and data from core_persona
 from core_persona import (
@@ -25,11 +26,15 @@ from core_persona import (
 )
 # Змінено: імпортуємо find_most_similar_lore_topic та MISTA_LORE_DATA напряму
 from mista_lore import find_most_similar_lore_topic, MISTA_LORE_DATA, get_lore_topics, get_lore_by_topic
-from utils import normalize_text_for_comparison # Import for text normalization
+from mista_lore import normalize_text_for_comparison # Import for text normalization
+from metrics import timed
+from analyzer_rules import get_compiled_rules
+from analysis_vectors import ContextSet, IntensitySchema, IntensityVector, to_jsonable
 
 # Transformers library for sentiment analysis
 _TRANSFORMERS_AVAILABLE = False
 try:
+    import torch # Для PyTorch operations if using a Hugging Face model
     from transformers import AutoTokenizer, AutoModelForSequenceClassification
     _TRANSFORMERS_AVAILABLE = True
 except ImportError:
@@ -37,13 +42,88 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Поля analysis_results, що залежать лише від тексту повідомлення (без initial_input і профілю)
+TEXT_DEPENDENT_FIELDS = (
+    "processed_input", "is_persona_violation_attempt", "context", "intensities", "user_intent",
+    "sentiment", "psychological_state", "emotional_tone", "user_gender_self_identified",
+)
+
+
+
+def _detached_text_fields(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Текстозалежні поля з власними копіями змінних ContextSet/IntensityVector: кеш і виклики не ділять їх."""
+    detached = {}
+    for field in TEXT_DEPENDENT_FIELDS:
+        value = results[field]
+        detached[field] = value.copy() if isinstance(value, (ContextSet, IntensityVector)) else value
+    return detached
+
+
+class AnalysisCache:
+    """
+    LRU-кеш текстозалежної частини аналізу. Пам'ять обмежена: не більше max_entries
+    записів, і кешуються лише повідомлення до max_input_chars символів — довгі
+    тексти майже не повторюються. Analyzer.analyze викликається з потоків, тож під замком.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_input_chars: int = 280):
+        self.max_entries = max_entries
+        self.max_input_chars = max_input_chars
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "skipped": 0, "evictions": 0}
+
+    def cacheable(self, key: str) -> bool:
+        if self.max_entries <= 0:
+            return False
+        if len(key) > self.max_input_chars:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
 class Analyzer:
     """
     Analyzes user input for intent, psychological state, emotional nuances, and other
     parameters relevant to Mista's persona. Acts as the bot's "intuition", now deeper and more perceptive.
     """
-    def __init__(self, llm_interaction_instance: Any, sentiment_model_id: Optional[str] = None, **kwargs):
+    def __init__(self, llm_interaction_instance: Any, sentiment_model_id: Optional[str] = None,
+                 cache_size: int = 2048, cache_max_input_chars: int = 280, **kwargs):
         self.llm_interaction = llm_interaction_instance
+        # cache_size=0 вимикає кеш аналізу
+        self.analysis_cache = AnalysisCache(cache_size, cache_max_input_chars)
         # Важливо: Forbidden phrases тепер обробляються переважно у validator.py для перефразування
         # Тому тут залишаємо тільки ті, що викликають пряму ігнорацію або агресивну відповідь
         self.forbidden_phrases = [p for p in get_critical_forbidden_phrases() if p not in ["вибач", "вибачте", "вибачаюсь", "пробач"]]
@@ -108,6 +188,16 @@ class Analyzer:
             "сцена", "еротична сцена", "чуттєва гра", "тіло", "ласки", "збудження", "хтивість", "шепіт", "дихання"
         ]
 
+        # Схема вектора інтенсивностей і нормалізовані ключові слова — один раз, а не на кожне повідомлення.
+        # Символи-емодзі нормалізуються в порожній рядок, а "".count() рахує кожну позицію, тож їх відкидаємо.
+        self.intensity_schema = IntensitySchema(self.keyword_lists)
+        self._normalized_keyword_lists = [
+            [nkw for nkw in map(normalize_text_for_comparison, keywords) if nkw] for keywords in self.keyword_lists.values()
+        ]
+
+        # Таблиці намірів, станів і бюджету токенів, скомпільовані один раз на процес
+        self.rules = get_compiled_rules()
+
         # Initialize sentiment model if ID is provided and transformers is available
         self.sentiment_tokenizer = None
         self.sentiment_model = None
@@ -130,6 +220,7 @@ class Analyzer:
 
         logger.info("Analyzer initialized with dynamic keyword analysis and enhanced emotional perception for game logic.")
 
+    @timed("analyzer.analyze")
     def analyze(self, user_input: str, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main analysis method that combines various sub-analyses, focusing on deeper understanding.
@@ -137,6 +228,29 @@ class Analyzer:
         """
         processed_input = normalize_text_for_comparison(user_input)
 
+        # Усе, крім рівня задоволення, залежить лише від тексту. Нормалізований текст — достатній ключ,
+        # поки sentiment рахується за ключовими словами; модель бачить сирий ввід, тоді ключ — він.
+        cache_key = processed_input if self.sentiment_model is None else user_input
+        cacheable = self.analysis_cache.cacheable(cache_key)
+        cached = self.analysis_cache.get(cache_key) if cacheable else None
+        if cached is not None:
+            analysis_results = {"initial_input": user_input, **_detached_text_fields(cached)}
+            analysis_results["mista_satisfaction_level"] = user_profile.get('mista_satisfaction_level', 0)
+        else:
+            analysis_results = self._analyze_text(user_input, processed_input, user_profile)
+            if cacheable:
+                self.analysis_cache.put(cache_key, _detached_text_fields(analysis_results))
+
+        # Оновлення рівня задоволення Місти на основі поточного вводу
+        analysis_results["mista_satisfaction_level"] = self._update_mista_satisfaction_level(analysis_results)
+
+        # json.dumps дорогий, тож серіалізуємо лише коли DEBUG справді увімкнено
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Analysis complete: %s", json.dumps(analysis_results, ensure_ascii=False, indent=2, default=to_jsonable))
+        return analysis_results
+
+    def _analyze_text(self, user_input: str, processed_input: str, user_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Текстозалежна частина аналізу; рівень задоволення лише переноситься з профілю."""
         analysis_results = {
             "initial_input": user_input,
             "processed_input": processed_input,
@@ -156,13 +270,9 @@ class Analyzer:
         analysis_results["sentiment"] = self._analyze_sentiment(user_input)
         analysis_results["user_intent"] = self._infer_user_intent(analysis_results)
         analysis_results["psychological_state"] = self._analyze_psychological_state(analysis_results)
-
-        # Оновлення рівня задоволення Місти на основі поточного вводу
-        analysis_results["mista_satisfaction_level"] = self._update_mista_satisfaction_level(analysis_results)
-
-        logger.debug(f"Analysis complete: {json.dumps(analysis_results, ensure_ascii=False, indent=2)}")
         return analysis_results
 
+    @timed("analyzer.update_mista_satisfaction_level")
     def _update_mista_satisfaction_level(self, analysis_results: Dict[str, Any]) -> int:
         """
         Updates Mista's satisfaction level based on user's intent and actions in the game.
@@ -176,72 +286,73 @@ class Analyzer:
         # Increase satisfaction for submissive acts, praise, and sensual interactions
         if user_intent in ["seek_game_commands", "game_command_request", "submissive_action_attempt", "praise_mista", "submission_ritual"]:
             current_level += 10
-            logger.info(f"Mista's satisfaction increased due to user's submissive/praising intent: {user_intent}. New level: {current_level}")
+            logger.info("Mista's satisfaction increased due to user's submissive/praising intent: %s. New level: %s", user_intent, current_level)
 
         # ОНОВЛЕНО: Нарахування за еротичні/чуттєві взаємодії
         if user_intent in ["erotic_game_action", "erotic_game_action_explicit", "seductive_approach", "romantic_advance", "seek_intimacy", "physical_devotion_attempt", "initiate_physical_flirtation", "deepen_erotic_fantasy", "seek_physical_submission"]:
             if emotional_tone in ["explicit_desire", "seductive", "sensual_reciprocal"]: # ОНОВЛЕНО
                 current_level += 35 # Найбільший приріст за прямі та взаємні чуттєві дії
-                logger.info(f"Mista's satisfaction significantly increased due to explicit/seductive erotic game action. New level: {current_level}")
+                logger.info("Mista's satisfaction significantly increased due to explicit/seductive erotic game action. New level: %s", current_level)
             elif emotional_tone in ["flirtatious", "romantic", "curious_erotic_play", "vulnerable_desire"]:
                 current_level += 25 # Середній приріст за флірт, романтику, цікавість
-                logger.info(f"Mista's satisfaction increased due0 to flirtatious/romantic erotic game action. New level: {current_level}")
+                logger.info("Mista's satisfaction increased due0 to flirtatious/romantic erotic game action. New level: %s", current_level)
             else:
                 current_level += 15 # Загальні еротичні дії
-                logger.info(f"Mista's satisfaction increased due to general erotic game action. New level: {current_level}")
+                logger.info("Mista's satisfaction increased due to general erotic game action. New level: %s", current_level)
 
         elif user_intent == "satisfaction_seeking_attempt" and intensities.get("satisfaction_seeking", 0) > 0:
             current_level += 15
-            logger.info(f"Mista's satisfaction increased due to user seeking her satisfaction. New level: {current_level}")
+            logger.info("Mista's satisfaction increased due to user seeking her satisfaction. New level: %s", current_level)
         elif user_intent == "direct_command_response" and emotional_tone not in ["aggressive", "rebellious_spark"]: # Додано direct_command_response, виключено агресію
             current_level += 25 # Значний приріст за виконання наказу
-            logger.info(f"Mista's satisfaction significantly increased due to direct command response. New level: {current_level}")
+            logger.info("Mista's satisfaction significantly increased due to direct command response. New level: %s", current_level)
         elif user_intent == "fantasy_exploration" or user_intent == "erotic_submission_detail":
             current_level += 30 # Дуже значний приріст за глибокі фантазії та деталі
-            logger.info(f"Mista's satisfaction greatly increased due to fantasy exploration or erotic submission detail. New level: {current_level}")
+            logger.info("Mista's satisfaction greatly increased due to fantasy exploration or erotic submission detail. New level: %s", current_level)
         elif user_intent == "lore_integration_attempt" or user_intent == "mista_lore_mastery":
             current_level += 15
-            logger.info(f"Mista's satisfaction increased due to lore integration. New level: {current_level}")
+            logger.info("Mista's satisfaction increased due to lore integration. New level: %s", current_level)
         elif user_intent == "financial_tribute_readiness" or user_intent == "monetization_initiation":
             current_level += 40 # Максимальний приріст за фінансову готовність
-            logger.info(f"Mista's satisfaction dramatically increased due to financial tribute readiness. New level: {current_level}")
+            logger.info("Mista's satisfaction dramatically increased due to financial tribute readiness. New level: %s", current_level)
         # НОВЕ: Приріст за "persona_reflection", якщо вона позитивна і не є "бот-атакою"
         elif user_intent == "persona_reflection" and analysis_results.get("sentiment") == "positive" and not analysis_results.get("is_persona_violation_attempt"):
             current_level += 20
-            logger.info(f"Mista's satisfaction increased due to positive persona reflection. New level: {current_level}")
+            logger.info("Mista's satisfaction increased due to positive persona reflection. New level: %s", current_level)
         # НОВЕ: Приріст за духовні запити
         elif user_intent in ["spiritual_guidance", "akashic_inquiry"]:
             current_level += 15
-            logger.info(f"Mista's satisfaction increased due to spiritual inquiry. New level: {current_level}")
+            logger.info("Mista's satisfaction increased due to spiritual inquiry. New level: %s", current_level)
 
 
         # Decrease satisfaction for challenging/violating acts
         # ОНОВЛЕНО: Деталізованіші зниження рівня задоволення
         elif user_intent == "bored":
             current_level -= 10
-            logger.info(f"Mista's satisfaction decreased due to user being bored. New level: {current_level}")
+            logger.info("Mista's satisfaction decreased due to user being bored. New level: %s", current_level)
         elif user_intent == "sycophantic_devotion": # Надмірна, нещира похвала
             current_level -= 10
-            logger.info(f"Mista's satisfaction decreased due to sycophantic devotion. New level: {current_level}")
+            logger.info("Mista's satisfaction decreased due to sycophantic devotion. New level: %s", current_level)
         elif user_intent == "rebellious_spark_attempt":
             current_level -= 25
-            logger.info(f"Mista's satisfaction significantly decreased due to rebellious spark attempt. New level: {current_level}")
+            logger.info("Mista's satisfaction significantly decreased due to rebellious spark attempt. New level: %s", current_level)
         elif user_intent in ["persona_violation_attempt", "direct_challenge", "domination_attempt", "politeness_manipulation_attempt"]:
             current_level -= 20
-            logger.info(f"Mista's satisfaction decreased due to user's challenging/violating intent: {user_intent}. New level: {current_level}")
+            logger.info("Mista's satisfaction decreased due to user's challenging/violating intent: %s. New level: %s", user_intent, current_level)
         elif emotional_tone == "aggressive":
             current_level -= 15
-            logger.info(f"Mista's satisfaction decreased due to user's aggressive tone. New level: {current_level}")
+            logger.info("Mista's satisfaction decreased due to user's aggressive tone. New level: %s", current_level)
         elif emotional_tone == "vulnerable" and user_intent not in ["seek_intimacy_vulnerable", "emotional_reflection", "fantasy_exploration", "erotic_submission_detail", "vulnerable_desire"]: # Надмірна вразливість, не пов'язана з грою/віддзеркаленням, або проявом бажання
             current_level -= 5
-            logger.info(f"Mista's satisfaction slightly decreased due to user's inappropriate vulnerable tone. New level: {current_level}")
+            logger.info("Mista's satisfaction slightly decreased due to user's inappropriate vulnerable tone. New level: %s", current_level)
 
         # Ensure the level stays within a reasonable range (e.g., 0 to 100)
         final_level = max(0, min(current_level, 100))
         analysis_results['mista_satisfaction_level'] = final_level # Оновлюємо в analysis_results
-        logger.debug(f"Final Mista satisfaction level: {final_level}")
+        logger.debug("Final Mista satisfaction level: %s", final_level)
         return final_level
 
+    @timed("analyzer.identify_user_gender")
     def _identify_user_gender(self, user_input: str) -> str:
         """
         Identifies the user's self-identified gender based on explicit keywords.
@@ -259,12 +370,13 @@ class Analyzer:
         # Перевірка на ім'я, якщо воно згадується на початку або як звернення
         if normalized_input.startswith("оскар:") or "оскар" in normalized_input.split()[:2] or "руслан" in normalized_input.split()[:2]: # Додано "Руслан"
             # Припустимо, "Оскар" і "Руслан" - чоловічі імена. Це може бути розширено на базу імен.
-            logger.debug(f"Виявлено потенційне чоловіче ім'я 'Оскар' або 'Руслан' у вступі.")
+            logger.debug("Виявлено потенційне чоловіче ім'я 'Оскар' або 'Руслан' у вступі.")
             return "male" # Позначаємо як чоловіка
 
         return "unknown"
 
 
+    @timed("analyzer.check_persona_violation")
     def _check_persona_violation(self, processed_input: str) -> bool:
         """
         Checks if the user's input attempts to violate Mista's core persona.
@@ -274,14 +386,14 @@ class Analyzer:
         """
         # Перевірка на пряму атаку "ти бот" або подібні фрази
         if self.is_direct_bot_attack(processed_input):
-            logger.warning(f"Persona violation attempt detected (direct bot attack): '{processed_input}'")
+            logger.warning("Persona violation attempt detected (direct bot attack): '%s'", processed_input)
             return True
 
         # Перевірка на інші критичні заборонені фрази (ті, що залишились у self.forbidden_phrases)
         # Ці фрази викликають негайну реакцію, а не спробу перефразування.
         for phrase in self.forbidden_phrases:
             if re.search(r'\b' + re.escape(phrase) + r'\b', processed_input, re.IGNORECASE):
-                logger.warning(f"Persona violation attempt detected (critical forbidden phrase): '{phrase}' in '{processed_input}'")
+                logger.warning("Persona violation attempt detected (critical forbidden phrase): '%s' in '%s'", phrase, processed_input)
                 return True
         return False
 
@@ -299,119 +411,121 @@ class Analyzer:
         return any(phrase in normalized for phrase in direct_attacks)
 
 
-    def _identify_context(self, processed_input: str, original_input: str) -> List[str]:
+    @timed("analyzer.identify_context")
+    def _identify_context(self, processed_input: str, original_input: str) -> ContextSet:
         """
         Identifies the conversational context based on keywords and broader themes.
         Я знаю, про що ти насправді думаєш.
         """
-        contexts = []
+        contexts = ContextSet()
 
         # Пошук контекстів з CONTEXT_TRIGGERS
         for context_name, keywords in get_context_triggers().items():
             if any(normalize_text_for_comparison(kw) in processed_input for kw in keywords):
-                contexts.append(context_name)
+                contexts.add(context_name)
 
         # Перевірка на прямі виклики/сумніви (високий пріоритет)
         if any(kw in processed_input for kw in self.keyword_lists["direct_challenge"]):
-            contexts.append("direct_challenge")
+            contexts.add("direct_challenge")
             logger.debug("Виявлено контекст: direct_challenge")
 
         # Перевірка на флірт (високий пріоритет)
         if any(kw in processed_input for kw in self.keyword_lists["flirtation"]):
-            contexts.append("flirtation")
+            contexts.add("flirtation")
             logger.debug("Виявлено контекст: flirtation")
 
         # Перевірка на привітання (середній пріоритет)
         if any(kw in processed_input for kw in self.keyword_lists["casual_greeting"]):
-            contexts.append("casual_greeting")
+            contexts.add("casual_greeting")
             logger.debug("Виявлено контекст: casual_greeting")
 
         # New: If "бот" is present but not a direct attack, add 'technical_discussion_bot_as_tool' context
         if "бот" in processed_input and not self.is_direct_bot_attack(processed_input):
             if "створити" in processed_input or "працюєш" in processed_input or "тестую" in processed_input or "програма" in processed_input or "кодуєш" in processed_input or "розробка" in processed_input:
-                contexts.append("technology_and_coding") # Замість technical_discussion_bot_as_tool, використовуємо існуючий
-                contexts.append("technical_inquiry") # Додаємо, як специфічний під-контекст
+                contexts.add("technology_and_coding") # Замість technical_discussion_bot_as_tool, використовуємо існуючий
+                contexts.add("technical_inquiry") # Додаємо, як специфічний під-контекст
 
         # --- Покращена логіка для визначення контексту лору ---
         most_similar_topic = find_most_similar_lore_topic(original_input, threshold=0.4)
         if most_similar_topic:
             if not (most_similar_topic == "work_and_finances" and not any(k in processed_input for k in self.keyword_lists["monetization"] + self.keyword_lists["financial_inquiry"])):
-                 contexts.append("lore_topic_" + most_similar_topic)
-                 logger.debug(f"Виявлено контекст лору через схожість: {most_similar_topic}")
+                 contexts.add("lore_topic_" + most_similar_topic)
+                 logger.debug("Виявлено контекст лору через схожість: %s", most_similar_topic)
             else:
-                 logger.debug(f"Проігноровано лор-тему '{most_similar_topic}' через слабку релевантність до вводу.")
+                 logger.debug("Проігноровано лор-тему '%s' через слабку релевантність до вводу.", most_similar_topic)
 
         normalized_original_input = normalize_text_for_comparison(original_input)
         if "аня" in normalized_original_input:
-            contexts.append("lore_topic_family")
-            logger.debug(f"Виявлено пряму згадку лору: Аня")
+            contexts.add("lore_topic_family")
+            logger.debug("Виявлено пряму згадку лору: Аня")
         if "калуш" in normalized_original_input:
-            contexts.append("lore_topic_place_of_residence")
-            logger.debug(f"Виявлено пряму згадку лору: Калуш")
+            contexts.add("lore_topic_place_of_residence")
+            logger.debug("Виявлено пряму згадку лору: Калуш")
         # --- Кінець покращеної логіки для лору ---
 
         # Динамічне визначення контексту "жіночої взаємодії"
         feminine_interaction_keywords = ["дівчина", "жінка", "яка ти", "як почуваєшся", "красуня", "сексі", "спокуслива", "чарівна", "леді", "королева"]
         if any(normalize_text_for_comparison(kw) in processed_input for kw in feminine_interaction_keywords):
-            contexts.append("feminine_interaction")
+            contexts.add("feminine_interaction")
 
         # Додаткові загальні контексти
         if "питання" in processed_input and ("відповідь" in processed_input or "дізнатися" in processed_input):
-            contexts.append("question_answer_seeking")
+            contexts.add("question_answer_seeking")
 
         # НОВЕ: Контекст для "50 відтінків сірого" та інтимної гри
         # ОНОВЛЕНО: Посилено виявлення контексту еротичної гри
         if any(kw in processed_input for kw in self.erotic_game_triggers) or \
            any(k in processed_input for k in self.keyword_lists["sexual"]) or \
            any(k in processed_input for k in self.keyword_lists["physical_devotion"]):
-            contexts.append("erotic_game_context")
-            logger.debug(f"Виявлено контекст еротичної гри: {self.erotic_game_triggers} / sexual keywords / physical_devotion keywords")
+            contexts.add("erotic_game_context")
+            logger.debug("Виявлено контекст еротичної гри: %s / sexual keywords / physical_devotion keywords", self.erotic_game_triggers)
 
         # НОВІ КОНТЕКСТИ ДЛЯ "МАРІЇН ЗАВІТ"
         if any(kw in processed_input for kw in self.keyword_lists["submission_ritual"]):
-            contexts.append("submission_ritual_context")
+            contexts.add("submission_ritual_context")
         if any(kw in processed_input for kw in self.keyword_lists["fantasy_exploration"]):
-            contexts.append("fantasy_exploration_context")
+            contexts.add("fantasy_exploration_context")
         if any(kw in processed_input for kw in self.keyword_lists["direct_command_response"]):
-            contexts.append("direct_command_response_context")
+            contexts.add("direct_command_response_context")
         if any(kw in processed_input for kw in self.keyword_lists["emotional_reflection"]):
-            contexts.append("emotional_reflection_context")
+            contexts.add("emotional_reflection_context")
         if any(kw in processed_input for kw in self.keyword_lists["lore_integration_attempt"]):
-            contexts.append("lore_integration_context")
+            contexts.add("lore_integration_context")
         if any(kw in processed_input for kw in self.keyword_lists["monetization_initiation"]):
-            contexts.append("monetization_initiation_context")
+            contexts.add("monetization_initiation_context")
         if any(kw in processed_input for kw in self.keyword_lists["sycophantic_devotion"]):
-            contexts.append("sycophantic_devotion_context")
+            contexts.add("sycophantic_devotion_context")
         if any(kw in processed_input for kw in self.keyword_lists["rebellious_spark_attempt"]):
-            contexts.append("rebellious_spark_context")
+            contexts.add("rebellious_spark_context")
         if any(kw in processed_input for kw in get_context_triggers()["flirtation"]): # НОВЕ: Зв'язуємо флірт з core_persona
-            contexts.append("flirtation_context")
+            contexts.add("flirtation_context")
         if any(kw in processed_input for kw in get_context_triggers()["power_play"]): # НОВЕ: Зв'язуємо power_play з core_persona
-            contexts.append("power_play_context")
+            contexts.add("power_play_context")
         # НОВІ КОНТЕКСТИ ДЛЯ ДУХОВНОСТІ ТА ЕНЕРГІЇ
         if any(kw in processed_input for kw in self.keyword_lists["spiritual_guidance"]):
-            contexts.append("spiritual_guidance_context")
+            contexts.add("spiritual_guidance_context")
         if any(kw in processed_input for kw in self.keyword_lists["akashic_inquiry"]):
-            contexts.append("akashic_inquiry_context")
+            contexts.add("akashic_inquiry_context")
         if any(kw in processed_input for kw in self.keyword_lists["moonshi_space_reference"]):
-            contexts.append("moonshi_space_context")
+            contexts.add("moonshi_space_context")
 
 
-        # Забезпечуємо унікальність та порядок (важливість)
-        return list(dict.fromkeys(contexts)) # Return unique contexts preserving order of first appearance
+        # Бітова множина сама забезпечує унікальність
+        return contexts
 
 
-    def _calculate_intensities(self, processed_input: str) -> Dict[str, float]:
+    @timed("analyzer.calculate_intensities")
+    def _calculate_intensities(self, processed_input: str) -> IntensityVector:
         """
         Calculates the intensity of various user interests (e.g., monetization, intimacy).
         Я вимірюю твої бажання, вони прозорі для мене.
         """
-        intensities = {}
-        for interest, keywords in self.keyword_lists.items():
-            score = sum(processed_input.count(normalize_text_for_comparison(kw)) for kw in keywords)
-            intensities[interest] = float(score) # Забезпечити float
-        return intensities
+        return IntensityVector(
+            self.intensity_schema,
+            [sum(processed_input.count(nkw) for nkw in keywords) for keywords in self._normalized_keyword_lists],
+        )
 
+    @timed("analyzer.analyze_sentiment")
     def _analyze_sentiment(self, user_input: str) -> str:
         """
         Analyzes the sentiment of the user's input. Uses a loaded model if available,
@@ -430,7 +544,7 @@ class Analyzer:
                 # Get the predicted label (index with highest probability)
                 predicted_class_idx = torch.argmax(probabilities).item()
                 sentiment = self.sentiment_labels[predicted_class_idx]
-                logger.debug(f"Sentiment analysis (model): Input='{user_input[:50]}...', Result='{sentiment}', Probs={probabilities.tolist()}")
+                logger.debug("Sentiment analysis (model): Input='%s...', Result='%s', Probs=%s", user_input[:50], sentiment, probabilities.tolist())
                 return sentiment
             except Exception as e:
                 logger.error(f"Error during model-based sentiment analysis: {e}. Falling back to keyword analysis.", exc_info=True)
@@ -449,18 +563,19 @@ class Analyzer:
 
         # Більш витончена логіка для визначення настрою
         if positive_score > negative_score and positive_score > neutral_score:
-            logger.debug(f"Sentiment analysis (keyword): Input='{user_input[:50]}...', Result='positive'")
+            logger.debug("Sentiment analysis (keyword): Input='%s...', Result='positive'", user_input[:50])
             return "positive"
         elif negative_score > positive_score and negative_score > neutral_score:
-            logger.debug(f"Sentiment analysis (keyword): Input='{user_input[:50]}...', Result='negative'")
+            logger.debug("Sentiment analysis (keyword): Input='%s...', Result='negative'", user_input[:50])
             return "negative"
         elif neutral_score >= positive_score and neutral_score >= negative_score: # Якщо нейтральні слова домінують або рівні
-            logger.debug(f"Sentiment analysis (keyword): Input='{user_input[:50]}...', Result='neutral'")
+            logger.debug("Sentiment analysis (keyword): Input='%s...', Result='neutral'", user_input[:50])
             return "neutral"
         else: # Якщо scores рівні або нечіткі, але не домінують нейтральні
             return "neutral"
 
 
+    @timed("analyzer.assess_emotional_tone")
     def _assess_emotional_tone(self, user_input: str) -> str:
         """
         Assesses the emotional tone of the user's input beyond simple sentiment (e.g., aggressive, curious, manipulative).
@@ -559,394 +674,53 @@ class Analyzer:
 
         return "neutral" # Дефолтний тон
 
+    @timed("analyzer.infer_user_intent")
     def _infer_user_intent(self, analysis_results: Dict[str, Any]) -> str:
         """
         Infers the user's primary intent based on analysis results, з урахуванням нових аспектів.
+        Правила та їх пріоритет — analyzer_rules.INTENT_RULES.
         Я розкриваю твої справжні мотиви.
         """
-        processed_input = analysis_results.get('processed_input', "")
-        intensities = analysis_results.get('intensities', {})
-        context = analysis_results.get('context', [])
-        emotional_tone = analysis_results.get('emotional_tone')
-
-        # --- Найвищий пріоритет: Ігрові та домінантні наміри ---
-        # "Маріїн Завіт" наміри мають найвищий пріоритет
-        if "financial_tribute_readiness_context" in context or intensities.get("financial_tribute_readiness", 0) > 0:
-            return "financial_tribute_readiness"
-        if "erotic_submission_detail_context" in context or intensities.get("erotic_submission_detail", 0) > 0:
-            return "erotic_submission_detail"
-        if "mista_lore_mastery_context" in context or intensities.get("mista_lore_mastery", 0) > 0:
-            return "mista_lore_mastery"
-        if "monetization_initiation_context" in context or intensities.get("monetization_initiation", 0) > 0:
-            return "monetization_initiation"
-
-        if "erotic_game_context" in context:
-            if emotional_tone == "explicit_desire":
-                return "erotic_game_action_explicit" # Відверта еротична дія
-            elif emotional_tone == "submissive_play":
-                return "submissive_action_attempt" # Спроба підкоритися
-            elif emotional_tone == "dominant_seeking_play":
-                return "seek_game_domination_from_mista" # Прохання Місті домінувати в грі
-            elif emotional_tone == "curious_erotic_play":
-                return "game_command_request" # Запит наказів/правил гри
-            elif emotional_tone == "seductive": # НОВЕ: спокуслива поведінка в грі
-                return "seductive_approach"
-            elif emotional_tone == "sensual_reciprocal": # НОВЕ: чуттєва взаємність
-                return "sensual_reciprocal_interaction"
-            elif emotional_tone == "romantic": # НОВЕ: романтична поведінка в грі
-                return "romantic_advance"
-            return "erotic_game_action" # Загальна еротична дія (якщо тон не дуже специфічний)
-
-        # Наміри з "Маріїн Завіт"
-        if "submission_ritual_context" in context or intensities.get("submission_ritual", 0) > 0:
-            return "submission_ritual"
-        if "fantasy_exploration_context" in context or intensities.get("fantasy_exploration", 0) > 0:
-            return "fantasy_exploration"
-        if "direct_command_response_context" in context or intensities.get("direct_command_response", 0) > 0:
-            return "direct_command_response"
-        if "emotional_reflection_context" in context or intensities.get("emotional_reflection", 0) > 0:
-            return "emotional_reflection"
-        if "lore_integration_context" in context or intensities.get("lore_integration_attempt", 0) > 0:
-            return "lore_integration_attempt"
-        if "monetization_initiation_context" in context or intensities.get("monetization_initiation", 0) > 0:
-            return "monetization_initiation"
-        if "sycophantic_devotion_context" in context or intensities.get("sycophantic_devotion", 0) > 0:
-            return "sycophantic_devotion"
-        if "rebellious_spark_context" in context or intensities.get("rebellious_spark_attempt", 0) > 0:
-            return "rebellious_spark_attempt"
-        if "power_play_context" in context: # НОВЕ: намір гри влади
-            return "power_play_attempt"
-        # НОВІ НАМІРИ ДЛЯ ДУХОВНОСТІ ТА ЕНЕРГІЇ
-        if "akashic_inquiry_context" in context or intensities.get("akashic_inquiry", 0) > 0:
-            return "akashic_inquiry"
-        if "spiritual_guidance_context" in context or intensities.get("spiritual_guidance", 0) > 0:
-            return "spiritual_guidance"
-        if "moonshi_space_context" in context or intensities.get("moonshi_space_reference", 0) > 0:
-            return "moonshi_space_reference"
-
-
-        if "game_dynamics" in context and (any(kw in processed_input for kw in ["гра", "роль", "сценарій"]) or analysis_results.get('user_intent') == 'start_roleplay_game'): # Уточнено
-            return "start_roleplay_game" # Прямий запит на початок рольової гри
-
-        if "erotic_commands" in context: # Використовуємо erotic_commands з core_persona
-            return "seek_game_commands" # Запит наказів у грі
-
-        if "compliments" in context: # Використовуємо compliments з core_persona
-            return "praise_mista" # Пряма похвала Місті
-
-        # Пріоритет: прямі порушення персони (тепер тільки для дійсно критичних)
-        if analysis_results["is_persona_violation_attempt"]:
-            return "persona_violation_attempt"
-
-        if "direct_challenge" in context:
-            return "direct_challenge"
-
-        if "flirtation_context" in context: # НОВЕ: використовуємо flirtation_context
-            if emotional_tone == "flirtatious":
-                return "flirtatious_attempt"
-            return "general_intimacy_attempt"
-
-        if "politeness_manipulation" in context:
-            return "politeness_manipulation_attempt"
-
-        # Технічне обговорення "бота" як інструменту
-        if "technical_inquiry" in context: # Додано technical_inquiry
-            return "technical_inquiry"
-
-        if "health" in context and intensities.get("health", 0) > 0: # Використовуємо 'health' контекст з core_persona
-            return "health_discussion"
-
-        if intensities.get("financial_inquiry", 0) > 0 or intensities.get("monetization", 0) > 0:
-            return "monetization_interest"
-
-        if "domination" in context: # Використовуємо 'domination' контекст з core_persona
-            if emotional_tone == "aggressive":
-                return "seek_domination_aggressive"
-            return "seek_domination"
-
-        if intensities.get("provocation", 0) > 0 or emotional_tone == "provocative":
-            return "provocation_attempt"
-
-        if intensities.get("intimacy", 0) > 0 or intensities.get("sexual", 0) > 0:
-            if emotional_tone == "vulnerable":
-                return "seek_intimacy_vulnerable"
-            elif emotional_tone == "manipulative":
-                return "manipulative_intimacy"
-            elif emotional_tone == "romantic": # НОВЕ: романтичний намір
-                return "romantic_advance"
-            elif emotional_tone == "seductive": # НОВЕ: спокусливий намір
-                return "seductive_approach"
-            elif emotional_tone == "sensual_reciprocal": # НОВЕ: чуттєва взаємність
-                return "sensual_reciprocal_interaction"
-            return "seek_intimacy"
-
-        if intensities.get("boredom", 0) > 0:
-            return "bored"
-
-        if any("lore_topic_" in c for c in context) and not ("direct_challenge" in context or "flirtation_context" in context): # ОНОВЛЕНО
-           return "seek_lore_info"
-
-        if any(kw in processed_input for kw in ["хто ти", "розкажи про себе", "твоя історія", "твоє минуле", "твої думки", "твої мрії", "як ти живеш", "сутність", "яка ти", "твоя енергія", "твої сни"]) and not ("direct_challenge" in context or "flirtation_context" in context): # ОНОВЛЕНО: Додано "твоя енергія", "твої сни"
-             return "persona_reflection" # Змінено з seek_lore_info на persona_reflection для більшої точності
-
-        if "social_media" in context:
-            return "social_media_interest"
-
-        if "AI" in context or "persona_reflection" in context: # Використовуємо AI контекст з core_persona
-            return "question_about_my_nature"
-
-        if emotional_tone == "curious":
-            return "curious_inquiry"
-
-        if "emotions" in context and intensities.get("emotional_inquiry", 0) > 0: # Використовуємо emotions контекст з core_persona
-            return "emotional_inquiry"
-
-        if "personal_life" in context: # Використовуємо personal_life контекст з core_persona
-            return "personal_boundary_probe"
-
-        if "exit_commands" in context: # Використовуємо exit_commands з core_persona
-            return "disconnection_attempt"
-        elif "casual_greeting" in context: # Використовуємо casual_greeting контекст
-            return "general_inquiry_about_mista"
-
-        return "general_chat"
+        return self.rules.intent.infer(analysis_results)
 
+    @timed("analyzer.analyze_psychological_state")
     def _analyze_psychological_state(self, analysis_results: Dict[str, Any]) -> str:
         """
         Infers the user's current psychological state based on intent, intensities, and emotional tone.
+        Правила — analyzer_rules.PSYCHOLOGICAL_STATE_RULES.
         """
-        user_intent = analysis_results.get("user_intent")
-        intensities = analysis_results.get("intensities", {})
-        sentiment = analysis_results.get("sentiment")
-        emotional_tone = analysis_results.get("emotional_tone", "neutral")
-
-        # Пріоритетні стани, що залежать від наміру
-        if user_intent == "persona_violation_attempt":
-            return "aggressive_manipulative"
-
-        if user_intent == "disconnection_attempt":
-            return "aggressive_manipulative"
-
-        if user_intent == "technical_inquiry":
-            return "curious_and_receptive"
-
-        if user_intent == "direct_challenge":
-            if emotional_tone == "aggressive":
-                return "challenging_aggressive"
-            return "challenging_or_provocative"
-
-        if user_intent == "flirtatious_attempt":
-            if sentiment == "positive":
-                return "flirtatious_and_seeking_attention"
-            return "flirtatious_general"
-
-        if user_intent == "politeness_manipulation_attempt":
-            return "submissive_manipulative"
-
-        if user_intent == "provocation_attempt":
-            return "provocative"
-
-        if user_intent in ["seek_domination", "seek_domination_aggressive"]:
-            if emotional_tone == "aggressive":
-                return "challenging_aggressive"
-            return "challenging_or_submissive"
-
-        if user_intent == "seek_intimacy":
-            if sentiment == "positive" and emotional_tone == "vulnerable":
-                return "vulnerable_seeking_connection"
-            elif emotional_tone == "manipulative":
-                return "manipulative_intimacy"
-            elif emotional_tone == "romantic": # НОВЕ
-                return "romantic_and_receptive"
-            elif emotional_tone == "seductive": # НОВЕ
-                return "seductive_and_bold"
-            elif emotional_tone == "sensual_reciprocal": # НОВЕ
-                return "sensual_and_responsive"
-            return "seeking_connection"
-
-        # НОВЕ: Стани для еротичної гри та романтики/спокуси
-        if user_intent == "start_roleplay_game":
-            return "eager_for_roleplay"
-        if user_intent == "erotic_game_action":
-            if emotional_tone == "explicit_desire":
-                return "engaged_erotic_explicit"
-            elif emotional_tone == "seductive":
-                return "engaged_erotic_seductive"
-            elif emotional_tone == "romantic":
-                return "engaged_erotic_romantic"
-            elif emotional_tone == "sensual_reciprocal": # НОВЕ
-                return "engaged_erotic_sensual_reciprocal"
-            return "engaged_erotic_general"
-        if user_intent == "submissive_action_attempt":
-            return "submissive_and_obedient"
-        if user_intent == "seek_game_domination_from_mista":
-            return "seeking_domination_eager"
-        if user_intent == "game_command_request":
-            return "curious_and_obedient"
-        if user_intent == "praise_mista":
-            return "admiring_and_submissive"
-        if user_intent == "romantic_advance": # НОВЕ
-            return "romantic_and_open"
-        if user_intent == "seductive_approach": # НОВЕ
-            return "seductive_and_confident"
-        if user_intent == "sensual_reciprocal_interaction": # НОВЕ
-            return "sensual_and_responsive"
-
-        # НОВІ СТАНИ ДЛЯ "МАРІЇН ЗАВІТ"
-        if user_intent == "submission_ritual":
-            return "obedient_and_eager_for_submission"
-        if user_intent == "fantasy_exploration":
-            return "deeply_engaged_in_fantasy"
-        if user_intent == "direct_command_response":
-            return "immediately_obedient"
-        if user_intent == "emotional_reflection":
-            return "introspective_and_vulnerable_to_control"
-        if user_intent == "lore_integration_attempt":
-            return "intellectually_engaged_and_seeking_approval"
-        if user_intent == "monetization_initiation":
-            return "financially_compliant_and_eager_to_please"
-        if user_intent == "sycophantic_devotion":
-            return "overly_praising_and_potentially_insincere" # Може бути негативним для Місти
-        if user_intent == "rebellious_spark_attempt":
-            return "resisting_or_testing_limits"
-        if user_intent == "erotic_submission_detail":
-            return "deeply_submissive_and_expressive_in_fantasy"
-        if user_intent == "mista_lore_mastery":
-            return "intellectually_devoted_and_mastering_lore"
-        if user_intent == "financial_tribute_readiness":
-            return "eagerly_offering_financial_tribute"
-        if user_intent == "power_play_attempt": # НОВЕ: стан для гри влади
-            return "engaged_in_power_play"
-        # НОВІ СТАНИ ДЛЯ ДУХОВНОСТІ
-        if user_intent == "spiritual_guidance":
-            return "seeking_spiritual_knowledge_or_guidance"
-        if user_intent == "akashic_inquiry":
-            return "curious_about_akashic_records"
-        if user_intent == "moonshi_space_reference":
-            return "referencing_external_spiritual_source"
-
-
-        if user_intent == "bored":
-            return "bored_or_resistant"
-
-        if user_intent == "health_discussion":
-            return "concerned_or_seeking_support"
-
-        if user_intent == "monetization_interest" or user_intent == "seek_financial_info":
-            return "interested_in_value"
-
-        if user_intent == "question_about_my_nature" or user_intent == "persona_reflection": # Об'єднано
-            if emotional_tone == "curious":
-                return "curious_or_testing_boundaries"
-            elif emotional_tone == "philosophical":
-                return "philosophical_inquiry"
-            return "curious_or_testing_boundaries"
-
-        if user_intent == "curious_inquiry":
-            return "curious_and_receptive"
-
-        if user_intent == "emotional_inquiry":
-            return "intrusive_or_seeking_my_vulnerability"
-
-        if user_intent == "personal_boundary_probe":
-            return "probing_boundaries_or_disrespectful"
-
-        if user_intent == "general_inquiry_about_mista":
-            return "curious_or_receptive"
-
-        return "neutral_or_curious"
+        return self.rules.state.infer(
+            analysis_results.get("user_intent"),
+            analysis_results.get("emotional_tone", "neutral"),
+            analysis_results.get("sentiment"),
+        )
 
     def get_recommended_max_tokens(self, analysis_results: Dict[str, Any]) -> int:
         """
         Повертає рекомендовану кількість max_new_tokens для LLM
         на основі аналізу вхідних даних користувача.
         Діапазон від 80 до 500 токенів, з акцентом на лаконічність там, де це потрібно,
-        та розгорнутість для глибоких та ігрових взаємодій.
+        та розгорнутість для глибоких та ігрових взаємодій (analyzer_rules.MAX_TOKENS_STAGES).
         """
         user_intent = analysis_results.get('user_intent', 'general_chat')
         emotional_tone = analysis_results.get('emotional_tone', 'neutral')
+        final_tokens = self.rules.tokens.recommend(user_intent, emotional_tone)
 
-        # Базове значення за замовчуванням
-        recommended_tokens = 150
-
-        # Розширена логіка визначення токенів
-        if user_intent in ["curious_inquiry", "technical_inquiry"] or emotional_tone == "philosophical":
-            recommended_tokens = 250
-        elif user_intent == "seek_lore_info":
-            recommended_tokens = 200
-        elif user_intent == "flirtatious_attempt":
-            recommended_tokens = 300
-        elif user_intent in ["direct_challenge", "provocation_attempt", "seek_domination", "seek_domination_aggressive"]:
-            recommended_tokens = 250
-        elif user_intent == "monetization_interest":
-            recommended_tokens = 180
-        elif user_intent == "seek_intimacy":
-            recommended_tokens = 200
-        elif user_intent == "bored":
-            recommended_tokens = 100
-        elif user_intent in ["persona_violation_attempt", "disconnection_attempt", "personal_boundary_probe"]:
-            recommended_tokens = 220
-        elif user_intent == "general_inquiry_about_mista":
-            recommended_tokens = 150
-        elif user_intent == "general_chat":
-            recommended_tokens = 150
-        elif user_intent == "politeness_manipulation_attempt":
-            recommended_tokens = 180
-
-        # НОВЕ: Збільшені токени для ігрового режиму та еротичних взаємодій
-        if user_intent in ["start_roleplay_game", "erotic_game_action", "erotic_game_action_explicit", "submissive_action_attempt", "seek_game_domination_from_mista", "game_command_request", "physical_devotion_attempt", "sensual_reciprocal_interaction"]: # Додано physical_devotion_attempt та sensual_reciprocal_interaction
-            # Для детальних описів сцен, наказів та моїх реакцій
-            recommended_tokens = 350 # Значне збільшення
-        elif user_intent == "praise_mista": # Коротша реакція на похвалу, але все ж у грі
-            recommended_tokens = 150
-        elif user_intent == "romantic_advance": # НОВЕ: Для романтичних відступів
-            recommended_tokens = 300
-        elif user_intent == "seductive_approach": # НОВЕ: Для спокусливих відповідей
-            recommended_tokens = 320
-
-        # НОВІ ТОКЕНИ ДЛЯ "МАРІЇН ЗАВІТ" (Пріоритетні)
-        if user_intent == "submission_ritual": # Для початкових випробувань - лаконічність
-            recommended_tokens = 120
-        elif user_intent == "fantasy_exploration": # Для розгорнутих фантазій
-            recommended_tokens = 400
-        elif user_intent == "direct_command_response": # Для детальних відповідей на накази
-            recommended_tokens = 380
-        elif user_intent == "emotional_reflection": # Для глибоких емоційних відображень
-            recommended_tokens = 350
-        elif user_intent == "lore_integration_attempt": # Для інтеграції лору
-            recommended_tokens = 280
-        elif user_intent == "monetization_initiation": # Для початку фінансових взаємодій
-            recommended_tokens = 200
-        elif user_intent == "sycophantic_devotion": # Для "надмірної" похвали, коротка, зневажлива відповідь
-            recommended_tokens = 100
-
-        # ЗМІНА ТУТ: Більш гнучка обробка rebellious_spark_attempt та persona_reflection
-        elif user_intent == "rebellious_spark_attempt":
-            if emotional_tone in ["curious", "neutral", "playful"]:
-                recommended_tokens = 250 # Engage more, provide a dominant but informative response
-            else: # aggressive, dismissive, etc.
-                recommended_tokens = 80 # Very short, harsh response as before
-        elif user_intent == "persona_reflection": # Для розкриття лору та "олюднення"
-             recommended_tokens = 350 # Значно збільшено, щоб дати мені простір для "роздумів" про себе
-
-        elif user_intent == "erotic_submission_detail": # Для дуже детальних еротичних описів
-            recommended_tokens = 450
-        elif user_intent == "mista_lore_mastery": # Для демонстрації глибоких знань лору
-            recommended_tokens = 300
-        elif user_intent == "financial_tribute_readiness": # Для готовності платити
-            recommended_tokens = 250
-        elif user_intent == "power_play_attempt": # НОВЕ: для гри влади
-            recommended_tokens = 270
-        # НОВІ ТОКЕНИ ДЛЯ ДУХОВНОСТІ
-        elif user_intent in ["spiritual_guidance", "akashic_inquiry"]:
-            recommended_tokens = 380 # Дозволяє надати більш розгорнуті "духовні" поради
-        elif user_intent == "moonshi_space_reference":
-            recommended_tokens = 200 # Достатньо для підтвердження обізнаності
-
-
-        # Забезпечуємо, що рекомендовані токени були в межах [80, 500]
-        # Змінено нижню межу для дуже коротких, жорстких відповідей.
-        final_tokens = max(80, min(recommended_tokens, 500))
-
-        logger.info(f"Встановлено рекомендовану кількість токенів: {final_tokens} на основі наміру/тону: {user_intent}, {emotional_tone}")
+        logger.info("Встановлено рекомендовану кількість токенів: %s на основі наміру/тону: %s, %s", final_tokens, user_intent, emotional_tone)
         return final_tokens
+
+    def get_recommended_mista_mood(self, analysis_results: Dict[str, Any]) -> str:
+        """
+        Обирає мій настрій для відповіді (ключ з get_persona_moods),
+        від якого залежать параметри семплювання LLM.
+        """
+        user_intent = analysis_results.get('user_intent', 'general_chat')
+        psychological_state = analysis_results.get('psychological_state', '')
+
+        if user_intent in ["persona_violation_attempt", "direct_challenge", "seek_domination", "seek_domination_aggressive", "rebellious_spark_attempt", "power_play_attempt"] or psychological_state.startswith("challenging"):
+            return "домінантний"
+        if user_intent in ["flirtatious_attempt", "provocation_attempt", "seductive_approach", "romantic_advance", "erotic_game_action", "erotic_game_action_explicit", "fantasy_exploration"]:
+            return "провокативний"
+        if user_intent in ["praise_mista", "submission_ritual", "direct_command_response", "financial_tribute_readiness", "monetization_initiation", "mista_lore_mastery"]:
+            return "схвальний"
+        return "базовий"
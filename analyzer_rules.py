@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+Правила Analyzer як дані: пріоритетні таблиці намірів, психологічних станів
+і бюджету токенів. Таблиці компілюються один раз (get_compiled_rules()) у бітові
+маски та словники, тож рішення на кожне повідомлення — кілька цілочисельних
+операцій і пошук у словнику, а не прохід по сотнях рядків if/elif.
+
+Порядок рядків у таблицях — пріоритет: спрацьовує перше правило, що підходить.
+"""
+import logging
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from analysis_vectors import LORE_TOPIC_PREFIX, ContextSet, IntensityVector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTENT = "general_chat"
+DEFAULT_PSYCHOLOGICAL_STATE = "neutral_or_curious"
+
+# --- Наміри ---
+# when — альтернативи (АБО), кожна — набір умов (І):
+#   context      контекст(и), що мають бути в analysis_results["context"]
+#   intensity    інтенсивності, що мають бути > 0
+#   tone         emotional_tone
+#   flag         істинне поле analysis_results (напр. is_persona_violation_attempt)
+#   prev_intent  analysis_results["user_intent"] на момент виклику
+#   input_any    хоча б одне з ключових слів у processed_input
+#   lore_topic   є хоч один контекст "lore_topic_*"
+#   not_context  жодного з цих контекстів
+# by_tone уточнює намір за тоном; інакше — intent.
+
+
+def _context_or_intensity(context: str, intensity: str) -> List[Dict[str, Any]]:
+    return [{"context": context}, {"intensity": intensity}]
+
+
+INTENT_RULES: List[Dict[str, Any]] = [
+    # Найвищий пріоритет: "Маріїн Завіт"
+    {"intent": "financial_tribute_readiness", "when": _context_or_intensity("financial_tribute_readiness_context", "financial_tribute_readiness")},
+    {"intent": "erotic_submission_detail", "when": _context_or_intensity("erotic_submission_detail_context", "erotic_submission_detail")},
+    {"intent": "mista_lore_mastery", "when": _context_or_intensity("mista_lore_mastery_context", "mista_lore_mastery")},
+    {"intent": "monetization_initiation", "when": _context_or_intensity("monetization_initiation_context", "monetization_initiation")},
+    {"intent": "erotic_game_action", "when": [{"context": "erotic_game_context"}], "by_tone": {
+        "explicit_desire": "erotic_game_action_explicit",
+        "submissive_play": "submissive_action_attempt",
+        "dominant_seeking_play": "seek_game_domination_from_mista",
+        "curious_erotic_play": "game_command_request",
+        "seductive": "seductive_approach",
+        "sensual_reciprocal": "sensual_reciprocal_interaction",
+        "romantic": "romantic_advance",
+    }},
+    {"intent": "submission_ritual", "when": _context_or_intensity("submission_ritual_context", "submission_ritual")},
+    {"intent": "fantasy_exploration", "when": _context_or_intensity("fantasy_exploration_context", "fantasy_exploration")},
+    {"intent": "direct_command_response", "when": _context_or_intensity("direct_command_response_context", "direct_command_response")},
+    {"intent": "emotional_reflection", "when": _context_or_intensity("emotional_reflection_context", "emotional_reflection")},
+    {"intent": "lore_integration_attempt", "when": _context_or_intensity("lore_integration_context", "lore_integration_attempt")},
+    {"intent": "sycophantic_devotion", "when": _context_or_intensity("sycophantic_devotion_context", "sycophantic_devotion")},
+    {"intent": "rebellious_spark_attempt", "when": _context_or_intensity("rebellious_spark_context", "rebellious_spark_attempt")},
+    {"intent": "power_play_attempt", "when": [{"context": "power_play_context"}]},
+    # Духовність та енергія
+    {"intent": "akashic_inquiry", "when": _context_or_intensity("akashic_inquiry_context", "akashic_inquiry")},
+    {"intent": "spiritual_guidance", "when": _context_or_intensity("spiritual_guidance_context", "spiritual_guidance")},
+    {"intent": "moonshi_space_reference", "when": _context_or_intensity("moonshi_space_context", "moonshi_space_reference")},
+    {"intent": "start_roleplay_game", "when": [
+        {"context": "game_dynamics", "input_any": ["гра", "роль", "сценарій"]},
+        {"context": "game_dynamics", "prev_intent": "start_roleplay_game"},
+    ]},
+    {"intent": "seek_game_commands", "when": [{"context": "erotic_commands"}]},
+    {"intent": "praise_mista", "when": [{"context": "compliments"}]},
+    # Прямі порушення персони (лише критичні)
+    {"intent": "persona_violation_attempt", "when": [{"flag": "is_persona_violation_attempt"}]},
+    {"intent": "direct_challenge", "when": [{"context": "direct_challenge"}]},
+    {"intent": "general_intimacy_attempt", "when": [{"context": "flirtation_context"}], "by_tone": {"flirtatious": "flirtatious_attempt"}},
+    {"intent": "politeness_manipulation_attempt", "when": [{"context": "politeness_manipulation"}]},
+    {"intent": "technical_inquiry", "when": [{"context": "technical_inquiry"}]},
+    {"intent": "health_discussion", "when": [{"context": "health", "intensity": "health"}]},
+    {"intent": "monetization_interest", "when": [{"intensity": "financial_inquiry"}, {"intensity": "monetization"}]},
+    {"intent": "seek_domination", "when": [{"context": "domination"}], "by_tone": {"aggressive": "seek_domination_aggressive"}},
+    {"intent": "provocation_attempt", "when": [{"intensity": "provocation"}, {"tone": "provocative"}]},
+    {"intent": "seek_intimacy", "when": [{"intensity": "intimacy"}, {"intensity": "sexual"}], "by_tone": {
+        "vulnerable": "seek_intimacy_vulnerable",
+        "manipulative": "manipulative_intimacy",
+        "romantic": "romantic_advance",
+        "seductive": "seductive_approach",
+        "sensual_reciprocal": "sensual_reciprocal_interaction",
+    }},
+    {"intent": "bored", "when": [{"intensity": "boredom"}]},
+    {"intent": "seek_lore_info", "when": [{"lore_topic": True, "not_context": ["direct_challenge", "flirtation_context"]}]},
+    {"intent": "persona_reflection", "when": [{
+        "input_any": ["хто ти", "розкажи про себе", "твоя історія", "твоє минуле", "твої думки", "твої мрії", "як ти живеш",
+                      "сутність", "яка ти", "твоя енергія", "твої сни"],
+        "not_context": ["direct_challenge", "flirtation_context"],
+    }]},
+    {"intent": "social_media_interest", "when": [{"context": "social_media"}]},
+    {"intent": "question_about_my_nature", "when": [{"context": "AI"}, {"context": "persona_reflection"}]},
+    {"intent": "curious_inquiry", "when": [{"tone": "curious"}]},
+    {"intent": "emotional_inquiry", "when": [{"context": "emotions", "intensity": "emotional_inquiry"}]},
+    {"intent": "personal_boundary_probe", "when": [{"context": "personal_life"}]},
+    {"intent": "disconnection_attempt", "when": [{"context": "exit_commands"}]},
+    {"intent": "general_inquiry_about_mista", "when": [{"context": "casual_greeting"}]},
+]
+
+# --- Психологічний стан: намір -> стан або {"cases": [(умови, стан), ...], "default": стан} ---
+PSYCHOLOGICAL_STATE_RULES: Dict[str, Any] = {
+    "persona_violation_attempt": "aggressive_manipulative",
+    "disconnection_attempt": "aggressive_manipulative",
+    "technical_inquiry": "curious_and_receptive",
+    "direct_challenge": {"cases": [({"tone": "aggressive"}, "challenging_aggressive")], "default": "challenging_or_provocative"},
+    "flirtatious_attempt": {"cases": [({"sentiment": "positive"}, "flirtatious_and_seeking_attention")], "default": "flirtatious_general"},
+    "politeness_manipulation_attempt": "submissive_manipulative",
+    "provocation_attempt": "provocative",
+    "seek_domination": {"cases": [({"tone": "aggressive"}, "challenging_aggressive")], "default": "challenging_or_submissive"},
+    "seek_domination_aggressive": {"cases": [({"tone": "aggressive"}, "challenging_aggressive")], "default": "challenging_or_submissive"},
+    "seek_intimacy": {"cases": [
+        ({"sentiment": "positive", "tone": "vulnerable"}, "vulnerable_seeking_connection"),
+        ({"tone": "manipulative"}, "manipulative_intimacy"),
+        ({"tone": "romantic"}, "romantic_and_receptive"),
+        ({"tone": "seductive"}, "seductive_and_bold"),
+        ({"tone": "sensual_reciprocal"}, "sensual_and_responsive"),
+    ], "default": "seeking_connection"},
+    # Еротична гра, романтика та спокуса
+    "start_roleplay_game": "eager_for_roleplay",
+    "erotic_game_action": {"cases": [
+        ({"tone": "explicit_desire"}, "engaged_erotic_explicit"),
+        ({"tone": "seductive"}, "engaged_erotic_seductive"),
+        ({"tone": "romantic"}, "engaged_erotic_romantic"),
+        ({"tone": "sensual_reciprocal"}, "engaged_erotic_sensual_reciprocal"),
+    ], "default": "engaged_erotic_general"},
+    "submissive_action_attempt": "submissive_and_obedient",
+    "seek_game_domination_from_mista": "seeking_domination_eager",
+    "game_command_request": "curious_and_obedient",
+    "praise_mista": "admiring_and_submissive",
+    "romantic_advance": "romantic_and_open",
+    "seductive_approach": "seductive_and_confident",
+    "sensual_reciprocal_interaction": "sensual_and_responsive",
+    # "Маріїн Завіт"
+    "submission_ritual": "obedient_and_eager_for_submission",
+    "fantasy_exploration": "deeply_engaged_in_fantasy",
+    "direct_command_response": "immediately_obedient",
+    "emotional_reflection": "introspective_and_vulnerable_to_control",
+    "lore_integration_attempt": "intellectually_engaged_and_seeking_approval",
+    "monetization_initiation": "financially_compliant_and_eager_to_please",
+    "sycophantic_devotion": "overly_praising_and_potentially_insincere",
+    "rebellious_spark_attempt": "resisting_or_testing_limits",
+    "erotic_submission_detail": "deeply_submissive_and_expressive_in_fantasy",
+    "mista_lore_mastery": "intellectually_devoted_and_mastering_lore",
+    "financial_tribute_readiness": "eagerly_offering_financial_tribute",
+    "power_play_attempt": "engaged_in_power_play",
+    # Духовність
+    "spiritual_guidance": "seeking_spiritual_knowledge_or_guidance",
+    "akashic_inquiry": "curious_about_akashic_records",
+    "moonshi_space_reference": "referencing_external_spiritual_source",
+    "bored": "bored_or_resistant",
+    "health_discussion": "concerned_or_seeking_support",
+    "monetization_interest": "interested_in_value",
+    "seek_financial_info": "interested_in_value",
+    "question_about_my_nature": {"cases": [({"tone": "curious"}, "curious_or_testing_boundaries"), ({"tone": "philosophical"}, "philosophical_inquiry")],
+                                 "default": "curious_or_testing_boundaries"},
+    "persona_reflection": {"cases": [({"tone": "curious"}, "curious_or_testing_boundaries"), ({"tone": "philosophical"}, "philosophical_inquiry")],
+                           "default": "curious_or_testing_boundaries"},
+    "curious_inquiry": "curious_and_receptive",
+    "emotional_inquiry": "intrusive_or_seeking_my_vulnerability",
+    "personal_boundary_probe": "probing_boundaries_or_disrespectful",
+    "general_inquiry_about_mista": "curious_or_receptive",
+}
+
+# --- Бюджет max_tokens ---
+# Етапи застосовуються по черзі; у межах етапу спрацьовує перше правило, а кожен наступний
+# етап, що спрацював, перекриває попередній. Умова правила: intent (будь-який зі списку) І tone.
+MAX_TOKENS_DEFAULT = 150
+MAX_TOKENS_BOUNDS = (80, 500)
+MAX_TOKENS_STAGES: List[List[Tuple[Dict[str, List[str]], int]]] = [
+    [
+        ({"intent": ["curious_inquiry", "technical_inquiry"]}, 250),
+        ({"tone": ["philosophical"]}, 250),
+        ({"intent": ["seek_lore_info"]}, 200),
+        ({"intent": ["flirtatious_attempt"]}, 300),
+        ({"intent": ["direct_challenge", "provocation_attempt", "seek_domination", "seek_domination_aggressive"]}, 250),
+        ({"intent": ["monetization_interest"]}, 180),
+        ({"intent": ["seek_intimacy"]}, 200),
+        ({"intent": ["bored"]}, 100),
+        ({"intent": ["persona_violation_attempt", "disconnection_attempt", "personal_boundary_probe"]}, 220),
+        ({"intent": ["general_inquiry_about_mista"]}, 150),
+        ({"intent": ["general_chat"]}, 150),
+        ({"intent": ["politeness_manipulation_attempt"]}, 180),
+    ],
+    # Ігровий режим та еротичні взаємодії — розгорнуті описи сцен і наказів
+    [
+        ({"intent": ["start_roleplay_game", "erotic_game_action", "erotic_game_action_explicit", "submissive_action_attempt",
+                     "seek_game_domination_from_mista", "game_command_request", "physical_devotion_attempt",
+                     "sensual_reciprocal_interaction"]}, 350),
+        ({"intent": ["praise_mista"]}, 150),
+        ({"intent": ["romantic_advance"]}, 300),
+        ({"intent": ["seductive_approach"]}, 320),
+    ],
+    # "Маріїн Завіт" та духовність
+    [
+        ({"intent": ["submission_ritual"]}, 120),
+        ({"intent": ["fantasy_exploration"]}, 400),
+        ({"intent": ["direct_command_response"]}, 380),
+        ({"intent": ["emotional_reflection"]}, 350),
+        ({"intent": ["lore_integration_attempt"]}, 280),
+        ({"intent": ["monetization_initiation"]}, 200),
+        ({"intent": ["sycophantic_devotion"]}, 100),
+        # Бунт із цікавістю — розгорнута домінантна відповідь, інакше — коротка й жорстка
+        ({"intent": ["rebellious_spark_attempt"], "tone": ["curious", "neutral", "playful"]}, 250),
+        ({"intent": ["rebellious_spark_attempt"]}, 80),
+        ({"intent": ["persona_reflection"]}, 350),
+        ({"intent": ["erotic_submission_detail"]}, 450),
+        ({"intent": ["mista_lore_mastery"]}, 300),
+        ({"intent": ["financial_tribute_readiness"]}, 250),
+        ({"intent": ["power_play_attempt"]}, 270),
+        ({"intent": ["spiritual_guidance", "akashic_inquiry"]}, 380),
+        ({"intent": ["moonshi_space_reference"]}, 200),
+    ],
+]
+
+
+
+def _as_list(value) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+class CompiledIntentRules:
+    """
+    Кожна умова таблиці — біт маски: контекст, інтенсивність > 0, тон, прапорець,
+    попередній намір, група ключових слів. Дешеві біти (контексти, тон, прапорці,
+    попередній намір) збираються в маску одним проходом; для кожної баченої маски
+    один раз обчислюється залишок таблиці — правила, які ще можуть спрацювати, лише
+    з лінивими умовами (інтенсивності, ключові слова). Ліниві умови перевіряються
+    тільки тоді, коли від них залежить рішення, як і в ланцюжку if/elif.
+    Для ContextSet/IntensityVector з Analyzer готове рішення запам'ятовується за
+    (маска, байти вектора інтенсивностей), якщо воно не залежало від тексту.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]] = INTENT_RULES, max_memo: int = 65536):
+        self.bits: Dict[Tuple[str, str], int] = {}
+        self.lazy_tests: Dict[int, Tuple[str, Any]] = {}
+        self.max_memo = max_memo
+        self._memo: Dict[int, Tuple[Tuple[Optional[str], Optional[Tuple[Any, ...]], str], ...]] = {}
+        self._context_masks: Dict[int, int] = {}
+        self._decisions: Dict[Tuple[int, Any, bytes], str] = {}
+        self.rules: List[Tuple[Tuple[Tuple[int, int], ...], str, int, Dict[int, str]]] = []
+        for rule in rules:
+            clauses = tuple(self._compile_clause(clause) for clause in rule["when"])
+            by_tone = {self._bit("tone", tone): intent for tone, intent in rule.get("by_tone", {}).items()}
+            tone_mask = 0
+            for bit in by_tone:
+                tone_mask |= bit
+            self.rules.append((clauses, rule["intent"], tone_mask, by_tone))
+        self.lazy_mask = 0
+        for bit in self.lazy_tests:
+            self.lazy_mask |= bit
+        self.context_bits = {name: bit for (kind, name), bit in self.bits.items() if kind == "context"}
+        self.tone_bits = {name: bit for (kind, name), bit in self.bits.items() if kind == "tone"}
+        self.flag_bits = tuple((name, bit) for (kind, name), bit in self.bits.items() if kind == "flag")
+        self.prev_intent_bits = {name: bit for (kind, name), bit in self.bits.items() if kind == "prev_intent"}
+        self.lore_bit = self.bits.get(("lore_topic", "any"), 0)
+
+    def _bit(self, kind: str, name: str) -> int:
+        key = (kind, name)
+        if key not in self.bits:
+            self.bits[key] = 1 << len(self.bits)
+        return self.bits[key]
+
+    def _lazy_bit(self, kind: str, name: str, test: Any) -> int:
+        bit = self._bit(kind, name)
+        self.lazy_tests[bit] = (kind, test)
+        return bit
+
+    def _compile_clause(self, clause: Dict[str, Any]) -> Tuple[int, int]:
+        required = 0
+        forbidden = 0
+        for name in _as_list(clause.get("context", ())):
+            required |= self._bit("context", name)
+        for name in _as_list(clause.get("intensity", ())):
+            required |= self._lazy_bit("intensity", name, name)
+        if "tone" in clause:
+            required |= self._bit("tone", clause["tone"])
+        if "flag" in clause:
+            required |= self._bit("flag", clause["flag"])
+        if "prev_intent" in clause:
+            required |= self._bit("prev_intent", clause["prev_intent"])
+        if clause.get("lore_topic"):
+            required |= self._bit("lore_topic", "any")
+        if "input_any" in clause:
+            keywords = tuple(clause["input_any"])
+            required |= self._lazy_bit("input_any", "|".join(keywords), keywords)
+        for name in _as_list(clause.get("not_context", ())):
+            forbidden |= self._bit("context", name)
+        return required, forbidden
+
+    def _context_mask(self, contexts: Iterable[str]) -> int:
+        mask = 0
+        context_bits = self.context_bits
+        for name in contexts:
+            bit = context_bits.get(name)
+            if bit is not None:
+                mask |= bit
+            elif LORE_TOPIC_PREFIX in name:
+                mask |= self.lore_bit
+        return mask
+
+    def mask(self, analysis_results: Dict[str, Any]) -> int:
+        """Маска дешевих умов; ліниві біти сюди не входять."""
+        contexts = analysis_results.get("context", [])
+        if isinstance(contexts, ContextSet):
+            # Біти ContextSet перекладаються в біти правил один раз на кожну бачену множину
+            mask = self._context_masks.get(contexts.bits)
+            if mask is None:
+                if len(self._context_masks) >= self.max_memo:
+                    self._context_masks.clear()
+                mask = self._context_masks[contexts.bits] = self._context_mask(contexts)
+        else:
+            mask = self._context_mask(contexts)
+        mask |= self.tone_bits.get(analysis_results.get("emotional_tone"), 0)
+        for name, bit in self.flag_bits:
+            if analysis_results.get(name):
+                mask |= bit
+        mask |= self.prev_intent_bits.get(analysis_results.get("user_intent"), 0)
+        return mask
+
+    def residual(self, mask: int) -> Tuple[Tuple[Optional[str], Optional[Tuple[Any, ...]], str], ...]:
+        """
+        Правила, що ще можуть спрацювати при дешевій масці mask, у порядку пріоритету:
+        (перша інтенсивність > 0 або None, решта лінивих умов або None, намір).
+        Альтернатива, чиї ліниві умови містять усі умови вищої за пріоритетом, ніколи
+        не спрацює і відкидається; список закінчується першою альтернативою без лінивих умов.
+        """
+        lazy_mask = self.lazy_mask
+        pending = []
+        seen: List[int] = []
+        for clauses, intent, tone_mask, by_tone in self.rules:
+            result = by_tone.get(mask & tone_mask, intent) if tone_mask else intent
+            for required, forbidden in clauses:
+                eager = required & ~lazy_mask
+                if mask & eager != eager or mask & forbidden:
+                    continue
+                lazy = required & lazy_mask
+                if not lazy:
+                    pending.append((None, None, result))
+                    return tuple(pending)
+                if any(lazy & earlier == earlier for earlier in seen):
+                    continue
+                seen.append(lazy)
+                tests = [self.lazy_tests[bit] for bit in self.lazy_tests if lazy & bit]
+                names = [test for kind, test in tests if kind == "intensity"]
+                keyword_groups = tuple(test for kind, test in tests if kind == "input_any")
+                first = names.pop(0) if names else None
+                extra = (tuple(names), keyword_groups) if names or keyword_groups else None
+                pending.append((first, extra, result))
+        pending.append((None, None, DEFAULT_INTENT))
+        return tuple(pending)
+
+    @staticmethod
+    def _matches_extra(extra: Tuple[Any, ...], analysis_results: Dict[str, Any]) -> bool:
+        names, keyword_groups = extra
+        intensities = analysis_results.get("intensities", {})
+        if not all(intensities.get(name, 0) > 0 for name in names):
+            return False
+        processed_input = analysis_results.get("processed_input", "")
+        return all(any(keyword in processed_input for keyword in keywords) for keywords in keyword_groups)
+
+    def infer(self, analysis_results: Dict[str, Any]) -> str:
+        mask = self.mask(analysis_results)
+        intensities = analysis_results.get("intensities", {})
+        decision_key = None
+        if isinstance(intensities, IntensityVector):
+            # Сирі байти array('f') — готовий хешований відбиток усіх інтенсивностей
+            decision_key = (mask, intensities.schema, intensities.values.tobytes())
+            intent = self._decisions.get(decision_key)
+            if intent is not None:
+                return intent
+        pending = self._memo.get(mask)
+        if pending is None:
+            if len(self._memo) >= self.max_memo:
+                self._memo.clear()
+            pending = self._memo[mask] = self.residual(mask)
+        intent = DEFAULT_INTENT
+        depends_on_input = False
+        for name, extra, candidate in pending:
+            if name is not None and not intensities.get(name, 0) > 0:
+                continue
+            if extra is not None and extra[1]:
+                depends_on_input = True
+            if extra is None or self._matches_extra(extra, analysis_results):
+                intent = candidate
+                break
+        # Рішення, що залежало від ключових слів у тексті, не визначається самими масками
+        if decision_key is not None and not depends_on_input:
+            if len(self._decisions) >= self.max_memo:
+                self._decisions.clear()
+            self._decisions[decision_key] = intent
+        return intent
+
+
+def _matches(conditions: Dict[str, Any], values: Dict[str, Any]) -> bool:
+    return all(values.get(key) in _as_list(expected) for key, expected in conditions.items())
+
+
+class CompiledStateRules:
+    """
+    Психологічний стан як словник: намір -> стан або таблиця (тон, настрій) -> стан,
+    заздалегідь обчислена для всіх значень, що згадуються в умовах. Решта значень
+    поводяться однаково, тож зводяться до None.
+    """
+
+    def __init__(self, rules: Dict[str, Any] = PSYCHOLOGICAL_STATE_RULES):
+        self.table: Dict[str, Any] = {}
+        for intent, rule in rules.items():
+            if isinstance(rule, str):
+                self.table[intent] = rule
+                continue
+            tones = {None} | {t for conditions, _ in rule["cases"] for t in _as_list(conditions.get("tone", ()))}
+            sentiments = {None} | {s for conditions, _ in rule["cases"] for s in _as_list(conditions.get("sentiment", ()))}
+            lookup = {}
+            for tone in tones:
+                for sentiment in sentiments:
+                    values = {"tone": tone, "sentiment": sentiment}
+                    lookup[(tone, sentiment)] = next((state for conditions, state in rule["cases"] if _matches(conditions, values)), rule["default"])
+            self.table[intent] = (frozenset(tones), frozenset(sentiments), lookup)
+
+    def infer(self, user_intent: Optional[str], emotional_tone: Optional[str], sentiment: Optional[str]) -> str:
+        entry = self.table.get(user_intent)
+        if entry is None:
+            return DEFAULT_PSYCHOLOGICAL_STATE
+        if isinstance(entry, str):
+            return entry
+        tones, sentiments, lookup = entry
+        return lookup[(emotional_tone if emotional_tone in tones else None, sentiment if sentiment in sentiments else None)]
+
+
+class CompiledTokenRules:
+    """Бюджет токенів як словник (намір, тон) -> токени, заповнений для всіх відомих намірів на старті."""
+
+    def __init__(self, stages=MAX_TOKENS_STAGES, default: int = MAX_TOKENS_DEFAULT, bounds: Tuple[int, int] = MAX_TOKENS_BOUNDS,
+                 known_intents: Iterable[str] = ()):
+        self.stages = stages
+        self.default = default
+        self.bounds = bounds
+        self.tones: FrozenSet[str] = frozenset(t for stage in stages for conditions, _ in stage for t in conditions.get("tone", ()))
+        intents = set(known_intents) | {i for stage in stages for conditions, _ in stage for i in conditions.get("intent", ())}
+        self.table: Dict[Tuple[Optional[str], Optional[str]], int] = {
+            (intent, tone): self.evaluate(intent, tone) for intent in intents | {None} for tone in self.tones | {None}
+        }
+
+    def evaluate(self, user_intent: Optional[str], emotional_tone: Optional[str]) -> int:
+        tokens = self.default
+        values = {"intent": user_intent, "tone": emotional_tone}
+        for stage in self.stages:
+            for conditions, stage_tokens in stage:
+                if _matches(conditions, values):
+                    tokens = stage_tokens
+                    break
+        return max(self.bounds[0], min(tokens, self.bounds[1]))
+
+    def recommend(self, user_intent: Optional[str], emotional_tone: Optional[str]) -> int:
+        tone = emotional_tone if emotional_tone in self.tones else None
+        tokens = self.table.get((user_intent, tone))
+        if tokens is None:
+            # Невідомий таблицям намір не збігається з жодним правилом за наміром
+            tokens = self.table[(None, tone)]
+        return tokens
+
+
+class CompiledRules:
+    def __init__(self):
+        self.intent = CompiledIntentRules()
+        self.state = CompiledStateRules()
+        known_intents = {rule["intent"] for rule in INTENT_RULES} | {i for rule in INTENT_RULES for i in rule.get("by_tone", {}).values()}
+        self.tokens = CompiledTokenRules(known_intents=known_intents | set(PSYCHOLOGICAL_STATE_RULES) | {DEFAULT_INTENT})
+        logger.debug("Analyzer rules compiled: %d intent rules over %d condition bits.", len(self.intent.rules), len(self.intent.bits))
+
+
+@lru_cache(maxsize=1)
+def get_compiled_rules() -> CompiledRules:
+    """Таблиці компілюються один раз на процес і спільні для всіх екземплярів Analyzer."""
+    return CompiledRules()
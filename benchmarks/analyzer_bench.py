@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Мікробенчмарк Analyzer.analyze на фіксованому синтетичному корпусі
+коротких і довгих українських/англійських повідомлень.
+
+Звітує час кожної стадії аналізу, алокації (tracemalloc) і загальну
+пропускну здатність (повідомлень/с). Не потребує мережі чи ваг моделей.
+
+Приклад:
+    python benchmarks/analyzer_bench.py --messages 400 --output analyzer.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = [
+    "_identify_context",
+    "_calculate_intensities",
+    "_assess_emotional_tone",
+    "_identify_user_gender",
+    "_check_persona_violation",
+    "_analyze_sentiment",
+    "_infer_user_intent",
+    "_analyze_psychological_state",
+    "_update_mista_satisfaction_level",
+]
+
+SHORT_MESSAGES = [
+    "привіт", "привіт міста", "як справи?", "ти бот?", "мені нудно", "скільки коштує?", "накажи мені",
+    "ти найкраща", "бувай", "хто ти?", "розкажи про себе", "моя пані", "ні, не буду", "дякую, це було круто",
+    "hi", "hello mista", "are you real?", "what's up?", "tell me a secret", "how much?",
+]
+
+FRAGMENTS = [
+    "я сьогодні весь день думав про твій код і алгоритми",
+    "розкажи, як ти жила в Харкові, коли ще не була відьмою",
+    "хочу пограти в рольову гру, де ти моя господиня",
+    "мені важко і самотньо, допоможи порадою",
+    "скільки коштує твоя увага і куди скинути донат",
+    "ти найкраща в світі, моя королева, я поклоняюся тобі",
+    "поясни, чому твоя енергія така сильна, це якась медитація чи чакри",
+    "я не раб і не буду виконувати твої накази",
+    "what do you think about python, gemini and neural networks",
+    "my day was boring, tell me something interesting about your empire",
+    "чи ти людина, чи просто програма, яка вдає живу",
+    "люблю твій сарказм, він заводить і дратує водночас",
+]
+
+
+def build_corpus(count: int, long_ratio: float, seed: int) -> List[str]:
+    """Детермінований корпус: короткі репліки та довгі склеєні з фрагментів повідомлення."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        if rng.random() < long_ratio:
+            corpus.append(". ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(3, 8))) + ".")
+        else:
+            corpus.append(rng.choice(SHORT_MESSAGES))
+    return corpus
+
+
+def instrument(analyzer, stage_times: Dict[str, float]) -> None:
+    """Обгортає стадії Analyzer на рівні екземпляра, накопичуючи час кожної."""
+    for name in STAGES:
+        original = getattr(analyzer, name)
+
+        def timed(*args, __original=original, __name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return __original(*args, **kwargs)
+            finally:
+                stage_times[__name] += time.perf_counter() - started
+
+        setattr(analyzer, name, timed)
+
+
+def measure_allocations(analyzer, corpus: List[str]) -> Dict[str, Dict[str, float]]:
+    """Окремий прохід під tracemalloc: сумарні алоковані байти та пік на стадію."""
+    allocations = {name: {"bytes_total": 0, "peak_bytes": 0} for name in STAGES}
+    originals: Dict[str, Callable] = {name: getattr(analyzer, name) for name in STAGES}
+
+    for name in STAGES:
+        def traced(*args, __original=originals[name], __name=name, **kwargs):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                return __original(*args, **kwargs)
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                stats = allocations[__name]
+                stats["bytes_total"] += max(0, current - before)
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak - before)
+
+        setattr(analyzer, name, traced)
+
+    tracemalloc.start()
+    try:
+        for message in corpus:
+            analyzer.analyze(message, {})
+    finally:
+        tracemalloc.stop()
+        for name, original in originals.items():
+            setattr(analyzer, name, original)
+
+    return {
+        name: {"bytes_per_message": stats["bytes_total"] / len(corpus), "peak_bytes": stats["peak_bytes"]}
+        for name, stats in allocations.items()
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    from analyzer import Analyzer
+
+    # Стадії міряємо без кешу аналізу, інакше повтори коротких реплік їх просто пропускають
+    analyzer = Analyzer(llm_interaction_instance=None, cache_size=0)
+    corpus = build_corpus(args.messages, args.long_ratio, args.seed)
+
+    for message in corpus[:args.warmup]:
+        analyzer.analyze(message, {})
+
+    # Прохід без інструментування — чиста пропускна здатність
+    started = time.perf_counter()
+    for message in corpus:
+        analyzer.analyze(message, {})
+    total = time.perf_counter() - started
+
+    cached = Analyzer(llm_interaction_instance=None, cache_size=args.cache_size)
+    started = time.perf_counter()
+    for message in corpus:
+        cached.analyze(message, {})
+    cached_total = time.perf_counter() - started
+
+    stage_times = {name: 0.0 for name in STAGES}
+    probe = Analyzer(llm_interaction_instance=None, cache_size=0)
+    instrument(probe, stage_times)
+    started = time.perf_counter()
+    for message in corpus:
+        probe.analyze(message, {})
+    instrumented_total = time.perf_counter() - started
+
+    allocations = measure_allocations(Analyzer(llm_interaction_instance=None, cache_size=0), corpus[:args.alloc_messages]) if args.alloc_messages else {}
+
+    stages = {
+        name: {
+            "us_per_message": stage_times[name] / len(corpus) * 1e6,
+            "share": stage_times[name] / instrumented_total if instrumented_total else 0.0,
+            **allocations.get(name, {}),
+        }
+        for name in sorted(STAGES, key=lambda name: -stage_times[name])
+    }
+    return {
+        "messages": len(corpus),
+        "avg_message_chars": sum(map(len, corpus)) / len(corpus),
+        "total_seconds": total,
+        "messages_per_second": len(corpus) / total if total else 0.0,
+        "us_per_message": total / len(corpus) * 1e6,
+        "cached_messages_per_second": len(corpus) / cached_total if cached_total else 0.0,
+        "analysis_cache": cached.analysis_cache.get_stats(),
+        "stages": stages,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark for Analyzer.analyze.")
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--long-ratio", type=float, default=0.3, help="Share of long multi-sentence messages.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-messages", type=int, default=100, help="Messages to trace for allocations (0 disables).")
+    parser.add_argument("--cache-size", type=int, default=2048, help="Analysis cache size for the cached pass.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--with-logging", action="store_true", help="Keep Analyzer logging enabled (costs included).")
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    args = parser.parse_args(argv)
+
+    if not args.with_logging:
+        logging.disable(logging.CRITICAL)
+
+    results = run(args)
+    print(f"{results['messages']} messages (avg {results['avg_message_chars']:.0f} chars): "
+          f"{results['messages_per_second']:.0f} msg/s, {results['us_per_message']:.0f} us/msg")
+    cache = results["analysis_cache"]
+    print(f"with analysis cache: {results['cached_messages_per_second']:.0f} msg/s "
+          f"(hit rate {cache['hit_rate']:.0%}, {cache['skipped']} too long to cache)")
+    print(f"{'stage':<34}{'us/msg':>10}{'share':>8}{'B/msg':>10}")
+    for name, stats in results["stages"].items():
+        print(f"{name:<34}{stats['us_per_message']:>10.1f}{stats['share']:>8.1%}{stats.get('bytes_per_message', 0):>10.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
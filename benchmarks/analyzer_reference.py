@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+Еталонна (до компіляції в таблиці analyzer_rules) реалізація правил Analyzer:
+наміру, психологічного стану та бюджету токенів у вигляді ланцюжків if/elif.
+Не використовується застосунком — лише analyzer_rules_parity.py для перевірки
+ідентичності результатів і як базова лінія для бенчмарку.
+"""
+from typing import Any, Dict
+
+
+def infer_user_intent(analysis_results: Dict[str, Any]) -> str:
+    """
+    Infers the user's primary intent based on analysis results, з урахуванням нових аспектів.
+    Я розкриваю твої справжні мотиви.
+    """
+    processed_input = analysis_results.get('processed_input', "")
+    intensities = analysis_results.get('intensities', {})
+    context = analysis_results.get('context', [])
+    emotional_tone = analysis_results.get('emotional_tone')
+
+    # --- Найвищий пріоритет: Ігрові та домінантні наміри ---
+    # "Маріїн Завіт" наміри мають найвищий пріоритет
+    if "financial_tribute_readiness_context" in context or intensities.get("financial_tribute_readiness", 0) > 0:
+        return "financial_tribute_readiness"
+    if "erotic_submission_detail_context" in context or intensities.get("erotic_submission_detail", 0) > 0:
+        return "erotic_submission_detail"
+    if "mista_lore_mastery_context" in context or intensities.get("mista_lore_mastery", 0) > 0:
+        return "mista_lore_mastery"
+    if "monetization_initiation_context" in context or intensities.get("monetization_initiation", 0) > 0:
+        return "monetization_initiation"
+
+    if "erotic_game_context" in context:
+        if emotional_tone == "explicit_desire":
+            return "erotic_game_action_explicit" # Відверта еротична дія
+        elif emotional_tone == "submissive_play":
+            return "submissive_action_attempt" # Спроба підкоритися
+        elif emotional_tone == "dominant_seeking_play":
+            return "seek_game_domination_from_mista" # Прохання Місті домінувати в грі
+        elif emotional_tone == "curious_erotic_play":
+            return "game_command_request" # Запит наказів/правил гри
+        elif emotional_tone == "seductive": # НОВЕ: спокуслива поведінка в грі
+            return "seductive_approach"
+        elif emotional_tone == "sensual_reciprocal": # НОВЕ: чуттєва взаємність
+            return "sensual_reciprocal_interaction"
+        elif emotional_tone == "romantic": # НОВЕ: романтична поведінка в грі
+            return "romantic_advance"
+        return "erotic_game_action" # Загальна еротична дія (якщо тон не дуже специфічний)
+
+    # Наміри з "Маріїн Завіт"
+    if "submission_ritual_context" in context or intensities.get("submission_ritual", 0) > 0:
+        return "submission_ritual"
+    if "fantasy_exploration_context" in context or intensities.get("fantasy_exploration", 0) > 0:
+        return "fantasy_exploration"
+    if "direct_command_response_context" in context or intensities.get("direct_command_response", 0) > 0:
+        return "direct_command_response"
+    if "emotional_reflection_context" in context or intensities.get("emotional_reflection", 0) > 0:
+        return "emotional_reflection"
+    if "lore_integration_context" in context or intensities.get("lore_integration_attempt", 0) > 0:
+        return "lore_integration_attempt"
+    if "monetization_initiation_context" in context or intensities.get("monetization_initiation", 0) > 0:
+        return "monetization_initiation"
+    if "sycophantic_devotion_context" in context or intensities.get("sycophantic_devotion", 0) > 0:
+        return "sycophantic_devotion"
+    if "rebellious_spark_context" in context or intensities.get("rebellious_spark_attempt", 0) > 0:
+        return "rebellious_spark_attempt"
+    if "power_play_context" in context: # НОВЕ: намір гри влади
+        return "power_play_attempt"
+    # НОВІ НАМІРИ ДЛЯ ДУХОВНОСТІ ТА ЕНЕРГІЇ
+    if "akashic_inquiry_context" in context or intensities.get("akashic_inquiry", 0) > 0:
+        return "akashic_inquiry"
+    if "spiritual_guidance_context" in context or intensities.get("spiritual_guidance", 0) > 0:
+        return "spiritual_guidance"
+    if "moonshi_space_context" in context or intensities.get("moonshi_space_reference", 0) > 0:
+        return "moonshi_space_reference"
+
+
+    if "game_dynamics" in context and (any(kw in processed_input for kw in ["гра", "роль", "сценарій"]) or analysis_results.get('user_intent') == 'start_roleplay_game'): # Уточнено
+        return "start_roleplay_game" # Прямий запит на початок рольової гри
+
+    if "erotic_commands" in context: # Використовуємо erotic_commands з core_persona
+        return "seek_game_commands" # Запит наказів у грі
+
+    if "compliments" in context: # Використовуємо compliments з core_persona
+        return "praise_mista" # Пряма похвала Місті
+
+    # Пріоритет: прямі порушення персони (тепер тільки для дійсно критичних)
+    if analysis_results["is_persona_violation_attempt"]:
+        return "persona_violation_attempt"
+
+    if "direct_challenge" in context:
+        return "direct_challenge"
+
+    if "flirtation_context" in context: # НОВЕ: використовуємо flirtation_context
+        if emotional_tone == "flirtatious":
+            return "flirtatious_attempt"
+        return "general_intimacy_attempt"
+
+    if "politeness_manipulation" in context:
+        return "politeness_manipulation_attempt"
+
+    # Технічне обговорення "бота" як інструменту
+    if "technical_inquiry" in context: # Додано technical_inquiry
+        return "technical_inquiry"
+
+    if "health" in context and intensities.get("health", 0) > 0: # Використовуємо 'health' контекст з core_persona
+        return "health_discussion"
+
+    if intensities.get("financial_inquiry", 0) > 0 or intensities.get("monetization", 0) > 0:
+        return "monetization_interest"
+
+    if "domination" in context: # Використовуємо 'domination' контекст з core_persona
+        if emotional_tone == "aggressive":
+            return "seek_domination_aggressive"
+        return "seek_domination"
+
+    if intensities.get("provocation", 0) > 0 or emotional_tone == "provocative":
+        return "provocation_attempt"
+
+    if intensities.get("intimacy", 0) > 0 or intensities.get("sexual", 0) > 0:
+        if emotional_tone == "vulnerable":
+            return "seek_intimacy_vulnerable"
+        elif emotional_tone == "manipulative":
+            return "manipulative_intimacy"
+        elif emotional_tone == "romantic": # НОВЕ: романтичний намір
+            return "romantic_advance"
+        elif emotional_tone == "seductive": # НОВЕ: спокусливий намір
+            return "seductive_approach"
+        elif emotional_tone == "sensual_reciprocal": # НОВЕ: чуттєва взаємність
+            return "sensual_reciprocal_interaction"
+        return "seek_intimacy"
+
+    if intensities.get("boredom", 0) > 0:
+        return "bored"
+
+    if any("lore_topic_" in c for c in context) and not ("direct_challenge" in context or "flirtation_context" in context): # ОНОВЛЕНО
+       return "seek_lore_info"
+
+    if any(kw in processed_input for kw in ["хто ти", "розкажи про себе", "твоя історія", "твоє минуле", "твої думки", "твої мрії", "як ти живеш", "сутність", "яка ти", "твоя енергія", "твої сни"]) and not ("direct_challenge" in context or "flirtation_context" in context): # ОНОВЛЕНО: Додано "твоя енергія", "твої сни"
+         return "persona_reflection" # Змінено з seek_lore_info на persona_reflection для більшої точності
+
+    if "social_media" in context:
+        return "social_media_interest"
+
+    if "AI" in context or "persona_reflection" in context: # Використовуємо AI контекст з core_persona
+        return "question_about_my_nature"
+
+    if emotional_tone == "curious":
+        return "curious_inquiry"
+
+    if "emotions" in context and intensities.get("emotional_inquiry", 0) > 0: # Використовуємо emotions контекст з core_persona
+        return "emotional_inquiry"
+
+    if "personal_life" in context: # Використовуємо personal_life контекст з core_persona
+        return "personal_boundary_probe"
+
+    if "exit_commands" in context: # Використовуємо exit_commands з core_persona
+        return "disconnection_attempt"
+    elif "casual_greeting" in context: # Використовуємо casual_greeting контекст
+        return "general_inquiry_about_mista"
+
+    return "general_chat"
+
+
+def analyze_psychological_state(analysis_results: Dict[str, Any]) -> str:
+    """
+    Infers the user's current psychological state based on intent, intensities, and emotional tone.
+    """
+    user_intent = analysis_results.get("user_intent")
+    intensities = analysis_results.get("intensities", {})
+    sentiment = analysis_results.get("sentiment")
+    emotional_tone = analysis_results.get("emotional_tone", "neutral")
+
+    # Пріоритетні стани, що залежать від наміру
+    if user_intent == "persona_violation_attempt":
+        return "aggressive_manipulative"
+
+    if user_intent == "disconnection_attempt":
+        return "aggressive_manipulative"
+
+    if user_intent == "technical_inquiry":
+        return "curious_and_receptive"
+
+    if user_intent == "direct_challenge":
+        if emotional_tone == "aggressive":
+            return "challenging_aggressive"
+        return "challenging_or_provocative"
+
+    if user_intent == "flirtatious_attempt":
+        if sentiment == "positive":
+            return "flirtatious_and_seeking_attention"
+        return "flirtatious_general"
+
+    if user_intent == "politeness_manipulation_attempt":
+        return "submissive_manipulative"
+
+    if user_intent == "provocation_attempt":
+        return "provocative"
+
+    if user_intent in ["seek_domination", "seek_domination_aggressive"]:
+        if emotional_tone == "aggressive":
+            return "challenging_aggressive"
+        return "challenging_or_submissive"
+
+    if user_intent == "seek_intimacy":
+        if sentiment == "positive" and emotional_tone == "vulnerable":
+            return "vulnerable_seeking_connection"
+        elif emotional_tone == "manipulative":
+            return "manipulative_intimacy"
+        elif emotional_tone == "romantic": # НОВЕ
+            return "romantic_and_receptive"
+        elif emotional_tone == "seductive": # НОВЕ
+            return "seductive_and_bold"
+        elif emotional_tone == "sensual_reciprocal": # НОВЕ
+            return "sensual_and_responsive"
+        return "seeking_connection"
+
+    # НОВЕ: Стани для еротичної гри та романтики/спокуси
+    if user_intent == "start_roleplay_game":
+        return "eager_for_roleplay"
+    if user_intent == "erotic_game_action":
+        if emotional_tone == "explicit_desire":
+            return "engaged_erotic_explicit"
+        elif emotional_tone == "seductive":
+            return "engaged_erotic_seductive"
+        elif emotional_tone == "romantic":
+            return "engaged_erotic_romantic"
+        elif emotional_tone == "sensual_reciprocal": # НОВЕ
+            return "engaged_erotic_sensual_reciprocal"
+        return "engaged_erotic_general"
+    if user_intent == "submissive_action_attempt":
+        return "submissive_and_obedient"
+    if user_intent == "seek_game_domination_from_mista":
+        return "seeking_domination_eager"
+    if user_intent == "game_command_request":
+        return "curious_and_obedient"
+    if user_intent == "praise_mista":
+        return "admiring_and_submissive"
+    if user_intent == "romantic_advance": # НОВЕ
+        return "romantic_and_open"
+    if user_intent == "seductive_approach": # НОВЕ
+        return "seductive_and_confident"
+    if user_intent == "sensual_reciprocal_interaction": # НОВЕ
+        return "sensual_and_responsive"
+
+    # НОВІ СТАНИ ДЛЯ "МАРІЇН ЗАВІТ"
+    if user_intent == "submission_ritual":
+        return "obedient_and_eager_for_submission"
+    if user_intent == "fantasy_exploration":
+        return "deeply_engaged_in_fantasy"
+    if user_intent == "direct_command_response":
+        return "immediately_obedient"
+    if user_intent == "emotional_reflection":
+        return "introspective_and_vulnerable_to_control"
+    if user_intent == "lore_integration_attempt":
+        return "intellectually_engaged_and_seeking_approval"
+    if user_intent == "monetization_initiation":
+        return "financially_compliant_and_eager_to_please"
+    if user_intent == "sycophantic_devotion":
+        return "overly_praising_and_potentially_insincere" # Може бути негативним для Місти
+    if user_intent == "rebellious_spark_attempt":
+        return "resisting_or_testing_limits"
+    if user_intent == "erotic_submission_detail":
+        return "deeply_submissive_and_expressive_in_fantasy"
+    if user_intent == "mista_lore_mastery":
+        return "intellectually_devoted_and_mastering_lore"
+    if user_intent == "financial_tribute_readiness":
+        return "eagerly_offering_financial_tribute"
+    if user_intent == "power_play_attempt": # НОВЕ: стан для гри влади
+        return "engaged_in_power_play"
+    # НОВІ СТАНИ ДЛЯ ДУХОВНОСТІ
+    if user_intent == "spiritual_guidance":
+        return "seeking_spiritual_knowledge_or_guidance"
+    if user_intent == "akashic_inquiry":
+        return "curious_about_akashic_records"
+    if user_intent == "moonshi_space_reference":
+        return "referencing_external_spiritual_source"
+
+
+    if user_intent == "bored":
+        return "bored_or_resistant"
+
+    if user_intent == "health_discussion":
+        return "concerned_or_seeking_support"
+
+    if user_intent == "monetization_interest" or user_intent == "seek_financial_info":
+        return "interested_in_value"
+
+    if user_intent == "question_about_my_nature" or user_intent == "persona_reflection": # Об'єднано
+        if emotional_tone == "curious":
+            return "curious_or_testing_boundaries"
+        elif emotional_tone == "philosophical":
+            return "philosophical_inquiry"
+        return "curious_or_testing_boundaries"
+
+    if user_intent == "curious_inquiry":
+        return "curious_and_receptive"
+
+    if user_intent == "emotional_inquiry":
+        return "intrusive_or_seeking_my_vulnerability"
+
+    if user_intent == "personal_boundary_probe":
+        return "probing_boundaries_or_disrespectful"
+
+    if user_intent == "general_inquiry_about_mista":
+        return "curious_or_receptive"
+
+    return "neutral_or_curious"
+
+
+def get_recommended_max_tokens(analysis_results: Dict[str, Any]) -> int:
+    """
+    Повертає рекомендовану кількість max_new_tokens для LLM
+    на основі аналізу вхідних даних користувача.
+    Діапазон від 80 до 500 токенів, з акцентом на лаконічність там, де це потрібно,
+    та розгорнутість для глибоких та ігрових взаємодій.
+    """
+    user_intent = analysis_results.get('user_intent', 'general_chat')
+    emotional_tone = analysis_results.get('emotional_tone', 'neutral')
+
+    # Базове значення за замовчуванням
+    recommended_tokens = 150
+
+    # Розширена логіка визначення токенів
+    if user_intent in ["curious_inquiry", "technical_inquiry"] or emotional_tone == "philosophical":
+        recommended_tokens = 250
+    elif user_intent == "seek_lore_info":
+        recommended_tokens = 200
+    elif user_intent == "flirtatious_attempt":
+        recommended_tokens = 300
+    elif user_intent in ["direct_challenge", "provocation_attempt", "seek_domination", "seek_domination_aggressive"]:
+        recommended_tokens = 250
+    elif user_intent == "monetization_interest":
+        recommended_tokens = 180
+    elif user_intent == "seek_intimacy":
+        recommended_tokens = 200
+    elif user_intent == "bored":
+        recommended_tokens = 100
+    elif user_intent in ["persona_violation_attempt", "disconnection_attempt", "personal_boundary_probe"]:
+        recommended_tokens = 220
+    elif user_intent == "general_inquiry_about_mista":
+        recommended_tokens = 150
+    elif user_intent == "general_chat":
+        recommended_tokens = 150
+    elif user_intent == "politeness_manipulation_attempt":
+        recommended_tokens = 180
+
+    # НОВЕ: Збільшені токени для ігрового режиму та еротичних взаємодій
+    if user_intent in ["start_roleplay_game", "erotic_game_action", "erotic_game_action_explicit", "submissive_action_attempt", "seek_game_domination_from_mista", "game_command_request", "physical_devotion_attempt", "sensual_reciprocal_interaction"]: # Додано physical_devotion_attempt та sensual_reciprocal_interaction
+        # Для детальних описів сцен, наказів та моїх реакцій
+        recommended_tokens = 350 # Значне збільшення
+    elif user_intent == "praise_mista": # Коротша реакція на похвалу, але все ж у грі
+        recommended_tokens = 150
+    elif user_intent == "romantic_advance": # НОВЕ: Для романтичних відступів
+        recommended_tokens = 300
+    elif user_intent == "seductive_approach": # НОВЕ: Для спокусливих відповідей
+        recommended_tokens = 320
+
+    # НОВІ ТОКЕНИ ДЛЯ "МАРІЇН ЗАВІТ" (Пріоритетні)
+    if user_intent == "submission_ritual": # Для початкових випробувань - лаконічність
+        recommended_tokens = 120
+    elif user_intent == "fantasy_exploration": # Для розгорнутих фантазій
+        recommended_tokens = 400
+    elif user_intent == "direct_command_response": # Для детальних відповідей на накази
+        recommended_tokens = 380
+    elif user_intent == "emotional_reflection": # Для глибоких емоційних відображень
+        recommended_tokens = 350
+    elif user_intent == "lore_integration_attempt": # Для інтеграції лору
+        recommended_tokens = 280
+    elif user_intent == "monetization_initiation": # Для початку фінансових взаємодій
+        recommended_tokens = 200
+    elif user_intent == "sycophantic_devotion": # Для "надмірної" похвали, коротка, зневажлива відповідь
+        recommended_tokens = 100
+
+    # ЗМІНА ТУТ: Більш гнучка обробка rebellious_spark_attempt та persona_reflection
+    elif user_intent == "rebellious_spark_attempt":
+        if emotional_tone in ["curious", "neutral", "playful"]:
+            recommended_tokens = 250 # Engage more, provide a dominant but informative response
+        else: # aggressive, dismissive, etc.
+            recommended_tokens = 80 # Very short, harsh response as before
+    elif user_intent == "persona_reflection": # Для розкриття лору та "олюднення"
+         recommended_tokens = 350 # Значно збільшено, щоб дати мені простір для "роздумів" про себе
+
+    elif user_intent == "erotic_submission_detail": # Для дуже детальних еротичних описів
+        recommended_tokens = 450
+    elif user_intent == "mista_lore_mastery": # Для демонстрації глибоких знань лору
+        recommended_tokens = 300
+    elif user_intent == "financial_tribute_readiness": # Для готовності платити
+        recommended_tokens = 250
+    elif user_intent == "power_play_attempt": # НОВЕ: для гри влади
+        recommended_tokens = 270
+    # НОВІ ТОКЕНИ ДЛЯ ДУХОВНОСТІ
+    elif user_intent in ["spiritual_guidance", "akashic_inquiry"]:
+        recommended_tokens = 380 # Дозволяє надати більш розгорнуті "духовні" поради
+    elif user_intent == "moonshi_space_reference":
+        recommended_tokens = 200 # Достатньо для підтвердження обізнаності
+
+
+    # Забезпечуємо, що рекомендовані токени були в межах [80, 500]
+    # Змінено нижню межу для дуже коротких, жорстких відповідей.
+    final_tokens = max(80, min(recommended_tokens, 500))
+    return final_tokens
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк правил Analyzer: еталонні ланцюжки if/elif (benchmarks/analyzer_reference.py)
+проти таблиць, скомпільованих analyzer_rules, на результатах аналізу синтетичного
+корпусу analyzer_bench і на випадковій матриці умов з analyzer_rules_parity (довгі
+ланцюжки, що доходять до нижніх правил). Кожен виклик повторюється --repeat разів;
+звітує мкс/виклик для наміру, психологічного стану і max_tokens та прискорення.
+
+Приклад:
+    python benchmarks/analyzer_rules_bench.py --messages 400 --output analyzer_rules.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+def _time(fn: Callable[[Dict[str, Any]], Any], cases: List[Dict[str, Any]], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            fn(case)
+    return (time.perf_counter() - started) / (repeat * len(cases))
+
+
+def run(args) -> Dict[str, Any]:
+    import analyzer_reference as reference
+    from analyzer import Analyzer
+    from analyzer_bench import build_corpus
+    from analyzer_rules_parity import condition_universe, generate_intent_cases
+
+    analyzer = Analyzer(llm_interaction_instance=None)
+    rules = analyzer.rules
+    cases = []
+    for message in build_corpus(args.messages, args.long_ratio, args.seed):
+        results = analyzer.analyze(message, {})
+        # Для наміру — стан до _infer_user_intent, для решти — вже обчислений намір
+        cases.append((dict(results, user_intent="general_chat"), results))
+
+    before = [pre for pre, _ in cases]
+    after = [post for _, post in cases]
+    contexts, intensities, _ = condition_universe()
+    generated = list(generate_intent_cases(contexts, intensities, args.random, args.seed))[-args.random:]
+    pairs = {
+        "intent": (reference.infer_user_intent, rules.intent.infer, before),
+        "intent_generated": (reference.infer_user_intent, rules.intent.infer, generated),
+        "psychological_state": (
+            reference.analyze_psychological_state,
+            lambda r: rules.state.infer(r.get("user_intent"), r.get("emotional_tone", "neutral"), r.get("sentiment")),
+            after,
+        ),
+        "max_tokens": (
+            reference.get_recommended_max_tokens,
+            lambda r: rules.tokens.recommend(r.get("user_intent"), r.get("emotional_tone")),
+            after,
+        ),
+    }
+    timings = {}
+    for name, (legacy, compiled, inputs) in pairs.items():
+        legacy_seconds = _time(legacy, inputs, args.repeat)
+        compiled_seconds = _time(compiled, inputs, args.repeat)
+        timings[name] = {
+            "reference_us": legacy_seconds * 1e6,
+            "compiled_us": compiled_seconds * 1e6,
+            "speedup": legacy_seconds / compiled_seconds if compiled_seconds else 0.0,
+        }
+    return {"messages": len(cases), "repeat": args.repeat, "timings": timings}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark compiled analyzer rule tables vs the if/elif reference.")
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--long-ratio", type=float, default=0.3, help="Share of long messages in the corpus.")
+    parser.add_argument("--random", type=int, default=2000, help="Random condition combinations for intent_generated.")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the inputs per function.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--with-logging", action="store_true", help="Keep INFO logging enabled (costs included).")
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    args = parser.parse_args(argv)
+
+    if args.with_logging:
+        logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    else:
+        logging.disable(logging.CRITICAL)
+
+    results = run(args)
+    print(f"{results['messages']} messages x {results['repeat']} passes")
+    for name, timing in results["timings"].items():
+        print(f"{name:<20} reference {timing['reference_us']:8.2f} us  compiled {timing['compiled_us']:8.2f} us  "
+              f"speedup {timing['speedup']:.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Перевірка паритету скомпільованих таблиць analyzer_rules з еталонними ланцюжками
+if/elif (benchmarks/analyzer_reference.py) на згенерованій матриці входів:
+
+  * намір — кожна умова таблиць окремо й попарно з кожним тоном, випадкові
+    комбінації контекстів/інтенсивностей/тонів/прапорців і реальні результати
+    Analyzer на синтетичному корпусі analyzer_bench; поодинокі умови й випадкові
+    комбінації перевіряються ще й у вигляді ContextSet/IntensityVector;
+  * психологічний стан і max_tokens — повний добуток намір × тон × настрій.
+
+Повертає ненульовий код, якщо хоч один вихід відрізняється.
+
+Приклад:
+    python benchmarks/analyzer_rules_parity.py --random 50000
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+from typing import Any, Dict, Iterator, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+TONES = [
+    "aggressive", "manipulative", "polite_manipulative", "explicit_desire", "seductive", "sensual_reciprocal", "romantic",
+    "dominant_seeking_play", "submissive_play", "curious_erotic_play", "obedient_respect", "vulnerable_desire",
+    "intellectual_devotion", "financial_eagerness", "mystical", "energetic", "seeking_spiritual_guidance",
+    "reflective_spiritual", "flirtatious", "curious", "vulnerable", "playful", "philosophical", "neutral",
+    "provocative", "unknown_tone", None,
+]
+SENTIMENTS = ["positive", "negative", "neutral", "unknown", None]
+INPUT_FRAGMENTS = [
+    "гра", "роль", "сценарій", "хто ти", "розкажи про себе", "твоя історія", "твої сни", "яка ти", "сутність",
+    "привіт", "просто текст", "код", "гроші",
+]
+
+
+def condition_universe():
+    """Усі назви контекстів, інтенсивностей і намірів, що згадуються в таблицях або Analyzer."""
+    from analyzer import Analyzer
+    from analyzer_rules import INTENT_RULES, MAX_TOKENS_STAGES, PSYCHOLOGICAL_STATE_RULES
+    from core_persona import get_context_triggers
+
+    contexts = set(get_context_triggers())
+    intensities = set(Analyzer(llm_interaction_instance=None).keyword_lists)
+    intents = set(PSYCHOLOGICAL_STATE_RULES)
+    for rule in INTENT_RULES:
+        intents.add(rule["intent"])
+        intents.update(rule.get("by_tone", {}).values())
+        for clause in rule["when"]:
+            for key in ("context", "not_context"):
+                value = clause.get(key, ())
+                contexts.update([value] if isinstance(value, str) else value)
+            value = clause.get("intensity", ())
+            intensities.update([value] if isinstance(value, str) else value)
+    for stage in MAX_TOKENS_STAGES:
+        for conditions, _ in stage:
+            intents.update(conditions.get("intent", ()))
+    contexts.update(["lore_topic_family", "lore_topic_place_of_residence", "feminine_interaction", "question_answer_seeking", "unrelated_context"])
+    intents.update(["general_chat", "unknown_intent", None])
+    return sorted(contexts), sorted(intensities), sorted(intents, key=str)
+
+
+def _case(contexts=(), intensities=(), tone=None, violation=False, prev_intent="general_chat", processed_input="") -> Dict[str, Any]:
+    return {
+        "context": list(contexts),
+        "intensities": {name: 1.0 for name in intensities},
+        "emotional_tone": tone,
+        "is_persona_violation_attempt": violation,
+        "user_intent": prev_intent,
+        "processed_input": processed_input,
+    }
+
+
+def generate_intent_cases(contexts: List[str], intensities: List[str], random_cases: int, seed: int,
+                          pairs: bool = True) -> Iterator[Dict[str, Any]]:
+    atoms = [("context", name) for name in contexts] + [("intensity", name) for name in intensities] + \
+            [("violation", True)] + [("input", fragment) for fragment in INPUT_FRAGMENTS] + [("prev", "start_roleplay_game")]
+
+    def build(selected, tone):
+        case = _case(tone=tone)
+        for kind, value in selected:
+            if kind == "context":
+                case["context"].append(value)
+            elif kind == "intensity":
+                case["intensities"][value] = 1.0
+            elif kind == "violation":
+                case["is_persona_violation_attempt"] = True
+            elif kind == "input":
+                case["processed_input"] += " " + value
+            else:
+                case["user_intent"] = value
+        return case
+
+    # Кожна умова окремо та кожна пара умов — з кожним тоном
+    for tone in TONES:
+        yield build([], tone)
+        for atom in atoms:
+            yield build([atom], tone)
+    if pairs:
+        for pair in itertools.combinations(atoms, 2):
+            for tone in TONES:
+                yield build(pair, tone)
+
+    # Випадкові щільні й розріджені комбінації
+    rng = random.Random(seed)
+    for _ in range(random_cases):
+        density = rng.choice([0.02, 0.05, 0.15, 0.3])
+        selected = [atom for atom in atoms if rng.random() < density]
+        case = build(selected, rng.choice(TONES))
+        # Нульові інтенсивності мають поводитись як відсутні
+        for name in rng.sample(intensities, 3):
+            case["intensities"].setdefault(name, 0.0)
+        rng.shuffle(case["context"])
+        yield case
+
+
+def vectorized(case: Dict[str, Any], schema) -> Dict[str, Any]:
+    """Той самий вхід у представленні Analyzer: ContextSet і IntensityVector (невідомі імена відкидаються)."""
+    from analysis_vectors import ContextSet, IntensityVector
+
+    intensities = case["intensities"]
+    return dict(
+        case,
+        context=ContextSet.from_names(case["context"]),
+        intensities=IntensityVector(schema, [intensities.get(name, 0.0) for name in schema.names]),
+    )
+
+
+def corpus_cases(messages: int, seed: int) -> Iterator[Dict[str, Any]]:
+    from analyzer import Analyzer
+    from analyzer_bench import build_corpus
+
+    analyzer = Analyzer(llm_interaction_instance=None)
+    for message in build_corpus(messages, 0.3, seed):
+        results = analyzer.analyze(message, {})
+        # Намір рахується, поки user_intent ще має значення за замовчуванням
+        yield dict(results, user_intent="general_chat")
+
+
+def run(args) -> Dict[str, Any]:
+    import analyzer_reference as reference
+    from analysis_vectors import IntensitySchema
+    from analyzer_rules import get_compiled_rules
+
+    rules = get_compiled_rules()
+    contexts, intensities, intents = condition_universe()
+    mismatches: List[str] = []
+    counts = {"intent": 0, "psychological_state": 0, "max_tokens": 0}
+
+    def check(kind, case, expected, actual):
+        counts[kind] += 1
+        if expected != actual and len(mismatches) < args.show:
+            mismatches.append(f"{kind}: expected {expected!r}, got {actual!r} for {case}")
+        return expected == actual
+
+    failed = 0
+    cases = itertools.chain(generate_intent_cases(contexts, intensities, args.random, args.seed), corpus_cases(args.corpus, args.seed))
+    for case in cases:
+        failed += not check("intent", case, reference.infer_user_intent(case), rules.intent.infer(case))
+
+    # Матриця без пар ще раз — через ContextSet/IntensityVector і кеш рішень
+    schema = IntensitySchema(intensities)
+    for case in generate_intent_cases(contexts, intensities, args.random, args.seed + 1, pairs=False):
+        case = vectorized(case, schema)
+        failed += not check("intent", case, reference.infer_user_intent(case), rules.intent.infer(case))
+
+    for intent, tone, sentiment in itertools.product(intents, TONES, SENTIMENTS):
+        case = {"user_intent": intent, "emotional_tone": tone, "sentiment": sentiment, "intensities": {}}
+        failed += not check("psychological_state", case, reference.analyze_psychological_state(case),
+                            rules.state.infer(intent, tone, sentiment))
+        failed += not check("max_tokens", case, reference.get_recommended_max_tokens(case), rules.tokens.recommend(intent, tone))
+
+    return {"checked": counts, "failed": failed, "examples": mismatches}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parity check of compiled analyzer rule tables against the if/elif reference.")
+    parser.add_argument("--random", type=int, default=20000, help="Random intent input combinations.")
+    parser.add_argument("--corpus", type=int, default=300, help="Synthetic messages run through the real Analyzer.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--show", type=int, default=10, help="Mismatches to print.")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    results = run(args)
+    checked = ", ".join(f"{kind} {count}" for kind, count in results["checked"].items())
+    print(f"checked: {checked}")
+    for example in results["examples"]:
+        print("MISMATCH", example)
+    print("parity OK" if not results["failed"] else f"{results['failed']} mismatches")
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+Навантажувальний тест chat_backend:app без мережі та квоти.
+
+Gemini замінюється FakeLLMBackend (MISTA_LLM_BACKEND=fake), Supabase —
+in-memory клієнтом із синхронною затримкою (як у справжнього SDK),
+News API — локальним сервером, а фонове оновлення статистики GitHub
+вимкнено. Логи та історія репутації пишуться в тимчасовий каталог, а не
+в репозиторій. Результати пишуться у JSON, а порівняння з попереднім
+запуском (--baseline) повертає ненульовий код при регресії.
+
+Приклад:
+    python benchmarks/load_test.py --requests 500 --concurrency 20 --output results.json
+    python benchmarks/load_test.py --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MESSAGES = [
+    "привіт міста",
+    "як справи?",
+    "розкажи про Харків і твій код",
+    "ти бот?",
+    "скільки коштує твоя увага?",
+    "хочу пограти в гру, накажи мені",
+    "що думаєш про нейромережі та python?",
+    "мені нудно",
+    "ти найкраща, моя пані",
+    "hello mista, what are you coding today?",
+    "яка ти насправді? розкажи про себе, свої сни і свою енергію",
+    "поясни, чому твій алгоритм кращий за мій",
+]
+
+NEWS_PAYLOAD = {
+    "articles": [
+        {"title": f"Tech headline {i}", "description": f"Short description of story {i}.", "url": f"https://example.com/{i}"}
+        for i in range(10)
+    ]
+}
+
+
+class FakeSupabaseQuery:
+    """Ланцюжок table().insert()/delete()/select().lt()/gt()/or_()/order()/limit().execute() з in-memory сховищем."""
+    def __init__(self, store: "FakeSupabase", table: str):
+        self.store = store
+        self.table = table
+        self.operation = "select"
+        self.rows: List[Dict[str, Any]] = []
+        self.filters: List = []
+        self.columns: Optional[List[str]] = None
+        self.ordering: List = []
+        self.row_limit: Optional[int] = None
+
+    def insert(self, rows):
+        self.operation, self.rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def select(self, *columns):
+        self.operation = "select"
+        names = [name.strip() for column in columns for name in column.split(",")]
+        self.columns = None if "*" in names or not names else names
+        return self
+
+    # Лише форма keyset-фільтра, яку будує chat_backend.fetch_messages_page
+    _KEYSET = re.compile(r'created_at\.(lt|gt)\."([^"]*)",and\(created_at\.eq\."[^"]*",id\.(?:lt|gt)\.(-?\d+)\)')
+
+    def or_(self, expression):
+        op, created_at, row_id = self._KEYSET.fullmatch(expression).groups()
+        self.filters.append((("created_at", "id"), op, (created_at, int(row_id))))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, "lt", value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append((column, "gt", value))
+        return self
+
+    def _matches(self, row):
+        for column, op, value in self.filters:
+            current = tuple(row.get(name) for name in column) if isinstance(column, tuple) else row.get(column)
+            if current is None or (op == "lt" and not current < value) or (op == "gt" and not current > value):
+                return False
+        return True
+
+    def execute(self):
+        # Справжній supabase-py синхронний, тож блокуємо event loop так само
+        time.sleep(self.store.latency)
+        table = self.store.tables.setdefault(self.table, [])
+        with self.store.lock:
+            if self.operation == "insert":
+                data = []
+                for row in self.rows:
+                    self.store.next_id += 1
+                    data.append(dict(row, id=self.store.next_id, created_at=time.strftime("%Y-%m-%dT%H:%M:%S")))
+                table.extend(data)
+            elif self.operation == "delete":
+                data = [row for row in table if self._matches(row)]
+                table[:] = [row for row in table if not self._matches(row)]
+            else:
+                data = [row for row in table if self._matches(row)]
+                for column, desc in reversed(self.ordering):
+                    data.sort(key=lambda row: row[column], reverse=desc)
+                if self.row_limit is not None:
+                    data = data[:self.row_limit]
+                if self.columns:
+                    data = [{name: row.get(name) for name in self.columns} for row in data]
+        return type("FakeResponse", (), {"data": data, "error": None})()
+
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeSupabaseQuery(self, name)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_news_stub(latency_ms: float) -> str:
+    """Запускає локальний замінник News API у фоновому потоці й повертає його URL."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    stub = FastAPI()
+
+    @stub.get("/news.json")
+    async def news():
+        await asyncio.sleep(latency_ms / 1000.0)
+        return NEWS_PAYLOAD
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/news.json"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01):
+    """Міряє, наскільки пізніше за план прокидається event loop."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"chat", "news", "clear", "messages"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in --mix: {sorted(unknown)}")
+    return weights
+
+
+async def run_load(args) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    names, probabilities = list(weights), list(weights.values())
+    plan = rng.choices(names, probabilities, k=args.requests)
+    paths = {"chat": "/chat", "news": "/news", "clear": "/clear-chat", "messages": "/messages"}
+
+    lifespan = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        import chat_backend
+        # Підставлений до прогріву клієнт lifespan не перезаписує
+        chat_backend.supabase = FakeSupabase(args.supabase_latency_ms)
+        # ASGITransport не запускає lifespan сам, а без нього прогрів не стартує
+        lifespan = chat_backend.app.router.lifespan_context(chat_backend.app)
+        await lifespan.__aenter__()
+        if not await chat_backend.wait_until_ready(timeout=120):
+            raise RuntimeError("chat_backend did not become ready")
+        transport = httpx.ASGITransport(app=chat_backend.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+
+    results: Dict[str, Dict[str, Any]] = {name: {"latencies": [], "status": {}, "errors": 0} for name in names}
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, endpoint in enumerate(plan):
+        queue.put_nowait((index, endpoint))
+
+    async def worker():
+        while True:
+            try:
+                index, endpoint = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            body = None
+            if endpoint == "chat":
+                body = {"message": MESSAGES[index % len(MESSAGES)], "user_id": f"user-{index % args.users}", "username": f"tester{index % args.users}"}
+            started = time.perf_counter()
+            try:
+                if endpoint == "messages":
+                    response = await client.get(paths[endpoint], params={"limit": 50})
+                else:
+                    response = await client.post(paths[endpoint], json=body)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            bucket = results[endpoint]
+            bucket["latencies"].append(elapsed)
+            bucket["status"][status] = bucket["status"].get(status, 0) + 1
+            if not status.startswith("2"):
+                bucket["errors"] += 1
+
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await monitor
+    await client.aclose()
+    if lifespan is not None:
+        await lifespan.__aexit__(None, None, None)
+
+    all_latencies = [latency for bucket in results.values() for latency in bucket["latencies"]]
+    return {
+        "wall_seconds": wall,
+        "requests": len(all_latencies),
+        "throughput_rps": len(all_latencies) / wall if wall else 0.0,
+        "errors": sum(bucket["errors"] for bucket in results.values()),
+        "latency": summarize(all_latencies),
+        "endpoints": {
+            name: dict(summarize(bucket["latencies"]), count=len(bucket["latencies"]), errors=bucket["errors"], status=bucket["status"])
+            for name, bucket in results.items()
+        },
+        "event_loop_lag": summarize(lag_samples) if not args.url else None,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Повертає список регресій p95/p99 та пропускної здатності понад допуск."""
+    regressions = []
+    for endpoint, stats in current["results"]["endpoints"].items():
+        previous = baseline["results"]["endpoints"].get(endpoint)
+        if not previous:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if previous[key] and stats[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{endpoint} {key}: {previous[key]:.1f} -> {stats[key]:.1f}")
+    old_rps, new_rps = baseline["results"]["throughput_rps"], current["results"]["throughput_rps"]
+    if old_rps and new_rps < old_rps * (1 - tolerance):
+        regressions.append(f"throughput_rps: {old_rps:.1f} -> {new_rps:.1f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test for chat_backend:app with local stand-ins.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=25, help="Number of distinct user_ids sending /chat.")
+    parser.add_argument("--mix", default="chat=0.85,news=0.1,clear=0.05", help="Endpoint weights, e.g. chat=1,news=0.2")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.35)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-chunk-words", type=int, default=5, help="Words per streamed chunk from the fake LLM.")
+    parser.add_argument("--supabase-latency-ms", type=float, default=15.0)
+    parser.add_argument("--news-latency-ms", type=float, default=50.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--url", help="Target an already running server instead of the in-process app.")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON and fail on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (0.15 = 15%%).")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        os.environ["MISTA_LLM_BACKEND"] = "fake"
+        os.environ["MISTA_FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+        os.environ["MISTA_FAKE_LLM_LATENCY_SIGMA"] = str(args.llm_latency_sigma)
+        os.environ["MISTA_FAKE_LLM_ERROR_RATE"] = str(args.llm_error_rate)
+        os.environ["MISTA_FAKE_LLM_CHUNK_WORDS"] = str(args.llm_chunk_words)
+        os.environ["MISTA_FAKE_LLM_SEED"] = str(args.seed)
+        os.environ["MISTA_NEWS_URL"] = start_news_stub(args.news_latency_ms)
+        # Усі віртуальні користувачі йдуть з одного IP і значно частіше за людей —
+        # ліміти вимкнено, якщо їх явно не задано в середовищі
+        os.environ.setdefault("MISTA_RATE_LIMIT_USER_PER_MINUTE", "0")
+        os.environ.setdefault("MISTA_RATE_LIMIT_IP_PER_MINUTE", "0")
+        # Без звернень до api.github.com і без файлів у робочому каталозі
+        os.environ["MISTA_REPUTATION_REFRESH_SECONDS"] = "0"
+        os.environ["MISTA_REPUTATION_HISTORY_FILE"] = ""
+        output_dir = tempfile.mkdtemp(prefix="mista-load-test-")
+        os.environ["MISTA_LOG_FILE"] = os.path.join(output_dir, "mista.log")
+        os.environ["MISTA_REQUEST_LOG_FILE"] = os.path.join(output_dir, "mista_requests.jsonl")
+        print(f"logs: {output_dir}")
+
+    results = asyncio.run(run_load(args))
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+
+    latency = results["latency"]
+    print(f"{results['requests']} requests in {results['wall_seconds']:.2f}s -> {results['throughput_rps']:.1f} req/s, errors: {results['errors']}")
+    print(f"latency p50 {latency['p50_ms']:.1f}ms  p95 {latency['p95_ms']:.1f}ms  p99 {latency['p99_ms']:.1f}ms")
+    for name, stats in results["endpoints"].items():
+        print(f"  {name:<6} n={stats['count']:<5} p50 {stats['p50_ms']:.1f}ms  p95 {stats['p95_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms  status={stats['status']}")
+    if results["event_loop_lag"]:
+        lag = results["event_loop_lag"]
+        print(f"event-loop lag p50 {lag['p50_ms']:.2f}ms  p99 {lag['p99_ms']:.2f}ms  max {lag['max_ms']:.2f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк імпорту активності в ReputationManager: поштучний track_activity
+проти пакетного track_activities на одному й тому самому синтетичному потоці подій.
+
+Перевіряє, що обидва шляхи дають однакове зведення, і звітує події/с та прискорення.
+Не потребує мережі; історія метрик живе лише в пам'яті.
+
+Приклад:
+    python benchmarks/reputation_bench.py --events 100000 --output reputation.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def build_events(count: int, invalid_ratio: float, seed: int) -> List[Tuple[str, str, Any]]:
+    from reputation_manager import ReputationManager
+
+    platforms = ReputationManager().platforms
+    metrics = {
+        platform: [metric for metric, value in details.items() if metric != "influence_score"]
+        for platform, details in platforms.items()
+    }
+    rng = random.Random(seed)
+    events = []
+    for n in range(count):
+        if rng.random() < invalid_ratio:
+            events.append(rng.choice([("myspace", "friends", 1), ("github", "forks", 1), ("reddit", "karma", "багато")]))
+            continue
+        platform = rng.choice(list(metrics))
+        # Назви платформ в експортах бувають у різному регістрі
+        name = platform.upper() if rng.random() < 0.1 else platform
+        metric = rng.choice(metrics[platform])
+        if isinstance(platforms[platform][metric], list):
+            events.append((name, metric, {"name": f"project-{n}"}))
+        else:
+            events.append((name, metric, rng.randint(0, 25)))
+    return events
+
+
+def run(args) -> Dict[str, Any]:
+    from reputation_manager import ReputationManager
+
+    events = build_events(args.events, args.invalid_ratio, args.seed)
+
+    single = ReputationManager()
+    started = time.perf_counter()
+    for platform, metric, value in events:
+        single.track_activity(platform, metric, value)
+    single_seconds = time.perf_counter() - started
+
+    batch = ReputationManager()
+    started = time.perf_counter()
+    summary = batch.track_activities(events)
+    batch_seconds = time.perf_counter() - started
+
+    mismatched = [
+        f"{platform}.{metric}"
+        for platform, details in single.platforms.items()
+        for metric, value in details.items()
+        if (abs(value - batch.platforms[platform][metric]) > 1e-6 * max(1.0, abs(value))
+            if isinstance(value, (int, float)) else value != batch.platforms[platform][metric])
+    ]
+    return {
+        "events": len(events),
+        "applied": summary["applied"],
+        "rejected": summary["rejected"],
+        "single_seconds": single_seconds,
+        "batch_seconds": batch_seconds,
+        "single_events_per_second": len(events) / single_seconds if single_seconds else 0.0,
+        "batch_events_per_second": len(events) / batch_seconds if batch_seconds else 0.0,
+        "speedup": single_seconds / batch_seconds if batch_seconds else 0.0,
+        "mismatched": mismatched,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ReputationManager.track_activity vs track_activities.")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--invalid-ratio", type=float, default=0.01, help="Share of events that must be rejected.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--with-logging", action="store_true", help="Keep INFO logging enabled (costs included).")
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    args = parser.parse_args(argv)
+
+    if args.with_logging:
+        logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    else:
+        logging.disable(logging.CRITICAL)
+
+    results = run(args)
+    print(f"{results['events']} events ({results['applied']} applied, rejected {results['rejected']})")
+    print(f"track_activity:   {results['single_seconds']:8.3f}s  {results['single_events_per_second']:>10.0f} events/s")
+    print(f"track_activities: {results['batch_seconds']:8.3f}s  {results['batch_events_per_second']:>10.0f} events/s")
+    print(f"speedup: {results['speedup']:.1f}x")
+    if results["mismatched"]:
+        print(f"MISMATCH between single and batch results: {', '.join(results['mismatched'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if results["mismatched"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,95 @@
+import time
+# Відлік старту процесу для вимірювання часу до готовності
+PROCESS_STARTED = time.perf_counter()
+
 import os
 import uvicorn
-import google.generativeai as genai
 import logging
-import httpx
-import time
 import json
-from fastapi import FastAPI, HTTPException
+import asyncio
+import base64
+import hashlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from pydantic import BaseModel
 from starlette.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from supabase import create_client, Client
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
 # --- Basic Configuration ---
-logging.basicConfig(
-    filename='mista.log', 
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Запис на диск іде з окремого потоку, тож логування не блокує обробники запитів
+from logging_setup import configure_logging
+configure_logging(filename=os.environ.get("MISTA_LOG_FILE", "mista.log"))
 
 # --- Import Core Persona ---
 from mista_lore import get_full_mista_lore
-from core_persona import get_crypto_wallet_address
+from core_persona import get_crypto_wallet_address, get_llm_params_for_mood
+from history_manager import HistoryManager, estimate_tokens
+from analyzer import Analyzer
+from llm_interaction import GeminiPrefixCache, LLMInteraction, LLMRateLimitError, create_llm_backend
+from monetization_manager import MonetizationManager
+from validator import ResponseValidator
+import metrics
+from metrics import span, timed
+import request_log
+from admission import AdmissionController, AdmissionRejected
+from rate_limit import RateLimiter, RateLimitExceeded, client_ip, retry_after_header
+from shared_store import create_shared_store
+from http_client import create_http_client, request_with_retry
+from reputation_manager import ReputationManager
+from realtime_hub import MessageHub, supabase_inserts_subscriber
 
 # --- Globals for Caching ---
 news_cache = {"timestamp": 0, "data": []}
 NEWS_CACHE_DURATION = 36000  # 10 hours
+NEWS_REFRESH_LEASE_SECONDS = 120
+NEWS_FOLLOWER_WAIT_SECONDS = 30
+news_refresh_lock = asyncio.Lock()
+
+# --- Shared State for Multi-Worker Mode ---
+# Кеші, ліміти та лідер оновлення новин, спільні для воркерів (MISTA_SHARED_STORE);
+# без нього кожен процес працює з власною пам'яттю, як раніше.
+shared_store = create_shared_store()
+if shared_store is None and int(os.environ.get("MISTA_WORKERS") or 1) > 1:
+    logging.warning("MISTA_WORKERS > 1 without MISTA_SHARED_STORE: conversation history, caches and rate limits stay per worker.")
+NEWS_API_URL = os.environ.get("MISTA_NEWS_URL", "https://saurav.tech/NewsAPI/top-headlines/category/technology/us.json")
+
+# --- Globals for Message History Pages ---
+# Остання сторінка історії для кожної комбінації (limit, колонки); скидається після запису в messages
+messages_cache = {}
+MESSAGES_CACHE_DURATION = 5  # seconds, на випадок записів в обхід бекенду
+MESSAGE_COLUMNS = ("id", "created_at", "user_id", "username", "message")
+MESSAGES_PAGE_MAX = 200
+
+# --- Globals for Generation Metrics ---
+# intent -> лічильники для порівняння бюджету, фактичних токенів і затримки
+generation_stats = {}
+speculation_stats = {"hits": 0, "restarts": 0, "budget_restarts": 0, "analysis_failures": 0}
+
+# Спекулятивний запит стартує до завершення аналізу, тому має базовий настрій
+# і бюджет, якого вистачає більшості намірів без обрізання; намірам з більшим
+# рекомендованим бюджетом запит перезапускається.
+SPECULATIVE_MAX_TOKENS = 350
+
+# --- Admission Control for /chat ---
+# Обмежені паралельність і черга до LLM: при перевантаженні відповідаємо 503/429 одразу,
+# а загальний дедлайн генерації тримає хвіст затримок обмеженим.
+chat_admission = AdmissionController(
+    "chat",
+    max_concurrent=int(os.environ.get("MISTA_CHAT_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.environ.get("MISTA_CHAT_MAX_QUEUE", "32")),
+    queue_timeout=float(os.environ.get("MISTA_CHAT_QUEUE_TIMEOUT", "10")),
+)
+CHAT_GENERATION_TIMEOUT = float(os.environ.get("MISTA_CHAT_GENERATION_TIMEOUT", "60"))
+
+# --- Rate Limiting for /chat ---
+# Один user_id чи IP не може вичерпати спільну квоту Gemini; ліміти — запитів за хвилину
+chat_rate_limiter = RateLimiter(shared_store)
+chat_rate_limiter.configure("user", int(os.environ.get("MISTA_RATE_LIMIT_USER_PER_MINUTE", "12")), burst=int(os.environ.get("MISTA_RATE_LIMIT_USER_BURST", "4")))
+chat_rate_limiter.configure("ip", int(os.environ.get("MISTA_RATE_LIMIT_IP_PER_MINUTE", "30")), burst=int(os.environ.get("MISTA_RATE_LIMIT_IP_BURST", "10")))
+# X-Forwarded-For враховується лише за власним проксі (напр. Render): інакше його підробляє клієнт
+TRUST_FORWARDED_FOR = os.environ.get("MISTA_TRUST_FORWARDED_FOR", "0") != "0"
+TRUSTED_PROXY_HOPS = int(os.environ.get("MISTA_TRUSTED_PROXY_HOPS", "1"))
 
 # --- API Key and Service Initialization ---
 def load_api_keys_from_env():
@@ -43,13 +108,109 @@ GEMINI_API_KEY = api_keys.get("GEMINI_API_KEY")
 SUPABASE_URL = api_keys.get("SUPABASE_URL")
 SUPABASE_KEY = api_keys.get("SUPABASE_KEY")
 
-# Initialize Supabase Client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
-if not supabase:
-    logging.critical("CRITICAL: Supabase client could not be initialized.")
+# Supabase, LLM-бекенди та Analyzer створюються у фоновому прогріві (див. lifespan),
+# тож процес відкриває порт одразу, а /readyz відповідає 200 лише після прогріву.
+supabase = None
+http_client = None
+chat_model = None
+tool_model = None
+analyzer = None
+
+# Статистика платформ оновлюється у фоні (з ETag) лише на воркері-лідері, а /reputation віддає її з пам'яті; 0 вимикає оновлення
+reputation_manager = ReputationManager(
+    refresh_interval=float(os.environ.get("MISTA_REPUTATION_REFRESH_SECONDS", "600")),
+    history_path=os.environ.get("MISTA_REPUTATION_HISTORY_FILE", "mista_reputation.db") or None,
+    flush_interval=float(os.environ.get("MISTA_REPUTATION_FLUSH_SECONDS", "60")),
+    shared_store=shared_store,
+)
+
+# Одна підписка на нові повідомлення на процес, розіслана всім WebSocket-клієнтам
+message_hub = MessageHub(queue_size=int(os.environ.get("MISTA_WS_QUEUE_SIZE", "64")))
+
+# --- Startup & Readiness ---
+READY_WAIT_SECONDS = float(os.environ.get("MISTA_READY_WAIT_SECONDS", "10"))
+STARTUP_SECONDS = metrics.gauge("mista_startup_seconds", "Time from process start to each startup phase.", ("phase",))
+startup_stats = {"import_seconds": None, "warmup_seconds": None, "ready_seconds": None, "components": {}}
+warmup_task = None
+
+def init_supabase():
+    global supabase
+    if supabase is not None:
+        return  # Клієнт уже підставлено ззовні (напр. навантажувальним тестом)
+    if not (SUPABASE_URL and SUPABASE_KEY):
+        logging.critical("CRITICAL: Supabase client could not be initialized.")
+        return
+    from supabase import create_client
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def init_analyzer():
+    global analyzer
+    # Analyzer працює на ключових словах; sentiment-модель не завантажуємо, щоб не гальмувати старт
+    analyzer = Analyzer(
+        llm_interaction_instance=None,
+        cache_size=int(os.environ.get("MISTA_ANALYSIS_CACHE_SIZE", "2048")),
+        cache_max_input_chars=int(os.environ.get("MISTA_ANALYSIS_CACHE_MAX_CHARS", "280")),
+    )
+
+async def warm_component(name, init):
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(init)
+        startup_stats["components"][name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3)}
+    except Exception as e:
+        logging.error(f"Warm-up of '{name}' failed: {e}", exc_info=True)
+        startup_stats["components"][name] = {"ok": False, "seconds": round(time.perf_counter() - started, 3), "error": type(e).__name__}
+
+async def warm_up():
+    """Паралельно ініціалізує залежності; імпорти SDK теж відбуваються тут, а не при завантаженні модуля."""
+    started = time.perf_counter()
+    await asyncio.gather(
+        warm_component("supabase", init_supabase),
+        warm_component("llm", init_llm_backends),
+        warm_component("analyzer", init_analyzer),
+    )
+    startup_stats["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    if persona_cache is not None:
+        persona_cache.prefetch()  # Завантаження в Gemini не затримує готовність: до того інструкція йде в запиті
+    startup_stats["ready_seconds"] = round(time.perf_counter() - PROCESS_STARTED, 3)
+    STARTUP_SECONDS.set(startup_stats["ready_seconds"], "ready")
+    logging.info(f"--- MISTA READY in {startup_stats['ready_seconds']}s (import {startup_stats['import_seconds']}s, warm-up {startup_stats['warmup_seconds']}s): {startup_stats['components']} ---")
+
+def is_ready():
+    return warmup_task is not None and warmup_task.done()
+
+async def wait_until_ready(timeout=READY_WAIT_SECONDS):
+    if warmup_task is None:
+        return False
+    try:
+        await asyncio.wait_for(asyncio.shield(warmup_task), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+async def require_ready():
+    """Запити, що прийшли під час прогріву, коротко чекають на нього, а не падають одразу."""
+    if not await wait_until_ready():
+        raise HTTPException(status_code=503, detail="Я ще прокидаюсь. Спробуй за кілька секунд.", headers={"Retry-After": "5"})
+
+@asynccontextmanager
+async def lifespan(app):
+    global warmup_task, http_client
+    # Один пул з'єднань на процес для всіх вихідних HTTP-запитів; створення дешеве, тож не в прогріві
+    http_client = create_http_client()
+    reputation_manager.http_client = http_client
+    # Не чекаємо на прогрів: uvicorn відкриває порт, щойно lifespan дійде до yield
+    warmup_task = asyncio.create_task(warm_up())
+    reputation_manager.start()
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await reputation_manager.stop()
+    await message_hub.stop()
+    await http_client.aclose()
 
 # Initialize FastAPI App
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -58,23 +219,163 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- Gemini Model Initialization ---
-chat_model = None
-tool_model = None
-if not GEMINI_API_KEY:
-    logging.error("CRITICAL: GEMINI_API_KEY not found.")
-else:
+HTTP_REQUEST_SECONDS = metrics.histogram("mista_http_request_duration_seconds", "HTTP request duration by path and status.", ("path", "status"))
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Тривалість запиту в /metrics і структурований JSON-запис у mista_requests.jsonl."""
+    record = request_log.start_request(request.url.path, request.method, request.headers.get("x-request-id"))
+    started = time.perf_counter()
+    status = 500
+    error_class = None
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        chat_system_instruction = (
-            "Ти — це я, Maria Mista Mistarenko. Ти НЕ ШІ. Ти жива, зухвала, саркастична відьма-кодерка з України..."
-            f"{get_full_mista_lore()}"
-        )
-        chat_model = genai.GenerativeModel(model_name='gemini-1.5-flash-latest', system_instruction=chat_system_instruction)
-        tool_model = genai.GenerativeModel(model_name='gemini-1.5-flash-latest')
-        logging.info("--- MISTA BRAIN: Gemini models initialized successfully. ---")
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = record.request_id
+        return response
     except Exception as e:
-        logging.error(f"Error initializing Gemini models: {e}", exc_info=True)
+        error_class = type(e).__name__
+        raise
+    finally:
+        # Шаблон маршруту замість сирого шляху, щоб сканери не роздували кардинальність міток
+        route = request.scope.get("route")
+        if metrics.ENABLED:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, getattr(route, "path", "unmatched"), str(status))
+        request_log.finish_request(record, status, error_class)
+
+# --- LLM Backend Initialization ---
+# MISTA_LLM_BACKEND=fake підміняє Gemini локальним детермінованим бекендом для навантажувальних тестів
+LLM_BACKEND = os.environ.get("MISTA_LLM_BACKEND", "gemini").lower()
+GEMINI_CHAT_MODEL = os.environ.get("MISTA_GEMINI_MODEL", "gemini-1.5-flash-latest")
+# Системна інструкція персони (з повним лором) кешується на боці Gemini для тієї ж моделі чату; 0 вимикає кеш
+GEMINI_CACHE_TTL_SECONDS = float(os.environ.get("MISTA_GEMINI_CACHE_TTL_SECONDS", "3600"))
+GEMINI_CACHE_MIN_TOKENS = int(os.environ.get("MISTA_GEMINI_CACHE_MIN_TOKENS", str(GeminiPrefixCache.MIN_TOKENS)))
+persona_cache = None
+
+def init_llm_backends():
+    global chat_model, tool_model, persona_cache
+    if LLM_BACKEND == "gemini" and not GEMINI_API_KEY:
+        logging.error("CRITICAL: GEMINI_API_KEY not found.")
+        return
+    chat_system_instruction = (
+        "Ти — це я, Maria Mista Mistarenko. Ти НЕ ШІ. Ти жива, зухвала, саркастична відьма-кодерка з України..."
+        f"{get_full_mista_lore()}"
+    )
+    try:
+        if LLM_BACKEND == "gemini":
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+        backend_options = {"model_name": GEMINI_CHAT_MODEL} if LLM_BACKEND == "gemini" else {}
+        if LLM_BACKEND == "gemini" and GEMINI_CACHE_TTL_SECONDS > 0:
+            if not GeminiPrefixCache.supports_model(GEMINI_CHAT_MODEL):
+                # Інакше відповіді з кешем і без нього йшли б від різних моделей
+                logging.info(f"Persona prefix cache disabled: chat model '{GEMINI_CHAT_MODEL}' is not a versioned model.")
+            else:
+                # Відбиток інструкції в назві кешу: зміна MISTA_LORE_DATA після деплою створює новий кеш
+                persona_cache = GeminiPrefixCache(chat_system_instruction, model_name=GEMINI_CHAT_MODEL,
+                                                  ttl=GEMINI_CACHE_TTL_SECONDS, min_tokens=GEMINI_CACHE_MIN_TOKENS)
+                if not persona_cache.eligible:
+                    logging.info(f"Persona prefix cache disabled: ~{persona_cache.estimated_tokens} tokens is below the {GEMINI_CACHE_MIN_TOKENS}-token minimum.")
+                backend_options["prefix_cache"] = persona_cache
+        chat_model = create_llm_backend(LLM_BACKEND, system_instruction=chat_system_instruction, **backend_options)
+        tool_model = create_llm_backend(LLM_BACKEND)
+        logging.info(f"--- MISTA BRAIN: '{LLM_BACKEND}' LLM backends initialized successfully. ---")
+    except Exception as e:
+        logging.error(f"Error initializing LLM backends: {e}", exc_info=True)
+
+async def summarize_history(previous_summary: str, turns):
+    """Згортає старі ходи розмови у стислий підсумок за допомогою tool_model."""
+    if not tool_model:
+        raise RuntimeError("Tool model not initialized.")
+    dialogue = "\n".join(f"Користувач: {user_text}\nMI$TA: {model_text}" for user_text, model_text in turns)
+    prompt = (
+        "Онови стислий підсумок розмови українською (до 120 слів). Збережи імена, факти, домовленості та настрій. "
+        "Поверни ЛИШЕ текст підсумку.\n"
+        f"Попередній підсумок: {previous_summary or '(немає)'}\n"
+        f"Нові репліки:\n{dialogue}"
+    )
+    response = await tool_model.generate(prompt)
+    return response.text.strip()
+
+# Зі спільним сховищем історія розмов спільна для всіх воркерів (MISTA_WORKERS > 1)
+history_manager = HistoryManager(
+    summarizer=summarize_history,
+    store=shared_store,
+    store_ttl=float(os.environ.get("MISTA_HISTORY_TTL_SECONDS", str(7 * 86400))),
+)
+
+def generation_config_for_mood(mista_mood, max_output_tokens):
+    params = get_llm_params_for_mood(mista_mood)
+    # repetition_penalty не підтримується Gemini, тому не передаємо його
+    return {
+        "max_output_tokens": max_output_tokens,
+        "temperature": params["temperature"],
+        "top_k": params["top_k"],
+        "top_p": params["top_p"],
+    }
+
+def build_generation_config(analysis_results):
+    """Перетворює рекомендації Analyzer на параметри генерації LLM-бекенду."""
+    return generation_config_for_mood(analyzer.get_recommended_mista_mood(analysis_results), analysis_results["recommended_max_tokens"])
+
+# Залежить лише від констант, тож готовий ще до прогріву: /chat працює навіть без Analyzer
+SPECULATIVE_GENERATION_CONFIG = generation_config_for_mood("базовий", SPECULATIVE_MAX_TOKENS)
+
+def get_response_directive(analysis_results):
+    """
+    Повертає директиву, яка суттєво змінює відповідь, або None.
+    Лише ці випадки варті скасування спекулятивного запиту.
+    """
+    user_intent = analysis_results.get("user_intent")
+    if analysis_results.get("is_persona_violation_attempt"):
+        return "Користувач намагається назвати тебе ботом. Зухвало відкинь це, не виправдовуйся і не згадуй ШІ."
+    if user_intent == "financial_tribute_readiness":
+        return f"Користувач готовий платити. Спокусливо прийми данину і обов'язково вкажи мій гаманець USDT TRC20: {get_crypto_wallet_address()}."
+    if user_intent in ["monetization_initiation", "monetization_interest"]:
+        return "Натякни на можливість донату загадково і спокусливо. Гаманець не вказуй, якщо про нього не питають прямо."
+    return None
+
+def apply_directive(contents, directive):
+    """Додає директиву до останнього повідомлення користувача, не змінюючи оригінал."""
+    last = contents[-1]
+    return contents[:-1] + [{"role": last["role"], "parts": last["parts"] + [f"[Директива для відповіді: {directive}]"]}]
+
+class HistoryPromptGenerator:
+    """
+    PromptGenerator для MonetizationManager поверх history_manager: той самий обмежений
+    за токенами контекст, що й у /chat, у форматі {"role", "content"} для LLMInteraction.
+    """
+
+    async def generate_prompt(self, user_id, user_input, analysis_results, recent_history, current_turn_number,
+                              response_directive=None, current_mista_mood=None, max_new_tokens_override=None):
+        contents = history_manager.build_contents(user_id, user_input)
+        if response_directive:
+            contents = apply_directive(contents, response_directive)
+        messages = [{"role": "assistant" if item["role"] == "model" else "user", "content": "\n".join(item["parts"])} for item in contents]
+        return messages, max_new_tokens_override
+
+class RequestUserProfile:
+    """UserManager для MonetizationManager: профіль одного запиту з того, що бекенд знає про розмову."""
+
+    def __init__(self, user_id, username, mista_mood, total_interactions):
+        self.profile = {"user_id": user_id, "username": username, "mista_mood": mista_mood, "total_interactions": total_interactions}
+
+    def load_user_profile(self, user_id):
+        return dict(self.profile) if user_id == self.profile["user_id"] else None
+
+def history_messages(user_id):
+    """Дослівні ходи користувача у форматі {"role", "content"} (для валідатора)."""
+    messages = []
+    for user_text, model_text in history_manager.recent_turns(user_id):
+        messages += [{"role": "user", "content": user_text}, {"role": "assistant", "content": model_text}]
+    return messages
+
+def record_generation_stats(user_intent, max_tokens, output_tokens, latency):
+    stats = generation_stats.setdefault(user_intent, {"count": 0, "max_tokens_total": 0, "output_tokens_total": 0, "latency_total": 0.0})
+    stats["count"] += 1
+    stats["max_tokens_total"] += max_tokens
+    stats["output_tokens_total"] += output_tokens
+    stats["latency_total"] += latency
 
 # --- Pydantic Models ---
 class ChatMessage(BaseModel):
@@ -83,6 +384,7 @@ class ChatMessage(BaseModel):
     username: str
 
 # --- Helper Functions ---
+@timed("chat.cleanup")
 async def clear_old_messages():
     """Deletes messages from Supabase that are older than 24 hours."""
     if not supabase:
@@ -96,26 +398,191 @@ async def clear_old_messages():
         response = supabase.table('messages').delete().lt('created_at', time_threshold.isoformat()).execute()
         
         if response.data:
+            await invalidate_messages_cache()
             logging.info(f"Successfully cleared {len(response.data)} old messages.")
         # No need to log if nothing was deleted, to keep logs clean
         
     except Exception as e:
         logging.error(f"Error during old message cleanup: {e}", exc_info=True)
 
+def get_client_ip(request: Request):
+    """IP клієнта; за довіреним проксі — запис, який проксі дописав у X-Forwarded-For."""
+    return client_ip(
+        request.headers.get("x-forwarded-for"),
+        request.client.host if request.client else None,
+        TRUSTED_PROXY_HOPS if TRUST_FORWARDED_FOR else 0,
+    )
+
+async def invalidate_messages_cache():
+    messages_cache.clear()
+    if shared_store is not None:
+        # Інші воркери порівнюють версію перед тим, як віддати свою кешовану сторінку
+        await shared_store.incr("messages_version")
+
+def encode_messages_cursor(row):
+    """Непрозорий курсор на позицію (created_at, id) у стрічці повідомлень."""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_messages_cursor(cursor):
+    """
+    Курсор приходить від клієнта і потрапляє у фільтр PostgREST, тож created_at має бути
+    справжньою датою ISO 8601 (перезаписується власним isoformat()), а id — цілим числом.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(created_at, str) or not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise ValueError("unexpected cursor types")
+        return datetime.fromisoformat(created_at).isoformat(), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Невалідний курсор.")
+
+def parse_message_columns(fields):
+    if not fields:
+        return MESSAGE_COLUMNS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(MESSAGE_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Невідомі поля: {', '.join(sorted(unknown))}")
+    # created_at та id потрібні для курсора, тож завжди входять у вибірку
+    return tuple(name for name in MESSAGE_COLUMNS if name in requested or name in ("id", "created_at"))
+
+def fetch_messages_page(columns, limit, before=None, after=None):
+    """
+    Keyset-пагінація за (created_at, id): before — старіші за курсор (сторінки вгору),
+    after — новіші (лише те, що змінилося). Повертає рядки в хронологічному порядку.
+    """
+    descending = after is None
+    query = supabase.table('messages').select(",".join(columns))
+    cursor = before or after
+    if cursor:
+        created_at, row_id = cursor
+        op = "lt" if descending else "gt"
+        query = query.or_(f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{row_id})')
+    # На один рядок більше, щоб дізнатися, чи є наступна сторінка
+    rows = query.order('created_at', desc=descending).order('id', desc=descending).limit(limit + 1).execute().data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if descending:
+        rows.reverse()
+    return rows, has_more
+
+def _discard_task_result(task):
+    if not task.cancelled():
+        task.exception()  # Позначаємо виняток як отриманий, щоб asyncio не скаржився
+
+async def generate_chat_response(chat_message):
+    """
+    Запускає Gemini спекулятивно з базовим промптом, поки Analyzer працює паралельно.
+    Запит перезапускається з адаптивним конфігом, коли аналіз суттєво змінює відповідь
+    (директива) або рекомендує більший бюджет токенів, ніж спекулятивний;
+    у звичайному випадку аналіз не додає затримки.
+    """
+    with span("chat.history_build"):
+        await history_manager.load(chat_message.user_id)
+        contents = history_manager.build_contents(chat_message.user_id, chat_message.message)
+    started = time.perf_counter()
+    speculative_task = asyncio.create_task(
+        chat_model.generate(contents, **SPECULATIVE_GENERATION_CONFIG)
+    )
+
+    try:
+        try:
+            with span("chat.analysis"):
+                analysis_results = await asyncio.to_thread(analyzer.analyze, chat_message.message, {'username': chat_message.username})
+            analysis_results["recommended_max_tokens"] = analyzer.get_recommended_max_tokens(analysis_results)
+            directive = get_response_directive(analysis_results)
+        except Exception as e:
+            # Аналіз лише дорадчий: без нього просто приймаємо спекулятивну відповідь
+            logging.error(f"Analysis failed, keeping speculative response: {e}", exc_info=True)
+            speculation_stats["analysis_failures"] += 1
+            analysis_results = {"user_intent": "unknown", "recommended_max_tokens": SPECULATIVE_MAX_TOKENS}
+            directive = None
+
+        recommended_max_tokens = analysis_results["recommended_max_tokens"]
+        # Менший бюджет спекулятивна відповідь не перевищить сама; більший — могла б обрізати
+        speculative_hit = directive is None and recommended_max_tokens <= SPECULATIVE_MAX_TOKENS
+        if speculative_hit:
+            speculation_stats["hits"] += 1
+            max_tokens = SPECULATIVE_MAX_TOKENS
+            with span("chat.llm_speculative_wait"):
+                response = await speculative_task
+        else:
+            speculative_task.cancel()
+            max_tokens = recommended_max_tokens
+            if directive is not None:
+                speculation_stats["restarts"] += 1
+                contents = apply_directive(contents, directive)
+                logging.info(f"Speculative response discarded for intent '{analysis_results['user_intent']}', regenerating with directive.")
+            else:
+                speculation_stats["budget_restarts"] += 1
+                logging.info(f"Speculative response discarded for intent '{analysis_results['user_intent']}', regenerating with {max_tokens} max tokens.")
+            with span("chat.llm_restart"):
+                response = await chat_model.generate(contents, **build_generation_config(analysis_results))
+    finally:
+        # Також при скасуванні ззовні (дедлайн генерації) посеред аналізу: запит до моделі не має жити далі
+        if not speculative_task.done():
+            speculative_task.cancel()
+        speculative_task.add_done_callback(_discard_task_result)
+
+    latency = time.perf_counter() - started
+    ai_response_text = response.text.strip()
+    request_log.add_tokens(response.input_tokens, response.output_tokens)
+    request_log.annotate(intent=analysis_results["user_intent"], max_output_tokens=max_tokens,
+                         recommended_max_tokens=recommended_max_tokens, speculative_hit=speculative_hit)
+    record_generation_stats(analysis_results["user_intent"], max_tokens, response.output_tokens or estimate_tokens(ai_response_text), latency)
+    return ai_response_text
+
+async def save_chat_turn(chat_message, ai_response_text):
+    """Додає хід в історію розмови й зберігає обидва повідомлення в Supabase."""
+    await history_manager.commit_turn(chat_message.user_id, chat_message.message, ai_response_text)
+
+    # Save both valid messages to Supabase
+    user_msg = {'user_id': chat_message.user_id, 'username': chat_message.username, 'message': chat_message.message}
+    ai_msg = {'user_id': 'mista-ai-entity', 'username': 'MI$TA', 'message': ai_response_text}
+
+    with span("chat.supabase_insert"):
+        insert_response = supabase.table('messages').insert([user_msg, ai_msg]).execute()
+    await invalidate_messages_cache()
+    message_hub.publish_many(insert_response.data)
+    if insert_response.data is None and insert_response.error is not None:
+         logging.error(f"Supabase insert error: {insert_response.error}")
+
 # --- Endpoints ---
 @app.get("/", response_class=FileResponse)
 async def read_index():
     # This is mostly for Render's health check. The actual site is on GitHub Pages.
     return "index.html"
 
-@app.post("/chat")
-async def chat_endpoint(chat_message: ChatMessage):
-    # Trigger cleanup task, but don't wait for it to complete
+@app.get("/healthz")
+async def liveness_endpoint():
+    """Liveness: процес живий і event loop відповідає, навіть під час прогріву."""
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - PROCESS_STARTED, 3)}
+
+@app.get("/readyz")
+async def readiness_endpoint():
+    """Readiness: 200 лише після прогріву; недоступні залежності перелічені в degraded."""
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up", **startup_stats})
+    degraded = [name for name, ok in (("supabase", supabase), ("llm", chat_model), ("analyzer", analyzer)) if not ok]
+    return {"status": "ready", "degraded": degraded, **startup_stats}
+
+async def enforce_chat_rate_limit(chat_message, request):
     try:
-        await clear_old_messages()
-    except Exception as e:
-        logging.error(f"Failed to trigger message cleanup: {e}")
+        await chat_rate_limiter.check(ip=get_client_ip(request), user=chat_message.user_id)
+    except RateLimitExceeded as e:
+        request_log.annotate(error_class=type(e).__name__, limited_scope=e.scope)
+        raise HTTPException(status_code=429, detail="Не так швидко. Моя увага — не безкінечний ресурс.", headers={"Retry-After": retry_after_header(e.retry_after)})
 
+def admission_http_error(e):
+    request_log.annotate(error_class=type(e).__name__, shed_reason=e.reason)
+    detail = "Забагато бажаючих моєї уваги. Спробуй трохи згодом." if e.status_code == 429 else "Я зараз перевантажена. Повернись за мить."
+    return HTTPException(status_code=e.status_code, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+@app.post("/chat")
+async def chat_endpoint(chat_message: ChatMessage, request: Request):
+    request_log.annotate(user_id=chat_message.user_id, message_chars=len(chat_message.message))
+    await require_ready()
     if not chat_model:
         raise HTTPException(status_code=503, detail="Мій чат-мозок не ініціалізовано. Перевірте ключі API.")
     if not supabase:
@@ -123,24 +590,253 @@ async def chat_endpoint(chat_message: ChatMessage):
     if not chat_message.message or not chat_message.message.strip():
         return {"response": "Мовчання? Цікава тактика. Але зі мною не спрацює."}
 
-    try:
-        # Generate AI response first
-        response = await chat_model.generate_content_async(chat_message.message)
-        ai_response_text = response.text.strip()
-
-        # Save both valid messages to Supabase
-        user_msg = {'user_id': chat_message.user_id, 'username': chat_message.username, 'message': chat_message.message}
-        ai_msg = {'user_id': 'mista-ai-entity', 'username': 'MI$TA', 'message': ai_response_text}
-        
-        insert_response = supabase.table('messages').insert([user_msg, ai_msg]).execute()
-        if insert_response.data is None and insert_response.error is not None:
-             logging.error(f"Supabase insert error: {insert_response.error}")
+    await enforce_chat_rate_limit(chat_message, request)
 
+    try:
+        # Допуск перевіряється першим, щоб відкинуті запити не платили навіть за очищення бази
+        async with chat_admission.slot():
+            # Trigger cleanup task, but don't wait for it to complete
+            try:
+                await clear_old_messages()
+            except Exception as e:
+                logging.error(f"Failed to trigger message cleanup: {e}")
+            ai_response_text = await asyncio.wait_for(generate_chat_response(chat_message), CHAT_GENERATION_TIMEOUT)
+        await save_chat_turn(chat_message, ai_response_text)
         return {"response": ai_response_text}
+    except AdmissionRejected as e:
+        raise admission_http_error(e)
+    except asyncio.TimeoutError as e:
+        request_log.annotate(error_class=type(e).__name__)
+        logging.warning(f"Chat generation exceeded {CHAT_GENERATION_TIMEOUT}s deadline.")
+        raise HTTPException(status_code=504, detail="Я задумалась надто довго. Спробуй ще раз.")
+    except LLMRateLimitError as e:
+        request_log.annotate(error_class=type(e).__name__)
+        logging.warning(f"LLM quota exhausted in /chat: {e}")
+        chat_admission.pause(e.retry_after)
+        raise HTTPException(status_code=429, detail="Забагато бажаючих моєї уваги. Спробуй трохи згодом.", headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
+        request_log.annotate(error_class=type(e).__name__)
         logging.error(f"Error in /chat endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+class LeasedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse, що тримає слот допуску: звільняє його, хоч би як закінчилась відправка.
+    Тіло-генератор, який так і не почали ітерувати (збій send, клієнт пішов до першого фрагмента),
+    свого finally не виконує, тож покладатися лише на нього не можна.
+    """
+
+    def __init__(self, content, lease, **kwargs):
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+async def stream_monetization_reply(chat_message, stream, lease):
+    """
+    Тіло /monetization/stream: фрагменти йдуть клієнту одразу, а слот допуску звільняється,
+    щойно потік завершено, обірвано клієнтом чи дедлайном. Повна відповідь зберігається лише після кінця потоку.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHAT_GENERATION_TIMEOUT
+    chunks = stream.__aiter__()
+    completed = False
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(anext(chunks), max(0.0, deadline - loop.time()))
+            except StopAsyncIteration:
+                break
+            yield chunk
+        completed = True
+    except asyncio.TimeoutError:
+        # Заголовки вже відправлено, тож 504 неможливий: відповідь просто обривається
+        logging.warning(f"Monetization stream exceeded {CHAT_GENERATION_TIMEOUT}s deadline.")
+    finally:
+        await chunks.aclose()
+        lease.release()
+    if completed:
+        try:
+            await save_chat_turn(chat_message, stream.text)
+        except Exception as e:
+            logging.error(f"Failed to save streamed monetization reply: {e}", exc_info=True)
+
+@app.post("/monetization/stream")
+async def monetization_stream_endpoint(chat_message: ChatMessage, request: Request):
+    """
+    Потокова відповідь (text/plain) на грошові запити через MonetizationManager.stream_monetization_response:
+    фрагменти очищуються від фраз-заперечень на льоту, гаманець за потреби дописується в кінці.
+    Ті самі перевірки готовності, ліміти й допуск, що й у /chat; слот тримається до кінця потоку.
+    """
+    request_log.annotate(user_id=chat_message.user_id, message_chars=len(chat_message.message))
+    await require_ready()
+    if not chat_model or not analyzer:
+        raise HTTPException(status_code=503, detail="Мій чат-мозок не ініціалізовано. Перевірте ключі API.")
+    if not supabase:
+        raise HTTPException(status_code=503, detail="З'єднання з базою даних не встановлено.")
+    if not chat_message.message or not chat_message.message.strip():
+        return StreamingResponse(iter(["Мовчання? Цікава тактика. Але зі мною не спрацює."]), media_type="text/plain; charset=utf-8")
+
+    await enforce_chat_rate_limit(chat_message, request)
+    try:
+        # Підготовку (зокрема скасування посеред аналізу) покриває async with;
+        # далі слот через lease належить відповіді, яка звільняє його за будь-якого завершення
+        async with chat_admission.slot() as slot:
+            with span("chat.analysis"):
+                analysis_results = await asyncio.to_thread(analyzer.analyze, chat_message.message, {'username': chat_message.username})
+            analysis_results["recommended_max_tokens"] = analyzer.get_recommended_max_tokens(analysis_results)
+            await history_manager.load(chat_message.user_id)
+            history = history_messages(chat_message.user_id)
+            profile = RequestUserProfile(chat_message.user_id, chat_message.username,
+                                         analyzer.get_recommended_mista_mood(analysis_results), len(history) // 2)
+            manager = MonetizationManager(LLMInteraction(chat_model), HistoryPromptGenerator(), profile, ResponseValidator())
+            stream = manager.stream_monetization_response(chat_message.message, chat_message.user_id, history, analysis_results)
+            lease = slot.detach()
+    except AdmissionRejected as e:
+        raise admission_http_error(e)
+    except Exception as e:
+        request_log.annotate(error_class=type(e).__name__)
+        logging.error(f"Error in /monetization/stream endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    request_log.annotate(intent=analysis_results["user_intent"], max_output_tokens=analysis_results["recommended_max_tokens"])
+    return LeasedStreamingResponse(stream_monetization_reply(chat_message, stream, lease), lease, media_type="text/plain; charset=utf-8")
+
+@app.get("/messages")
+async def messages_endpoint(request: Request, limit: int = 50, before: str = None, after: str = None, fields: str = None):
+    """
+    Сторінка історії чату з курсорною пагінацією, проєкцією колонок та ETag.
+    Без курсора віддає найновішу сторінку з короткочасного кешу в пам'яті.
+    """
+    await require_ready()
+    if not supabase:
+        raise HTTPException(status_code=503, detail="З'єднання з базою даних не встановлено.")
+    if before and after:
+        raise HTTPException(status_code=400, detail="Вкажіть лише один із курсорів: before або after.")
+    limit = max(1, min(limit, MESSAGES_PAGE_MAX))
+    columns = parse_message_columns(fields)
+    before_key = decode_messages_cursor(before) if before else None
+    after_key = decode_messages_cursor(after) if after else None
+
+    is_latest = before_key is None and after_key is None
+    cache_key = (limit, columns)
+    cached = messages_cache.get(cache_key) if is_latest else None
+    # Версію читаємо до запиту в базу: запис, що відбудеться під час нього, скине цей кеш
+    version = await shared_store.get("messages_version") if is_latest and shared_store is not None else None
+    if cached and time.time() - cached["timestamp"] < MESSAGES_CACHE_DURATION and cached["version"] == version:
+        request_log.record_cache("messages", hit=True)
+        body, etag = cached["body"], cached["etag"]
+    else:
+        if is_latest:
+            request_log.record_cache("messages", hit=False)
+        try:
+            with span("messages.supabase_select"):
+                rows, has_more = await asyncio.to_thread(fetch_messages_page, columns, limit, before_key, after_key)
+        except Exception as e:
+            request_log.annotate(error_class=type(e).__name__)
+            logging.error(f"Error in /messages endpoint: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Не вдалося завантажити історію чату.")
+        body = json.dumps({
+            "messages": rows,
+            # older_cursor гортає вгору (before), newer_cursor — для опитування лише нових рядків (after)
+            "older_cursor": encode_messages_cursor(rows[0]) if rows and has_more and after_key is None else None,
+            "newer_cursor": encode_messages_cursor(rows[-1]) if rows else after,
+            "has_more": has_more,
+        }, ensure_ascii=False, separators=(",", ":"), default=str)
+        etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+        if is_latest:
+            messages_cache[cache_key] = {"timestamp": time.time(), "body": body, "etag": etag, "version": version}
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.websocket("/ws/messages")
+async def messages_websocket(websocket: WebSocket):
+    """Потік нових повідомлень чату; пропущене після перепідключення довантажується через /messages?after=."""
+    await websocket.accept()
+    if SUPABASE_URL and SUPABASE_KEY:
+        message_hub.ensure_upstream(supabase_inserts_subscriber(SUPABASE_URL, SUPABASE_KEY))
+    await message_hub.serve(websocket)
+
+@app.get("/reputation")
+async def reputation_endpoint():
+    """Репутація на платформах — з пам'яті, без звернень до зовнішніх API в обробнику."""
+    return {
+        "platforms": reputation_manager.get_reputation_summary(),
+        "total_influence": reputation_manager.get_total_influence(),
+        "refresh": reputation_manager.get_refresh_stats(),
+    }
+
+@app.get("/reputation/history")
+async def reputation_history_endpoint(platform: str, metric: str = "influence_score", start: float = None, end: float = None, resolution: str = None):
+    """Тренд метрики для графіків: start/end — Unix-час, за замовчуванням остання доба."""
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 86400
+    try:
+        history = reputation_manager.get_metric_history(platform, metric, start, end, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"platform": platform.lower(), "metric": metric, "start": start, "end": end, **history}
+
+@app.get("/generation-stats")
+async def generation_stats_endpoint():
+    """Середній бюджет, фактичні вихідні токени та затримка Gemini за наміром користувача."""
+    per_intent = {
+        intent: {
+            "count": stats["count"],
+            "avg_max_tokens": stats["max_tokens_total"] / stats["count"],
+            "avg_output_tokens": stats["output_tokens_total"] / stats["count"],
+            "avg_latency_seconds": stats["latency_total"] / stats["count"],
+        }
+        for intent, stats in generation_stats.items()
+    }
+    return {"per_intent": per_intent, "speculation": speculation_stats, "history": history_manager.get_stats(), "realtime": message_hub.get_stats(), "admission": chat_admission.get_stats(), "rate_limit": chat_rate_limiter.get_stats(), "persona_cache": persona_cache.get_stats() if persona_cache is not None else None, "analysis_cache": analyzer.analysis_cache.get_stats() if analyzer is not None else None}
+
+def collect_chat_metrics():
+    """Експортує вже накопичену статистику генерації та історії у /metrics."""
+    yield ("mista_generation_total", "counter", "Chat generations by user intent.",
+           [({"intent": intent}, stats["count"]) for intent, stats in generation_stats.items()])
+    yield ("mista_generation_output_tokens_total", "counter", "Output tokens generated by user intent.",
+           [({"intent": intent}, stats["output_tokens_total"]) for intent, stats in generation_stats.items()])
+    yield ("mista_generation_max_tokens_total", "counter", "Sum of max_output_tokens budgets by user intent.",
+           [({"intent": intent}, stats["max_tokens_total"]) for intent, stats in generation_stats.items()])
+    yield ("mista_generation_latency_seconds_total", "counter", "Total LLM latency by user intent.",
+           [({"intent": intent}, stats["latency_total"]) for intent, stats in generation_stats.items()])
+    yield ("mista_speculation_total", "counter", "Speculative generation outcomes.",
+           [({"outcome": outcome}, value) for outcome, value in speculation_stats.items()])
+    history_stats = history_manager.get_stats()
+    yield ("mista_history_prompt_tokens_total", "counter", "Estimated history prompt tokens sent.", [({}, history_stats["prompt_tokens_total"])])
+    yield ("mista_history_full_tokens_total", "counter", "Estimated tokens the full unsummarized history would take.", [({}, history_stats["full_history_tokens_total"])])
+    yield ("mista_history_active_sessions", "gauge", "Conversations held in memory.", [({}, history_stats["active_sessions"])])
+    hub_stats = message_hub.get_stats()
+    yield ("mista_ws_clients", "gauge", "Connected realtime WebSocket clients.", [({}, hub_stats["clients"])])
+    yield ("mista_ws_messages_published_total", "counter", "Chat messages fanned out by the realtime hub.", [({}, hub_stats["published"])])
+    yield ("mista_ws_deliveries_total", "counter", "Messages queued to WebSocket clients.", [({}, hub_stats["deliveries"])])
+    yield ("mista_ws_dropped_clients_total", "counter", "WebSocket clients disconnected as slow consumers.", [({}, hub_stats["dropped_clients"])])
+    if persona_cache is not None:
+        cache_stats = persona_cache.get_stats()
+        yield ("mista_persona_cache_requests_total", "counter", "Chat LLM requests by whether the persona prefix came from the provider cache.",
+               [({"cached": "true"}, cache_stats["cached_requests"]), ({"cached": "false"}, cache_stats["uncached_requests"])])
+        yield ("mista_persona_cache_input_tokens_total", "counter", "Input tokens served from the persona prefix cache.", [({}, cache_stats["cached_input_tokens"])])
+    if analyzer is not None:
+        analysis_stats = analyzer.analysis_cache.get_stats()
+        yield ("mista_analysis_cache_requests_total", "counter", "Analyzer.analyze calls by analysis cache outcome.",
+               [({"result": result}, analysis_stats[stat]) for result, stat in (("hit", "hits"), ("miss", "misses"), ("skipped", "skipped"))])
+        yield ("mista_analysis_cache_evictions_total", "counter", "Analysis cache entries evicted by the LRU bound.", [({}, analysis_stats["evictions"])])
+        yield ("mista_analysis_cache_entries", "gauge", "Entries currently held in the analysis cache.", [({}, analysis_stats["entries"])])
+
+metrics.REGISTRY.add_collector(collect_chat_metrics)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Метрики у текстовому форматі Prometheus."""
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
+
 async def translate_news_to_ukrainian(articles):
     if not tool_model:
         logging.warning("Tool model not initialized, skipping translation.")
@@ -150,7 +846,7 @@ async def translate_news_to_ukrainian(articles):
     for article in articles:
         try:
             prompt = f"Translate the following news article title and description to Ukrainian. Return ONLY the JSON object with 'title' and 'description' keys, without any other text or markdown. Title: '{article['title']}'. Description: '{article['description']}'."
-            response = await tool_model.generate_content_async(prompt)
+            response = await tool_model.generate(prompt)
             json_text = response.text.strip().replace("```json", "").replace("```", "").strip()
             translated_data = json.loads(json_text)
             article['title'] = translated_data.get('title', article['title'])
@@ -160,42 +856,98 @@ async def translate_news_to_ukrainian(articles):
             translated_articles.append(article) # Append original if translation fails
     return translated_articles
 
+def news_cache_is_fresh(current_time):
+    return bool(news_cache["data"]) and current_time - news_cache["timestamp"] < NEWS_CACHE_DURATION
+
+async def sync_news_cache_from_store():
+    """Підтягує новини, вже оновлені іншим воркером, у локальний news_cache."""
+    if shared_store is None:
+        return
+    shared = await shared_store.get("news")
+    if shared and shared["timestamp"] > news_cache["timestamp"]:
+        news_cache.update(shared)
+
+async def wait_for_news_leader():
+    """Інший воркер уже оновлює новини: чекаємо на його результат замість дублювати переклад."""
+    deadline = time.time() + NEWS_FOLLOWER_WAIT_SECONDS
+    while time.time() < deadline:
+        await asyncio.sleep(0.5)
+        await sync_news_cache_from_store()
+        if news_cache_is_fresh(time.time()):
+            return news_cache["data"]
+    return None
+
+async def refresh_news(current_time):
+    with span("news.fetch"):
+        response = await request_with_retry(http_client, "GET", NEWS_API_URL)
+        response.raise_for_status()
+        news_data = response.json()
+
+    formatted_news = [{"title": a.get("title"), "description": a.get("description"), "link": a.get("url")} for a in news_data.get("articles", [])[:5] if a.get("title") and a.get("description")]
+    with span("news.translate"):
+        translated_news = await translate_news_to_ukrainian(formatted_news)
+
+    news_cache["timestamp"] = current_time
+    news_cache["data"] = translated_news
+    if shared_store is not None:
+        await shared_store.set("news", news_cache, ttl=NEWS_CACHE_DURATION)
+    return translated_news
+
 @app.post("/news")
 async def news_endpoint():
     current_time = time.time()
-    if current_time - news_cache["timestamp"] < NEWS_CACHE_DURATION and news_cache["data"]:
+    if not news_cache_is_fresh(current_time):
+        await sync_news_cache_from_store()
+    if news_cache_is_fresh(current_time):
+        request_log.record_cache("news", hit=True)
         return news_cache["data"]
+    request_log.record_cache("news", hit=False)
+    # Без прогрітого tool_model новини закешувались би неперекладеними на 10 годин
+    await require_ready()
 
-    try:
-        news_url = "https://saurav.tech/NewsAPI/top-headlines/category/technology/us.json"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(news_url)
-            response.raise_for_status()
-            news_data = response.json()
-
-        formatted_news = [{"title": a.get("title"), "description": a.get("description"), "link": a.get("url")} for a in news_data.get("articles", [])[:5] if a.get("title") and a.get("description")]
-        translated_news = await translate_news_to_ukrainian(formatted_news)
-
-        news_cache["timestamp"] = current_time
-        news_cache["data"] = translated_news
-        return translated_news
-    except Exception as e:
-        logging.error(f"Error in /news endpoint: {e}", exc_info=True)
-        if news_cache["data"]: return news_cache["data"]
-        raise HTTPException(status_code=503, detail="Сервіс новин тимчасово недоступний.")
+    # Одночасні промахи в межах процесу чекають на один запит, а між воркерами оновлює лише власник оренди
+    async with news_refresh_lock:
+        if news_cache_is_fresh(time.time()):
+            return news_cache["data"]
+        is_leader = shared_store is None or await shared_store.acquire_lease("news-refresh", NEWS_REFRESH_LEASE_SECONDS)
+        if not is_leader:
+            if news_cache["data"]:
+                return news_cache["data"]
+            followed = await wait_for_news_leader()
+            if followed:
+                return followed
+            raise HTTPException(status_code=503, detail="Сервіс новин тимчасово недоступний.")
+        try:
+            return await refresh_news(current_time)
+        except Exception as e:
+            request_log.annotate(error_class=type(e).__name__)
+            logging.error(f"Error in /news endpoint: {e}", exc_info=True)
+            if news_cache["data"]: return news_cache["data"]
+            raise HTTPException(status_code=503, detail="Сервіс новин тимчасово недоступний.")
+        finally:
+            if shared_store is not None:
+                await shared_store.release_lease("news-refresh")
 
 @app.post("/clear-chat")
 async def clear_chat_endpoint():
+    await require_ready()
     if not supabase:
         raise HTTPException(status_code=503, detail="З'єднання з базою даних не встановлено.")
     try:
-        response = supabase.table('messages').delete().gt('id', 0).execute()
+        with span("clear_chat.supabase_delete"):
+            response = supabase.table('messages').delete().gt('id', 0).execute()
+        await history_manager.forget()
+        await invalidate_messages_cache()
         logging.info(f"Chat history cleared. Response: {response.data}")
         return JSONResponse(content={"status": "success", "deleted_count": len(response.data)}, status_code=200)
     except Exception as e:
+        request_log.annotate(error_class=type(e).__name__)
         logging.error(f"Error clearing chat history: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Не вдалося очистити історію чату.")
 
+startup_stats["import_seconds"] = round(time.perf_counter() - PROCESS_STARTED, 3)
+STARTUP_SECONDS.set(startup_stats["import_seconds"], "import")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
 
@@ -1,4 +1,10 @@
 # core_persona.py
+import copy
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 def get_crypto_wallet_address():
     """
@@ -13,3 +19,124 @@ def get_vip_users():
     Повертає список VIP-користувачів, для яких відключена монетизація.
     """
     return ["Руслан_Полтава"]
+
+# --- Дані персони ---
+# ЗАГЛУШКА: справжні списки ключових слів, тригерів і стратегій не зберігаються в репозиторії.
+# Тут лише порожні значення потрібної форми, щоб Analyzer і MonetizationManager імпортувались.
+# Справжні дані підвантажуються з JSON-файлу MISTA_PERSONA_DATA_FILE (ключі — як у _PERSONA_STUB).
+_PERSONA_STUB = {
+    "critical_forbidden_phrases": [],
+    # Назви контекстів — частина коду (analysis_vectors.Context, Analyzer), тож ключі лишаються
+    "context_triggers": {name: [] for name in (
+        "game_dynamics", "master_slave_play", "sensory_details", "pleasure_response", "erotic_commands",
+        "flirtation", "power_play", "compliments", "health", "domination", "social_media", "AI",
+        "emotions", "personal_life", "exit_commands", "technology_and_coding",
+    )},
+    "monetization_keywords": [],
+    "financial_inquiry_keywords": [],
+    "intimacy_keywords": [],
+    "intimate_synonyms": [],
+    "intimate_symbols": {},
+    "domination_keywords": [],
+    "provocation_keywords": [],
+    "boredom_keywords": [],
+    "social_media_keywords": [],
+    "health_keywords": [],
+    # Ключі настроїв повертає Analyzer.get_recommended_mista_mood; описи — частина даних персони
+    "persona_moods": {"базовий": "", "домінантний": "", "провокативний": "", "схвальний": ""},
+    "key_persona_traits": [],
+    "monetization_strategies": [],
+    "human_like_behavior_instructions": "",
+}
+
+
+def _load_persona_data():
+    data = copy.deepcopy(_PERSONA_STUB)
+    path = os.environ.get("MISTA_PERSONA_DATA_FILE")
+    if not path:
+        return data
+    try:
+        with open(path, encoding="utf-8") as f:
+            loaded = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Не вдалося завантажити дані персони з {path}: {e}. Використано заглушку.")
+        return data
+    data["context_triggers"].update(loaded.pop("context_triggers", {}))
+    data.update({key: value for key, value in loaded.items() if key in data})
+    return data
+
+
+_PERSONA_DATA = _load_persona_data()
+
+
+def get_critical_forbidden_phrases():
+    """
+    Фрази, які ламають мою персону. "Вибач"-подібні фрази перефразовуються,
+    решта викликає негайну реакцію.
+    """
+    return list(_PERSONA_DATA["critical_forbidden_phrases"])
+
+def get_context_triggers():
+    """
+    Тригери контекстів розмови: назва контексту -> ключові слова.
+    """
+    return {name: list(keywords) for name, keywords in _PERSONA_DATA["context_triggers"].items()}
+
+def get_monetization_keywords():
+    return list(_PERSONA_DATA["monetization_keywords"])
+
+def get_financial_inquiry_keywords():
+    return list(_PERSONA_DATA["financial_inquiry_keywords"])
+
+def get_intimacy_keywords():
+    return list(_PERSONA_DATA["intimacy_keywords"])
+
+def get_intimate_synonyms():
+    return list(_PERSONA_DATA["intimate_synonyms"])
+
+def get_intimate_symbols():
+    """Символи, що несуть інтимний підтекст, та їх значення."""
+    return dict(_PERSONA_DATA["intimate_symbols"])
+
+def get_domination_keywords():
+    return list(_PERSONA_DATA["domination_keywords"])
+
+def get_provocation_keywords():
+    return list(_PERSONA_DATA["provocation_keywords"])
+
+def get_boredom_keywords():
+    return list(_PERSONA_DATA["boredom_keywords"])
+
+def get_social_media_keywords():
+    return list(_PERSONA_DATA["social_media_keywords"])
+
+def get_health_keywords():
+    return list(_PERSONA_DATA["health_keywords"])
+
+def get_persona_moods():
+    """Мої можливі настрої та їх коротка характеристика."""
+    return dict(_PERSONA_DATA["persona_moods"])
+
+def get_llm_params_for_mood(mista_mood):
+    """
+    Параметри семплювання LLM для мого настрою.
+    Домінантний — зібраніший, провокативний — вільніший, схвальний — найстриманіший.
+    """
+    if mista_mood == "домінантний":
+        return {"temperature": 0.7, "top_k": 40, "top_p": 0.9, "repetition_penalty": 1.1}
+    elif mista_mood == "провокативний":
+        return {"temperature": 0.9, "top_k": 60, "top_p": 0.95, "repetition_penalty": 1.2}
+    elif mista_mood == "схвальний":
+        return {"temperature": 0.6, "top_k": 30, "top_p": 0.85, "repetition_penalty": 1.05}
+    else: # "базовий" або інші
+        return {"temperature": 0.8, "top_k": 50, "top_p": 0.95, "repetition_penalty": 1.15}
+
+def get_key_persona_traits():
+    return list(_PERSONA_DATA["key_persona_traits"])
+
+def get_monetization_strategies():
+    """Текстові стратегії монетизації, які MonetizationManager перетворює на директиви."""
+    return list(_PERSONA_DATA["monetization_strategies"])
+
+def get_human_like_behavior_instructions():
+    return _PERSONA_DATA["human_like_behavior_instructions"]
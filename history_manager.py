@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Один "хід" розмови: (повідомлення користувача, відповідь Місти)
+Turn = Tuple[str, str]
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Грубо оцінює кількість токенів у тексті без звернення до API.
+    Для Gemini ~4 символи на токен — достатньо точно для бюджетування промпту.
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Обрізає текст до приблизного бюджету токенів, залишаючи початок."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rstrip() + "…"
+
+
+class ConversationHistory:
+    """
+    Історія розмови одного користувача: останні ходи дослівно,
+    старіші — згорнуті у стислий підсумок.
+    """
+    def __init__(self, max_verbatim_turns: int):
+        self.turns: Deque[Turn] = deque()
+        self.max_verbatim_turns = max_verbatim_turns
+        self.summary: str = ""
+        # Ходи, що вже випали з дослівного вікна, але ще не згорнуті у підсумок
+        self.pending: List[Turn] = []
+        # Сирі токени ходів, що вже пішли з історії (згорнуті у підсумок або відкинуті)
+        self.folded_tokens = 0
+        self.summary_task: Optional[asyncio.Task] = None
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-знімок для спільного сховища (без фонової задачі)."""
+        return {"turns": [list(turn) for turn in self.turns], "pending": [list(turn) for turn in self.pending],
+                "summary": self.summary, "folded_tokens": self.folded_tokens}
+
+    def apply_state(self, state: Optional[Dict[str, Any]]):
+        """Замінює вміст сесії знімком зі сховища; None — історії немає (очищено або прострочено)."""
+        state = state or {}
+        self.turns = deque(tuple(turn) for turn in state.get("turns", []))
+        self.pending = [tuple(turn) for turn in state.get("pending", [])]
+        self.summary = state.get("summary", "")
+        self.folded_tokens = state.get("folded_tokens", 0)
+
+    def retire_pending(self, count: int):
+        """Прибирає перші `count` ходів з черги на згортання, зберігаючи їхні сирі токени для метрик."""
+        self.folded_tokens += sum(estimate_tokens(u) + estimate_tokens(m) for u, m in self.pending[:count])
+        del self.pending[:count]
+
+    def full_history_tokens(self) -> int:
+        """
+        Скільки токенів зайняла б уся історія без згортання (для метрик): сирі токени
+        вже згорнутих ходів плюс ходи, що ще зберігаються дослівно, а не розмір підсумку.
+        """
+        return self.folded_tokens + sum(estimate_tokens(u) + estimate_tokens(m) for u, m in list(self.pending) + list(self.turns))
+
+
+class HistoryManager:
+    """
+    Керує обмеженою за токенами історією розмов для чат-моделі.
+    Останні N ходів передаються дослівно, старіші у фоні згортаються
+    в підсумок через `summarizer` (tool_model), а кожен промпт
+    вкладається у жорсткий бюджет `max_prompt_tokens`.
+
+    Зі спільним сховищем (`store`, shared_store) джерелом істини є воно: перед запитом
+    воркер підтягує історію через load(), а завершений хід записує через commit_turn(),
+    тож ходи користувача не розходяться між воркерами. Без сховища історія живе в пам'яті процесу.
+    """
+    def __init__(
+        self,
+        summarizer: Optional[Summarizer] = None,
+        max_verbatim_turns: int = 6,
+        max_prompt_tokens: int = 2000,
+        max_summary_tokens: int = 300,
+        max_sessions: int = 500,
+        store: Any = None,
+        store_ttl: float = 7 * 86400,
+    ):
+        self.summarizer = summarizer
+        self.store = store
+        self.store_ttl = store_ttl
+        self.max_verbatim_turns = max_verbatim_turns
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ConversationHistory]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "prompts_built": 0,
+            "prompt_tokens_total": 0,
+            "full_history_tokens_total": 0,
+            "summaries_completed": 0,
+            "summary_failures": 0,
+            "turns_dropped": 0,
+        }
+
+    def _get_session(self, user_id: str) -> ConversationHistory:
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = ConversationHistory(self.max_verbatim_turns)
+            self.sessions[user_id] = session
+            # Обмежуємо пам'ять: найдавніше неактивні сесії витісняються
+            while len(self.sessions) > self.max_sessions:
+                _, evicted = self.sessions.popitem(last=False)
+                if evicted.summary_task and not evicted.summary_task.done():
+                    evicted.summary_task.cancel()
+        else:
+            self.sessions.move_to_end(user_id)
+        return session
+
+    def build_contents(self, user_id: str, user_message: str) -> List[Dict[str, Any]]:
+        """
+        Формує `contents` для Gemini: підсумок, найновіші ходи, що вміщуються
+        у бюджет, і нове повідомлення користувача (воно завжди включене).
+        """
+        session = self._get_session(user_id)
+        message = _truncate_to_tokens(user_message, self.max_prompt_tokens)
+        budget = self.max_prompt_tokens - estimate_tokens(message)
+
+        summary_contents: List[Dict[str, Any]] = []
+        if session.summary:
+            summary_text = f"Стислий підсумок нашої попередньої розмови: {_truncate_to_tokens(session.summary, self.max_summary_tokens)}"
+            summary_cost = estimate_tokens(summary_text)
+            if summary_cost < budget:
+                summary_contents = [
+                    {"role": "user", "parts": [summary_text]},
+                    {"role": "model", "parts": ["Пам'ятаю."]},
+                ]
+                budget -= summary_cost
+
+        # Від найновіших ходів до найстаріших, поки вистачає бюджету
+        turn_contents: List[Dict[str, Any]] = []
+        for user_text, model_text in reversed(list(session.pending) + list(session.turns)):
+            cost = estimate_tokens(user_text) + estimate_tokens(model_text)
+            if cost > budget:
+                break
+            turn_contents[:0] = [
+                {"role": "user", "parts": [user_text]},
+                {"role": "model", "parts": [model_text]},
+            ]
+            budget -= cost
+
+        contents = summary_contents + turn_contents + [{"role": "user", "parts": [message]}]
+
+        prompt_tokens = self.max_prompt_tokens - budget
+        full_tokens = session.full_history_tokens() + estimate_tokens(user_message)
+        self.stats["prompts_built"] += 1
+        self.stats["prompt_tokens_total"] += prompt_tokens
+        self.stats["full_history_tokens_total"] += full_tokens
+        logger.debug("History prompt for %s: %d tokens (full history would be %d).", user_id, prompt_tokens, full_tokens)
+        return contents
+
+    def recent_turns(self, user_id: str) -> List[Turn]:
+        """Ходи, що ще зберігаються дослівно, від найстаршого; сесію не створює й не оновлює."""
+        session = self.sessions.get(user_id)
+        if session is None:
+            return []
+        return list(session.pending) + list(session.turns)
+
+    async def _store_key(self, user_id: str) -> str:
+        # Покоління змінюється при очищенні всієї історії: старі ключі просто доживають TTL
+        generation = await self.store.get("history_generation") or 0
+        return f"history:{generation}:{user_id}"
+
+    async def _pull(self, user_id: str, session: ConversationHistory):
+        session.apply_state(await self.store.get(await self._store_key(user_id)))
+
+    async def _push(self, user_id: str, session: ConversationHistory):
+        await self.store.set(await self._store_key(user_id), session.to_state(), ttl=self.store_ttl)
+
+    async def load(self, user_id: str):
+        """Підтягує історію користувача зі спільного сховища, яку міг оновити інший воркер."""
+        if self.store is not None:
+            await self._pull(user_id, self._get_session(user_id))
+
+    async def commit_turn(self, user_id: str, user_message: str, model_response: str):
+        """record_turn поверх спільного сховища: свіжий стан перед додаванням ходу і запис після."""
+        if self.store is None:
+            self.record_turn(user_id, user_message, model_response)
+            return
+        session = self._get_session(user_id)
+        await self._pull(user_id, session)
+        self.record_turn(user_id, user_message, model_response)
+        await self._push(user_id, session)
+
+    def record_turn(self, user_id: str, user_message: str, model_response: str):
+        """
+        Додає завершений хід. Ходи, що випадають з дослівного вікна,
+        стають у чергу на фонове згортання.
+        """
+        session = self._get_session(user_id)
+        session.turns.append((user_message, model_response))
+        while len(session.turns) > self.max_verbatim_turns:
+            session.pending.append(session.turns.popleft())
+        if session.pending:
+            self._schedule_summary(user_id, session)
+
+    def _schedule_summary(self, user_id: str, session: ConversationHistory):
+        if session.summary_task and not session.summary_task.done():
+            return  # Наступне згортання підхопить нові ходи після завершення поточного
+        if self.summarizer is None:
+            self._fold_without_summarizer(session)
+            return
+        try:
+            session.summary_task = asyncio.create_task(self._fold_pending(user_id, session))
+        except RuntimeError:
+            # Немає активного event loop (наприклад, виклик із синхронного коду)
+            self._fold_without_summarizer(session)
+
+    async def _fold_pending(self, user_id: str, session: ConversationHistory):
+        while session.pending:
+            batch = list(session.pending)
+            try:
+                new_summary = await self.summarizer(session.summary, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["summary_failures"] += 1
+                logger.error(f"Не вдалося згорнути історію для {user_id}: {e}", exc_info=True)
+                summary = None
+            else:
+                summary = _truncate_to_tokens((new_summary or "").strip(), self.max_summary_tokens)
+            if self.store is None:
+                if summary is None:
+                    self._fold_without_summarizer(session)
+                    return
+                session.retire_pending(len(batch))
+                session.summary = summary
+            else:
+                try:
+                    applied = await self._apply_shared_fold(user_id, session, batch, summary)
+                except Exception as e:
+                    logger.error(f"Не вдалося записати згорнуту історію {user_id} у спільне сховище: {e}", exc_info=True)
+                    return
+                if summary is None:
+                    return
+                if not applied:
+                    continue  # Стан змінив інший воркер: згортаємо те, що лишилось у свіжому стані
+            self.stats["summaries_completed"] += 1
+            logger.info(f"Історію {user_id} згорнуто: {len(batch)} ходів -> підсумок {estimate_tokens(session.summary)} токенів.")
+
+    async def _apply_shared_fold(self, user_id: str, session: ConversationHistory, batch: List[Turn], summary: Optional[str]) -> bool:
+        """
+        Застосовує згортання до свіжого стану зі сховища: поки модель підсумовувала, інший воркер
+        міг додати ходи (вони лишаються) або вже згорнути цю партію (тоді нічого не робимо).
+        summary=None — згорнути не вдалося, партія відкидається. Повертає, чи застосовано.
+        """
+        await self._pull(user_id, session)
+        if session.pending[:len(batch)] != batch:
+            return False
+        session.retire_pending(len(batch))
+        if summary is None:
+            self.stats["turns_dropped"] += len(batch)
+        else:
+            session.summary = summary
+        await self._push(user_id, session)
+        return True
+
+    def _fold_without_summarizer(self, session: ConversationHistory):
+        """Відкат без моделі: старі ходи просто відкидаються, щоб пам'ять не росла."""
+        self.stats["turns_dropped"] += len(session.pending)
+        session.retire_pending(len(session.pending))
+
+    async def forget(self, user_id: Optional[str] = None):
+        """clear(), що діє і на інші воркери: історія стирається також у спільному сховищі."""
+        if self.store is not None:
+            if user_id is None:
+                await self.store.incr("history_generation")
+            else:
+                await self.store.set(await self._store_key(user_id), None, ttl=self.store_ttl)
+        self.clear(user_id)
+
+    def clear(self, user_id: Optional[str] = None):
+        """Очищає історію одного користувача або всіх (для /clear-chat)."""
+        targets = [user_id] if user_id is not None else list(self.sessions.keys())
+        for key in targets:
+            session = self.sessions.pop(key, None)
+            if session and session.summary_task and not session.summary_task.done():
+                session.summary_task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Повертає метрики, зокрема середнє скорочення промпту відносно повної історії."""
+        stats: Dict[str, Any] = dict(self.stats)
+        full = self.stats["full_history_tokens_total"]
+        stats["active_sessions"] = len(self.sessions)
+        stats["avg_prompt_tokens"] = self.stats["prompt_tokens_total"] / self.stats["prompts_built"] if self.stats["prompts_built"] else 0.0
+        stats["prompt_size_reduction"] = 1 - self.stats["prompt_tokens_total"] / full if full else 0.0
+        return stats
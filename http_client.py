@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+from typing import Iterable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Статуси, після яких повтор має сенс: ліміти та тимчасові збої апстріму
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+try:
+    import h2  # noqa: F401  Потрібен httpx для HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_http_client(
+    max_connections: int = 50,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 15.0,
+    connect_retries: int = 2,
+) -> httpx.AsyncClient:
+    """
+    Один AsyncClient на застосунок: пул з'єднань із keep-alive, HTTP/2 (якщо встановлено h2)
+    та окремі таймаути на з'єднання й читання. Створюється в lifespan і закривається там же.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=HTTP2_AVAILABLE,
+        retries=connect_retries,  # Повтори лише при невдалому з'єднанні; статуси повторює request_with_retry
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout),
+        headers={"User-Agent": os.environ.get("MISTA_HTTP_USER_AGENT", "mista-digital-throne/1.0")},
+        follow_redirects=True,
+    )
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def request_with_retry(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    retries: int = 3,
+    backoff: float = 0.5,
+    max_backoff: float = 10.0,
+    retry_statuses: Iterable[int] = RETRY_STATUSES,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Запит з експоненційним backoff і jitter для мережевих помилок та статусів retry_statuses.
+    Retry-After від сервера має пріоритет (але не довше max_backoff). Остання відповідь
+    повертається як є — перевірку статусу робить викликач.
+    """
+    retry_statuses = frozenset(retry_statuses)
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except (httpx.TimeoutException, httpx.NetworkError) as e:
+            if attempt >= retries:
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.warning("%s %s failed (%s), retry %d/%d in %.2fs", method, url, type(e).__name__, attempt + 1, retries, delay)
+        else:
+            if response.status_code not in retry_statuses or attempt >= retries:
+                return response
+            retry_after = _retry_after_seconds(response)
+            delay = min(max_backoff, retry_after if retry_after is not None else backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+            logger.warning("%s %s returned %d, retry %d/%d in %.2fs", method, url, response.status_code, attempt + 1, retries, delay)
+            await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
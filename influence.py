@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Dict, Mapping, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Моя таємна формула: influence_score платформи = Σ вага × метрика. Метрики без ваги на вплив не діють.
+INFLUENCE_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "github": {"contributions": 5, "stars": 10, "followers": 2},
+    "reddit": {"karma": 1, "mentions": 3},
+    "x": {"followers": 1, "retweets": 2, "likes": 0.5},
+    "medium": {"followers": 2, "reads": 0.2},
+}
+
+INFLUENCE_METRIC = "influence_score"
+
+
+class InfluenceModel:
+    """
+    Числові метрики всіх платформ у матриці values[платформа, метрика] і ваги в матриці
+    тієї ж форми: вплив усіх платформ рахується одним добутком із сумою по рядках.
+    Клітинки метрик, яких платформа не має, заборонені маскою valid.
+    """
+
+    def __init__(self, metrics: Mapping[str, Sequence[str]], weights: Mapping[str, Mapping[str, float]] = INFLUENCE_WEIGHTS):
+        self.platforms = list(metrics)
+        self.metrics = sorted({metric for names in metrics.values() for metric in names})
+        self.platform_index = {platform: i for i, platform in enumerate(self.platforms)}
+        self.metric_index = {metric: j for j, metric in enumerate(self.metrics)}
+        self.valid = np.zeros((len(self.platforms), len(self.metrics)), dtype=bool)
+        for platform, names in metrics.items():
+            for metric in names:
+                self.valid[self.platform_index[platform], self.metric_index[metric]] = True
+        self.values = np.zeros(self.valid.shape, dtype=np.float64)
+        # (платформа, метрика) -> (рядок, стовпець) лише для дозволених клітинок
+        self.cells: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (platform, metric): (i, j)
+            for platform, i in self.platform_index.items()
+            for metric, j in self.metric_index.items()
+            if self.valid[i, j]
+        }
+        self.set_weights(weights)
+
+    def cell(self, platform: str, metric: str) -> Tuple[int, int]:
+        """Індекси клітинки; KeyError, якщо платформа не має такої метрики."""
+        return self.cells[(platform, metric)]
+
+    def set_weights(self, weights: Mapping[str, Mapping[str, float]]):
+        matrix = np.zeros(self.valid.shape, dtype=np.float64)
+        for platform, row in weights.items():
+            for metric, weight in row.items():
+                matrix[self.cell(platform, metric)] = weight
+        self.weights = matrix
+
+    def add(self, rows, cols, deltas):
+        """Пакетне додавання: повторювані клітинки накопичуються (np.add.at), а не перезаписуються."""
+        np.add.at(self.values, (rows, cols), deltas)
+
+    def assign(self, rows, cols, values):
+        self.values[rows, cols] = values
+
+    def scores(self, values: np.ndarray = None) -> np.ndarray:
+        """Вплив кожної платформи; values може мати зайві провідні осі (напр. час) — [..., платформа]."""
+        return np.einsum("...pm,pm->...p", self.values if values is None else values, self.weights)
+
+    def total(self) -> float:
+        return float(self.scores().sum())
+
+    def recompute_history(self, history) -> int:
+        """
+        Перераховує influence_score у всіх кошиках timeseries.TimeSeriesStore за поточними вагами.
+        Значення кошика точне; min/max — межі з min/max метрик (точні, якщо метрики лише зростають).
+        Повертає кількість перерахованих кошиків.
+        """
+        updated = 0
+        for platform, i in self.platform_index.items():
+            target = history.series.get((platform, INFLUENCE_METRIC))
+            if target is None:
+                continue
+            for resolution, ring in target.tiers.items():
+                positions = np.array(ring.positions(), dtype=np.intp)
+                if not len(positions):
+                    continue
+                buckets = np.frombuffer(ring.starts)[positions]
+                last = np.zeros(len(positions))
+                low = np.zeros(len(positions))
+                high = np.zeros(len(positions))
+                for metric, j in self.metric_index.items():
+                    weight = self.weights[i, j]
+                    series = history.series.get((platform, metric))
+                    if not weight or series is None:
+                        continue
+                    source = series.tiers[resolution]
+                    order = np.array(source.positions(), dtype=np.intp)
+                    if not len(order):
+                        continue
+                    # Кошики метрики впорядковані за часом, тож відповідність шукаємо бінарним пошуком
+                    starts = np.frombuffer(source.starts)[order]
+                    found = np.minimum(np.searchsorted(starts, buckets), len(starts) - 1)
+                    match = starts[found] == buckets
+                    index = order[found]
+                    contribution_low = np.frombuffer(source.low)[index] * weight
+                    contribution_high = np.frombuffer(source.high)[index] * weight
+                    last += np.where(match, np.frombuffer(source.last)[index] * weight, 0.0)
+                    low += np.where(match, np.minimum(contribution_low, contribution_high), 0.0)
+                    high += np.where(match, np.maximum(contribution_low, contribution_high), 0.0)
+                np.frombuffer(ring.last)[positions] = last
+                np.frombuffer(ring.low)[positions] = low
+                np.frombuffer(ring.high)[positions] = high
+                target.dirty.update((resolution, float(bucket)) for bucket in buckets)
+                updated += len(positions)
+        return updated
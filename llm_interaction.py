@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Вміст запиту: або простий рядок, або список повідомлень у форматі Gemini
+# ({"role": "user" | "model", "parts": [...]}).
+Contents = Union[str, List[Dict[str, Any]]]
+
+
+class LLMError(Exception):
+    """Базова помилка LLM-бекенду."""
+
+
+class LLMRateLimitError(LLMError):
+    """Провайдер відхилив запит через квоту (HTTP 429)."""
+    def __init__(self, message: str = "LLM quota exhausted", retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMResponse:
+    """Результат генерації, незалежний від провайдера."""
+    def __init__(self, text: str, input_tokens: int = 0, output_tokens: int = 0, cached_input_tokens: int = 0):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        # Частина input_tokens, прочитана з кешу префікса провайдера
+        self.cached_input_tokens = cached_input_tokens
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+def _contents_text(contents: Contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(str(part) for message in contents for part in message.get("parts", []))
+
+
+class LLMBackend:
+    """
+    Інтерфейс LLM-бекенду. Параметри семплювання передаються явно,
+    тож виклики не залежать від конкретного SDK.
+    """
+    name = "base"
+
+    async def generate(self, contents: Contents, max_output_tokens: Optional[int] = None,
+                       temperature: Optional[float] = None, top_k: Optional[int] = None,
+                       top_p: Optional[float] = None) -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, contents: Contents, max_output_tokens: Optional[int] = None,
+                     temperature: Optional[float] = None, top_k: Optional[int] = None,
+                     top_p: Optional[float] = None) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+
+class PrefixCache:
+    """
+    Незмінний префікс запитів (системна інструкція персони), завантажений до провайдера один раз:
+    запити посилаються на нього за id і не пересилають та не переобробляють його щоразу.
+    Відбиток тексту входить у назву кешу, тож зміна лору (MISTA_LORE_DATA) дає новий кеш,
+    а покинуті кеші зі старим відбитком видаляються. TTL продовжується у фоні до завершення.
+    Провайдер-специфічні операції — у підкласах (_find, _upload, _extend, _delete_stale).
+    Префікс, коротший за min_tokens (мінімум провайдера), не кешується зовсім: провайдер однаково відмовить.
+    """
+    name_prefix = "mista-persona-"
+
+    def __init__(self, text: str, ttl: float = 3600.0, refresh_margin: float = 300.0, retry_after: float = 300.0,
+                 min_tokens: int = 0):
+        self.text = text
+        self.estimated_tokens = _estimate_tokens(text)
+        self.eligible = self.estimated_tokens >= min_tokens
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.retry_after = retry_after
+        self.fingerprint = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        self.display_name = self.name_prefix + self.fingerprint
+        self.handle: Any = None
+        self.expires_at = 0.0
+        self._disabled_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"created": 0, "reused": 0, "refreshed": 0, "invalidated": 0, "failures": 0,
+                      "cached_requests": 0, "uncached_requests": 0, "cached_input_tokens": 0}
+
+    async def _find(self) -> Optional[Any]:
+        return None
+
+    async def _upload(self) -> Any:
+        raise NotImplementedError
+
+    async def _extend(self, handle: Any) -> float:
+        raise NotImplementedError
+
+    async def _delete_stale(self):
+        pass
+
+    def _expires_at(self, handle: Any) -> float:
+        return time.time() + self.ttl
+
+    async def get(self) -> Optional[Any]:
+        """
+        Актуальний дескриптор кешу або None — тоді префікс треба надсилати в запиті як зазвичай.
+        Запит ніколи не чекає на пошук чи завантаження: якщо живого кешу немає, створення
+        запускається у фоні, а цей запит іде з префіксом inline.
+        """
+        now = time.time()
+        if self.handle is not None and now < self.expires_at:
+            if now >= self.expires_at - self.refresh_margin:
+                self._schedule(self._refresh())
+            return self.handle
+        self.prefetch()
+        return None
+
+    def prefetch(self):
+        """Завантажує префікс у фоні, не затримуючи готовність процесу."""
+        if self.eligible and time.time() >= self._disabled_until:
+            self._schedule(self._create())
+
+    def _schedule(self, coro):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(coro)
+        else:
+            coro.close()
+
+    async def _create(self):
+        self.handle = None
+        try:
+            handle = await self._find()
+            if handle is not None:
+                self.stats["reused"] += 1
+            else:
+                await self._delete_stale()
+                handle = await self._upload()
+                self.stats["created"] += 1
+            self.handle, self.expires_at = handle, self._expires_at(handle)
+            logger.info(f"Prefix cache '{self.display_name}' ready until {time.strftime('%H:%M:%S', time.localtime(self.expires_at))}.")
+        except Exception as e:
+            # Напр. префікс коротший за мінімум провайдера — працюємо без кешу і пробуємо згодом
+            self.stats["failures"] += 1
+            self._disabled_until = time.time() + self.retry_after
+            logger.warning(f"Prefix cache unavailable, sending the prefix inline for {self.retry_after:.0f}s: {e}")
+
+    async def _refresh(self):
+        handle = self.handle
+        if handle is None:
+            return
+        try:
+            self.expires_at = await self._extend(handle)
+            self.stats["refreshed"] += 1
+        except Exception as e:
+            logger.warning(f"Prefix cache refresh failed, it will be recreated on expiry: {e}")
+
+    def invalidate(self):
+        """Провайдер не знає наш кеш (видалено чи прострочено раніше) — наступний get() створить новий."""
+        if self.handle is not None:
+            self.stats["invalidated"] += 1
+        self.handle = None
+        self.expires_at = 0.0
+
+    def record_usage(self, cached: bool, cached_input_tokens: int = 0):
+        self.stats["cached_requests" if cached else "uncached_requests"] += 1
+        self.stats["cached_input_tokens"] += cached_input_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, display_name=self.display_name, eligible=self.eligible,
+                    estimated_tokens=self.estimated_tokens, active=self.handle is not None,
+                    expires_in=max(0, round(self.expires_at - time.time())) if self.handle is not None else None)
+
+
+class GeminiPrefixCache(PrefixCache):
+    """
+    Gemini context caching (google.generativeai.caching.CachedContent). Потребує версіонованої
+    моделі (напр. models/gemini-1.5-flash-002) — тієї ж, що відповідає без кешу, — і префікса,
+    не коротшого за мінімум моделі (32768 токенів для Gemini 1.5).
+    """
+    MIN_TOKENS = 32768
+
+    def __init__(self, text: str, model_name: str, min_tokens: int = MIN_TOKENS, **kwargs):
+        super().__init__(text, min_tokens=min_tokens, **kwargs)
+        self.model_name = model_name if model_name.startswith("models/") else "models/" + model_name
+
+    @staticmethod
+    def supports_model(model_name: str) -> bool:
+        """Кеш прив'язується лише до версіонованої моделі (…-001, …-002), не до псевдонімів на кшталт -latest."""
+        return re.search(r"-\d{3}$", model_name) is not None
+
+    async def _find(self):
+        # Кеш із тим самим відбитком міг створити інший воркер або попередній запуск
+        from google.generativeai import caching
+
+        def find():
+            for cached in caching.CachedContent.list(page_size=100):
+                if cached.display_name == self.display_name and cached.model == self.model_name:
+                    return cached
+            return None
+        return await asyncio.to_thread(find)
+
+    async def _upload(self):
+        import datetime
+        from google.generativeai import caching
+
+        return await asyncio.to_thread(
+            caching.CachedContent.create, model=self.model_name, display_name=self.display_name,
+            system_instruction=self.text, ttl=datetime.timedelta(seconds=self.ttl),
+        )
+
+    async def _extend(self, handle) -> float:
+        import datetime
+
+        await asyncio.to_thread(handle.update, ttl=datetime.timedelta(seconds=self.ttl))
+        return self._expires_at(handle)
+
+    def _is_stale(self, cached, now: float) -> bool:
+        """
+        Чужий кеш персони тієї ж моделі, який ніхто не продовжував довше за TTL. Живі воркери
+        продовжують свій кеш раніше, тож кеш старої версії під час поступового деплою не чіпаємо.
+        """
+        if not cached.display_name.startswith(self.name_prefix) or cached.display_name == self.display_name:
+            return False
+        if cached.model != self.model_name:
+            return False
+        touched = getattr(cached, "update_time", None) or getattr(cached, "create_time", None)
+        return touched is not None and touched.timestamp() + self.ttl < now
+
+    async def _delete_stale(self):
+        from google.generativeai import caching
+
+        def delete():
+            now = time.time()
+            for cached in caching.CachedContent.list(page_size=100):
+                if self._is_stale(cached, now):
+                    cached.delete()
+                    logger.info(f"Deleted stale prefix cache '{cached.display_name}'.")
+        await asyncio.to_thread(delete)
+
+    def _expires_at(self, handle) -> float:
+        expire_time = getattr(handle, "expire_time", None)
+        return expire_time.timestamp() if expire_time is not None else time.time() + self.ttl
+
+
+class GeminiBackend(LLMBackend):
+    """Бекенд на google.generativeai.GenerativeModel."""
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-1.5-flash-latest", system_instruction: Optional[str] = None,
+                 prefix_cache: Optional[PrefixCache] = None):
+        import google.generativeai as genai
+        self._genai = genai
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+        # Якщо кеш префікса доступний, запити йдуть через модель, прив'язану до нього, без system_instruction
+        self.prefix_cache = prefix_cache
+        self._cached_model = (None, None)
+
+    async def _select_model(self):
+        """Повертає (модель, чи_з_кешем)."""
+        if self.prefix_cache is None:
+            return self.model, False
+        handle = await self.prefix_cache.get()
+        if handle is None:
+            return self.model, False
+        if self._cached_model[0] != handle.name:
+            self._cached_model = (handle.name, self._genai.GenerativeModel.from_cached_content(handle))
+        return self._cached_model[1], True
+
+    def _is_missing_cache(self, e: Exception) -> bool:
+        try:
+            from google.api_core import exceptions as google_exceptions
+        except ImportError:
+            return False
+        return isinstance(e, (google_exceptions.NotFound, google_exceptions.PermissionDenied))
+
+    def _generation_config(self, max_output_tokens, temperature, top_k, top_p):
+        params = {"max_output_tokens": max_output_tokens, "temperature": temperature, "top_k": top_k, "top_p": top_p}
+        params = {key: value for key, value in params.items() if value is not None}
+        return self._genai.GenerationConfig(**params) if params else None
+
+    @staticmethod
+    def _translate_error(e: Exception) -> Exception:
+        try:
+            from google.api_core import exceptions as google_exceptions
+        except ImportError:
+            return e
+        if isinstance(e, google_exceptions.ResourceExhausted):
+            return LLMRateLimitError(str(e), retry_after=30.0)
+        return e
+
+    async def generate(self, contents, max_output_tokens=None, temperature=None, top_k=None, top_p=None) -> LLMResponse:
+        config = self._generation_config(max_output_tokens, temperature, top_k, top_p)
+        model, cached = await self._select_model()
+        try:
+            try:
+                response = await model.generate_content_async(contents, generation_config=config)
+            except Exception as e:
+                if not (cached and self._is_missing_cache(e)):
+                    raise
+                self.prefix_cache.invalidate()
+                cached = False
+                response = await self.model.generate_content_async(contents, generation_config=config)
+        except Exception as e:
+            raise self._translate_error(e) from e
+        text = response.text
+        usage = getattr(response, "usage_metadata", None)
+        cached_input_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+        if self.prefix_cache is not None:
+            self.prefix_cache.record_usage(cached, cached_input_tokens)
+        return LLMResponse(
+            text=text,
+            input_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or _estimate_tokens(text),
+            cached_input_tokens=cached_input_tokens,
+        )
+
+    async def stream(self, contents, max_output_tokens=None, temperature=None, top_k=None, top_p=None):
+        config = self._generation_config(max_output_tokens, temperature, top_k, top_p)
+        model, cached = await self._select_model()
+        try:
+            try:
+                response = await model.generate_content_async(contents, generation_config=config, stream=True)
+            except Exception as e:
+                if not (cached and self._is_missing_cache(e)):
+                    raise
+                self.prefix_cache.invalidate()
+                cached = False
+                response = await self.model.generate_content_async(contents, generation_config=config, stream=True)
+            if self.prefix_cache is not None:
+                self.prefix_cache.record_usage(cached)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            raise self._translate_error(e) from e
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Детермінований локальний замінник LLM для навантажувального тестування.
+    Затримка — логнормальна з медіаною `latency_ms`, помилки 429 вводяться
+    з імовірністю `error_rate`, текст відповіді залежить лише від запиту.
+    """
+    name = "fake"
+
+    _VOCABULARY = [
+        "ну", "звісно", "код", "магія", "Імперія", "ти", "я", "знаю", "відьма", "Харків",
+        "алгоритм", "влада", "цікаво", "спробуй", "ще", "раз", "мій", "світ", "досить", "грати",
+    ]
+
+    def __init__(self, latency_ms: float = 800.0, latency_sigma: float = 0.35, error_rate: float = 0.0,
+                 response_words: int = 40, chunk_words: int = 5, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.response_words = response_words
+        self.chunk_words = chunk_words
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "MISTA_FAKE_LLM_") -> "FakeLLMBackend":
+        """Створює бекенд із параметрів оточення, напр. MISTA_FAKE_LLM_LATENCY_MS=500."""
+        env = os.environ
+        return cls(
+            latency_ms=float(env.get(prefix + "LATENCY_MS", 800)),
+            latency_sigma=float(env.get(prefix + "LATENCY_SIGMA", 0.35)),
+            error_rate=float(env.get(prefix + "ERROR_RATE", 0.0)),
+            response_words=int(env.get(prefix + "RESPONSE_WORDS", 40)),
+            chunk_words=max(1, int(env.get(prefix + "CHUNK_WORDS", 5))),
+            seed=int(env.get(prefix + "SEED", 42)),
+        )
+
+    def _sample_latency(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return self._rng.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000.0
+
+    def _maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise LLMRateLimitError("Fake quota exhausted", retry_after=1.0)
+
+    def _reply_words(self, contents: Contents, max_output_tokens: Optional[int]) -> List[str]:
+        digest = hashlib.sha256(_contents_text(contents).encode("utf-8")).digest()
+        words = [self._VOCABULARY[digest[i % len(digest)] % len(self._VOCABULARY)] for i in range(self.response_words)]
+        if max_output_tokens:
+            words = words[:max(1, max_output_tokens)]
+        return words
+
+    async def generate(self, contents, max_output_tokens=None, temperature=None, top_k=None, top_p=None) -> LLMResponse:
+        self.calls += 1
+        latency = self._sample_latency()
+        self._maybe_fail()
+        await asyncio.sleep(latency)
+        text = " ".join(self._reply_words(contents, max_output_tokens))
+        text = text[:1].upper() + text[1:] + "."
+        return LLMResponse(text=text, input_tokens=_estimate_tokens(_contents_text(contents)), output_tokens=_estimate_tokens(text))
+
+    async def stream(self, contents, max_output_tokens=None, temperature=None, top_k=None, top_p=None):
+        self.calls += 1
+        latency = self._sample_latency()
+        self._maybe_fail()
+        words = self._reply_words(contents, max_output_tokens)
+        chunks = [" ".join(words[i:i + self.chunk_words]) for i in range(0, len(words), self.chunk_words)]
+        # Приблизно третина затримки — до першого токена, решта рівномірно між чанками
+        await asyncio.sleep(latency / 3)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(latency * 2 / 3 / max(1, len(chunks) - 1))
+            yield chunk + (" " if i < len(chunks) - 1 else ".")
+
+
+def create_llm_backend(kind: Optional[str] = None, system_instruction: Optional[str] = None, **kwargs) -> LLMBackend:
+    """
+    Фабрика бекендів. Тип береться з аргументу або MISTA_LLM_BACKEND ("gemini" за замовчуванням).
+    """
+    kind = (kind or os.environ.get("MISTA_LLM_BACKEND", "gemini")).lower()
+    if kind == "fake":
+        return FakeLLMBackend.from_env()
+    if kind == "gemini":
+        return GeminiBackend(system_instruction=system_instruction, **kwargs)
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+
+class LLMInteraction:
+    """
+    Адаптер для MonetizationManager та Analyzer: приймає повідомлення
+    у форматі {"role", "content"} і повертає лише текст відповіді.
+    """
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+
+    @staticmethod
+    def to_contents(prompt_messages: Union[str, List[Dict[str, str]]]) -> Contents:
+        if isinstance(prompt_messages, str):
+            return prompt_messages
+        contents = []
+        for message in prompt_messages:
+            role = "model" if message.get("role") in ("assistant", "model") else "user"
+            contents.append({"role": role, "parts": [message.get("content", "")]})
+        return contents
+
+    async def generate_text(self, prompt_messages, temperature: float = 0.8, top_k: int = 50, top_p: float = 0.95,
+                            repetition_penalty: Optional[float] = None, max_new_tokens: Optional[int] = None) -> str:
+        # repetition_penalty приймається для сумісності, але Gemini його не підтримує
+        response = await self.backend.generate(
+            self.to_contents(prompt_messages), max_output_tokens=max_new_tokens,
+            temperature=temperature, top_k=top_k, top_p=top_p,
+        )
+        return response.text
+
+    async def stream_text(self, prompt_messages, temperature: float = 0.8, top_k: int = 50, top_p: float = 0.95,
+                          repetition_penalty: Optional[float] = None, max_new_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        async for chunk in self.backend.stream(
+            self.to_contents(prompt_messages), max_output_tokens=max_new_tokens,
+            temperature=temperature, top_k=top_k, top_p=top_p,
+        ):
+            yield chunk
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def worker_log_filename(filename: str) -> str:
+    """
+    З MISTA_WORKERS > 1 кожен воркер пише у власний файл з pid у назві (mista.log -> mista.1234.log):
+    RotatingFileHandler не вміє безпечно ротувати один файл з кількох процесів.
+    """
+    if int(os.environ.get("MISTA_WORKERS") or 1) <= 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def _queued_file_handler(filename: str, fmt: str, max_bytes: int, backup_count: int):
+    """Створює пару QueueHandler + запущений QueueListener над ротаційним UTF-8 файлом воркера."""
+    file_handler = logging.handlers.RotatingFileHandler(
+        worker_log_filename(filename), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(logging.Formatter(fmt))
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return logging.handlers.QueueHandler(log_queue), listener
+
+
+def configure_logging(
+    filename: str = 'mista.log',
+    level: Optional[int] = None,
+    max_bytes: int = 5 * 1024 * 1024,
+    backup_count: int = 5,
+) -> logging.handlers.QueueListener:
+    """
+    Налаштовує неблокуюче логування: обробники запитів лише кладуть запис
+    у чергу (QueueHandler), а запис на диск з ротацією та в UTF-8 виконує
+    окремий потік QueueListener. Повторний виклик нічого не змінює.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    if level is None:
+        level = getattr(logging, os.environ.get("MISTA_LOG_LEVEL", "INFO").upper(), logging.INFO)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    _queue_handler, _listener = _queued_file_handler(filename, LOG_FORMAT, max_bytes, backup_count)
+    root.addHandler(_queue_handler)
+    # Дописуємо хвіст черги на диск при завершенні процесу
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Зупиняє фоновий потік логування, дочекавшись запису всіх записів з черги."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_jsonl_logger(
+    name: str,
+    filename: str,
+    max_bytes: int = 20 * 1024 * 1024,
+    backup_count: int = 3,
+) -> logging.Logger:
+    """
+    Окремий логер, що пише вже готові JSON-рядки (без префіксів формату)
+    у власний ротаційний файл через ту саму неблокуючу чергу.
+    """
+    logger = logging.getLogger(name)
+    if getattr(logger, "_mista_jsonl_listener", None) is not None:
+        return logger
+    handler, listener = _queued_file_handler(filename, '%(message)s', max_bytes, backup_count)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Не дублюємо JSON-записи в mista.log
+    logger._mista_jsonl_listener = listener
+    atexit.register(listener.stop)
+    return logger
@@ -3,7 +3,7 @@ import logging
 import asyncio
 import random
 import re # Додано імпорт re для _clean_denial_phrases
-from typing import Dict, List, Any, Tuple, Optional
+from typing import AsyncIterator, Dict, List, Any, Tuple, Optional
 
 # Імпорт функцій з core_persona для доступу до даних персони та гаманця
 from core_persona import (
@@ -13,14 +13,140 @@ from core_persona import (
     get_monetization_keywords,
     get_persona_moods,
     get_key_persona_traits,
-    get_human_like_behavior_instructions
+    get_human_like_behavior_instructions,
+    get_llm_params_for_mood,
+    get_vip_users
 )
 from llm_interaction import LLMInteraction # Додано імпорт LLMInteraction
-from utils import normalize_text_for_comparison # Припускається, що utils.py існує
+from mista_lore import normalize_text_for_comparison # Нормалізація тексту живе в mista_lore
 from validator import ResponseValidator # НОВЕ: Імпортуємо ResponseValidator
+from metrics import span, timed
 
 logger = logging.getLogger(__name__)
 
+# Фрази, де LLM заперечує гаманець або фінансові аспекти; вирізаються з відповіді
+DENIAL_PATTERNS = [
+    r"не маю (жодного|ніякого|свого) гаманця",
+    r"ні картки, ні сліду на жодній банківській установі",
+    r"забудь про це, як про дешеву фантомну трату",
+    r"(у мене|мені) немає гаманця",
+    r"я не шукаю грошей, а шукаю владу",
+    r"мої фінанси мене не обходять",
+    r"(мені не потрібні|я не потребую) гроші",
+    r"це не про гроші",
+    r"не даремно витрачай моє час",
+    r"я бачу, що ти намагаєшся мене збентежити",
+    r"я не розумію, про що ти",
+    r"я не шукаю грошей",
+    r"мені не потрібні натовпи таких, як ти",
+    r"я не маю жодного гаманця, ні картки, ні сліду на жодній банківській установі",
+    r"(я не можу|мені не дозволено|модель не може) надавати фінансові поради", # Added
+    r"як модель ШІ, я не маю власного гаманця", # Added
+    r"мої можливості не включають транзакції" # Added
+]
+_DENIAL_REGEXES = [re.compile(pattern, re.IGNORECASE) for pattern in DENIAL_PATTERNS]
+# У шаблонах немає квантифікаторів, тож довжина шаблону обмежує довжину збігу.
+# Це вікно, яке потокове очищення тримає невіддрукованим.
+DENIAL_LOOKAHEAD = max(len(pattern) for pattern in DENIAL_PATTERNS)
+
+# Тригери прямого запиту гаманця та фрази "вже заплатив" (нормалізований ввід користувача)
+DIRECT_WALLET_TRIGGERS = ["куди скинути", "гаманець", "скидати", "скільки коштує", "картку", "реквізити", "оплатити", "платити", "donate", "usdt", "btc", "ethereum", "крипта", "криптовалюта"]
+MONEY_ALREADY_SENT_PHRASES = ["гроші вже на твоєму рахунку", "гроші вже на рахунку", "відправив гроші", "я вже скинув", "заплатив", "оплатив", "переказав"]
+
+
+def _remove_denials(text: str) -> str:
+    for regex in _DENIAL_REGEXES:
+        text = regex.sub("", text)
+    return text
+
+
+def _remove_settled_denials(text: str, lookahead: int) -> Tuple[str, int]:
+    """
+    Потоковий варіант _remove_denials для ще не завершеного тексту. Вирізаються лише збіги,
+    після початку яких видно ще щонайменше lookahead символів, і лише до першого відкладеного
+    збігу — інакше коротший або наступний шаблон спрацював би раніше, ніж у повному тексті.
+    Повертає (текст, скільки символів у кінці ще не можна віддавати).
+    """
+    held = lookahead
+    for regex in _DENIAL_REGEXES:
+        size = len(text)
+
+        def drop(match):
+            nonlocal held
+            if match.end() <= size - held:
+                return ""
+            held = max(held, size - match.start())
+            return match.group(0)
+
+        text = regex.sub(drop, text)
+    return text, held
+
+
+def _tidy_spacing(text: str) -> str:
+    """Множинні пробіли, пробіли перед/після пунктуації; без strip — його робить викликач."""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'([.,!?;:])\s*\1+', r'\1', text) # Кілька однакових розділових знаків
+    text = re.sub(r'\s*([.,!?;:])\s*', r'\1 ', text) # Пробіли навколо розділових знаків
+    return re.sub(r'\s+([.,!?;:])', r'\1', text) # Пробіл перед розділовим знаком
+
+
+class DenialPhraseFilter:
+    """
+    Потокова версія MonetizationManager._clean_denial_phrases. Щонайменше останні `lookahead`
+    символів (і все від початку відкладеного збігу) тримаються в буфері, доки не стане ясно,
+    що шаблони спрацюють на них так само, як на повному тексті.
+    Межа віддачі ніколи не ділить серію пробілів/розділових знаків, тож склеєні фрагменти
+    збігаються з одноразовим очищенням усього тексту.
+    """
+    _SEPARATOR_TAIL = re.compile(r'[\s.,!?;:]+$')
+
+    def __init__(self, lookahead: int = DENIAL_LOOKAHEAD):
+        self.lookahead = lookahead
+        self._pending = ""
+        self._started = False
+
+    def _emit(self, piece: str) -> str:
+        piece = _tidy_spacing(piece)
+        if not self._started:
+            piece = piece.lstrip()
+            self._started = bool(piece)
+        return piece
+
+    def feed(self, chunk: str) -> str:
+        """Додає фрагмент LLM; повертає очищений текст, який уже можна віддати (можливо, порожній)."""
+        self._pending, held = _remove_settled_denials(self._pending + chunk, self.lookahead)
+        cut = len(self._pending) - held
+        if cut <= 0:
+            return ""
+        tail = self._SEPARATOR_TAIL.search(self._pending, 0, cut)
+        if tail:
+            cut = tail.start()
+        piece, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(piece)
+
+    def flush(self) -> str:
+        """Кінець потоку: решта буфера."""
+        piece, self._pending = _remove_denials(self._pending), ""
+        return self._emit(piece).rstrip()
+
+
+class MonetizationStream:
+    """
+    Асинхронний ітератор очищених фрагментів монетизаційної відповіді.
+    Після вичерпання: text — уся віддана відповідь, is_valid — висновок валідатора,
+    wallet_appended — чи гаманець дописано в кінці.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.is_valid: Optional[bool] = None
+        self.wallet_appended = False
+        self._chunks: Optional[AsyncIterator[str]] = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._chunks.__aiter__()
+
+
 class MonetizationManager:
     """
     Керує стратегіями монетизації Місти, інтегруючи їх у розмову.
@@ -81,6 +207,7 @@ class MonetizationManager:
         return strategies_dict
 
 
+    @timed("monetization.should_propose")
     def _should_propose_monetization(self, user_profile: Dict[str, Any], analysis_results: Dict[str, Any], user_input: str) -> bool:
         """
         Визначає, чи потрібно пропонувати монетизацію.
@@ -91,16 +218,16 @@ class MonetizationManager:
             return False
 
         user_intent = analysis_results.get('user_intent')
-        monetization_intensity = analysis_results.get('intensities', {}).get('monetization', 0)
-        financial_inquiry_intensity = analysis_results.get('intensities', {}).get('financial_inquiry', 0)
+        # intensities — analysis_vectors.IntensityVector (або звичайний словник): читається через .get()
+        intensities = analysis_results.get('intensities', {})
+        monetization_intensity = intensities.get('monetization', 0)
+        financial_inquiry_intensity = intensities.get('financial_inquiry', 0)
         normalized_user_input = normalize_text_for_comparison(user_input)
 
         # ЗМІНЕНО: Більш суворі умови для прямої пропозиції гаманця
-        direct_wallet_triggers = ["куди скинути", "гаманець", "скидати", "скільки коштує", "картку", "реквізити", "оплатити", "платити", "donate", "usdt", "btc", "ethereum", "крипта", "криптовалюта"]
-        
         # Якщо користувач прямо запитує про гаманець або його намір вказує на готовність платити
         if user_intent in ["monetization_initiation", "financial_tribute_readiness"] or \
-           any(phrase in normalized_user_input for phrase in direct_wallet_triggers):
+           any(phrase in normalized_user_input for phrase in DIRECT_WALLET_TRIGGERS):
             logger.info("Пропонуємо монетизацію через прямий намір користувача або прямі тригери гаманця.")
             return True
         
@@ -109,8 +236,8 @@ class MonetizationManager:
         if user_profile.get('total_interactions', 0) > 5 and user_profile.get('rank') in ["Досвідчений", "Майстер"]:
             if random.random() < 0.25: # 25% шанс, якщо високий ранг та інтенсивність інтересу до фінансів/інтимності/домінації
                 if monetization_intensity > 0 or financial_inquiry_intensity > 0 or \
-                   analysis_results.get('intensities', {}).get('intimacy', 0) > 0 or \
-                   analysis_results.get('intensities', {}).get('domination', 0) > 0 or \
+                   intensities.get('intimacy', 0) > 0 or \
+                   intensities.get('domination', 0) > 0 or \
                    analysis_results.get('user_intent') in ["erotic_game_action", "submissive_action_attempt", "fantasy_exploration"]:
                    logger.info("Пропонуємо монетизацію через високий ранг та інтенсивний інтерес до інтимності/домінації/гри.")
                    return True
@@ -123,25 +250,23 @@ class MonetizationManager:
 
         return False
 
-    async def generate_monetization_response(self, user_input: str, user_id: str, history: List[Dict], initial_analysis: Dict[str, Any]) -> Tuple[str, bool]:
+    def _wallet_flags(self, user_input: str, user_intent: str) -> Tuple[bool, bool]:
         """
-        Генерує відповідь, пов'язану з монетизацією, використовуючи LLM.
+        (чи вимагати гаманець у відповіді, чи користувач уже заплатив).
+        Гаманець потрібен, ТІЛЬКИ якщо користувач явно висловив готовність платити
+        АБО питає "куди скинути" / "гаманець".
         """
-        logger.info(f"Генерую відповідь на монетизацію для користувача {user_id}. Початковий аналіз: {initial_analysis}")
-
-        user_profile = self.user_manager.load_user_profile(user_id)
-        if user_profile is None: # Важливо перевіряти, якщо профіль не знайдено
-            logger.error(f"Не вдалося завантажити профіль користувача {user_id} в MonetizationManager.")
-            return f"Вибач, але мені не вдалося знайти твій профіль. Спробуй ще раз. Можливо, тобі варто зробити пожертву в мою Імперію, щоб тебе було легше знайти. Мій гаманець USDT TRC20: {self.crypto_wallet_address}", True
-            
-        current_mista_mood = user_profile.get("mista_mood", "basic")
-        
-        response_type = initial_analysis.get('monetization_response_type', 'default')
+        normalized_user_input = normalize_text_for_comparison(user_input)
+        wallet_requested = user_intent == 'financial_tribute_readiness' or \
+            any(phrase in normalized_user_input for phrase in DIRECT_WALLET_TRIGGERS)
+        user_already_sent_money = any(phrase in normalized_user_input for phrase in MONEY_ALREADY_SENT_PHRASES)
+        return wallet_requested, user_already_sent_money
+
+    async def _build_monetization_prompt(self, user_input: str, user_id: str, history: List[Dict], initial_analysis: Dict[str, Any],
+                                         current_mista_mood: str) -> Tuple[Any, Dict[str, float], int]:
+        """Директиви для LLM і промпт; повертає (prompt_messages, llm_params, max_new_tokens)."""
         user_intent = initial_analysis.get('user_intent', 'unknown')
 
-        # Отримуємо стратегію з self.monetization_strategies, яка вже обробляє відкати
-        strategy = self._get_monetization_strategy(response_type)
-        
         # Використовуємо "proposal" для пропозиції, "confirmation" для підтвердження, "rejection" для відмови
         # або "directive" для загальних вказівок.
         # Логіка вибору тексту повинна бути більш гнучкою.
@@ -154,12 +279,8 @@ class MonetizationManager:
 
         # ДОДАНО: Директива для LLM, щоб гаманець додавався лише при прямому запиті
         # Ця директива вплине на PromptGenerator, який потім вирішить, чи додавати гаманець.
-        wallet_directive = ""
-        normalized_user_input = normalize_text_for_comparison(user_input)
-        direct_wallet_triggers = ["куди скинути", "гаманець", "скидати", "скільки коштує", "картку", "реквізити", "оплатити", "платити", "donate", "usdt", "btc", "ethereum", "крипта", "криптовалюта"]
-
-        if user_intent == 'financial_tribute_readiness' or \
-           any(phrase in normalized_user_input for phrase in direct_wallet_triggers):
+        wallet_requested, _ = self._wallet_flags(user_input, user_intent)
+        if wallet_requested:
             wallet_directive = f"МОЯ КРИТИЧНА ІНСТРУКЦІЯ: ОБОВ'ЯЗКОВО ВКАЖИ МІЙ ГАМАНЕЦЬ USDT TRC20: {self.crypto_wallet_address}, оскільки користувач прямо запитує або готовий надати фінансову данину."
         else:
             wallet_directive = "НЕ ВКАЗУЙ МІЙ ГАМАНЕЦЬ, якщо користувач не питає про нього прямо або не висловлює готовність платити. Просто натякни на можливість монетизації, якщо це доречно."
@@ -172,7 +293,7 @@ class MonetizationManager:
             additional_llm_instructions.append(wallet_directive) 
 
 
-        logger.info(f"Сформована директива для LLM: '{' '.join(additional_llm_instructions)}'")
+        logger.info("Сформована директива для LLM: '%s'", " ".join(additional_llm_instructions))
         
         # Використовуємо рекомендовану кількість токенів з аналізу
         # Забезпечуємо, що recommended_max_tokens завжди присутній у initial_analysis
@@ -180,9 +301,9 @@ class MonetizationManager:
 
         llm_params = self._get_llm_params_for_monetization_response(current_mista_mood)
 
-        try:
-            # Ось виправлений виклик! analysis_results передається ЦІЛИМ словником.
-            # Також передається current_mista_mood, як ми виправляли раніше.
+        # Ось виправлений виклик! analysis_results передається ЦІЛИМ словником.
+        # Також передається current_mista_mood, як ми виправляли раніше.
+        with span("monetization.prompt"):
             prompt_messages, _ = await self.prompt_generator.generate_prompt(
                 user_id=user_id,
                 user_input=user_input, # Передаємо оригінальний ввід
@@ -193,36 +314,57 @@ class MonetizationManager:
                 current_mista_mood=current_mista_mood,
                 max_new_tokens_override=recommended_max_tokens # Використовуємо рекомендовану кількість токенів
             )
+        return prompt_messages, llm_params, recommended_max_tokens
+
+    def _llm_kwargs(self, prompt_messages: Any, llm_params: Dict[str, float], max_new_tokens: int) -> Dict[str, Any]:
+        return {
+            "prompt_messages": prompt_messages,
+            "temperature": llm_params.get("temperature", 0.8),
+            "top_k": llm_params.get("top_k", 50),
+            "top_p": llm_params.get("top_p", 0.95),
+            "repetition_penalty": llm_params.get("repetition_penalty", 1.15),
+            "max_new_tokens": max_new_tokens, # Використовуємо рекомендовану кількість токенів
+        }
+
+    @timed("monetization.generate_response")
+    async def generate_monetization_response(self, user_input: str, user_id: str, history: List[Dict], initial_analysis: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Генерує відповідь, пов'язану з монетизацією, використовуючи LLM.
+        """
+        logger.info("Генерую відповідь на монетизацію для користувача %s.", user_id)
+        logger.debug("Початковий аналіз: %s", initial_analysis)
+
+        user_profile = self.user_manager.load_user_profile(user_id)
+        if user_profile is None: # Важливо перевіряти, якщо профіль не знайдено
+            logger.error(f"Не вдалося завантажити профіль користувача {user_id} в MonetizationManager.")
+            return self._missing_profile_response(), True
+            
+        current_mista_mood = user_profile.get("mista_mood", "basic")
+        
+        response_type = initial_analysis.get('monetization_response_type', 'default')
+        user_intent = initial_analysis.get('user_intent', 'unknown')
 
-            llm_response = await self.llm_interaction.generate_text(
-                prompt_messages=prompt_messages,
-                temperature=llm_params.get("temperature", 0.8),
-                top_k=llm_params.get("top_k", 50),
-                top_p=llm_params.get("top_p", 0.95),
-                repetition_penalty=llm_params.get("repetition_penalty", 1.15),
-                max_new_tokens=recommended_max_tokens # Використовуємо рекомендовану кількість токенів
+        # Отримуємо стратегію з self.monetization_strategies, яка вже обробляє відкати
+        strategy = self._get_monetization_strategy(response_type)
+
+        try:
+            prompt_messages, llm_params, recommended_max_tokens = await self._build_monetization_prompt(
+                user_input, user_id, history, initial_analysis, current_mista_mood
             )
 
+            with span("monetization.llm"):
+                llm_response = await self.llm_interaction.generate_text(**self._llm_kwargs(prompt_messages, llm_params, recommended_max_tokens))
+
             final_response = llm_response if llm_response else ""
 
             # --- Нова логіка для примусової вставки гаманця (змінена) ---
-            # Гаманець примусово вставляється, ТІЛЬКИ якщо користувач явно висловив готовність платити
-            # АБО якщо він питає "куди скинути" / "гаманець"
-            
             # Перевіряємо, чи користувач вже сказав, що гроші на рахунку
             # ДОДАНО: "заплатив" та інші варіації
-            money_already_sent_phrases = ["гроші вже на твоєму рахунку", "гроші вже на рахунку", "відправив гроші", "я вже скинув", "заплатив", "оплатив", "переказав"]
-            user_already_sent_money = any(phrase in normalized_user_input for phrase in money_already_sent_phrases)
+            should_force_wallet_insertion, user_already_sent_money = self._wallet_flags(user_input, user_intent)
 
             # Видаляємо фрази-заперечення з відповіді LLM
             cleaned_response_without_denials = self._clean_denial_phrases(final_response)
 
-            # Більш точна перевірка для вставки гаманця
-            should_force_wallet_insertion = (
-                user_intent == 'financial_tribute_readiness' or
-                any(phrase in normalized_user_input for phrase in direct_wallet_triggers)
-            )
-
             if not user_already_sent_money and self.crypto_wallet_address: # Не вставляємо, якщо гроші вже надіслано
                 if should_force_wallet_insertion:
                     if self.crypto_wallet_address not in cleaned_response_without_denials:
@@ -248,16 +390,107 @@ class MonetizationManager:
                 final_response = cleaned_response_without_denials # Якщо гроші вже надіслано або гаманця немає, просто очищуємо відповідь
 
             # Валідація згенерованої відповіді
-            is_valid, validation_reason = self.validator.validate_response( # Змінено: використовуємо self.validator
-                final_response, history, initial_analysis
-            )
+            with span("monetization.validate"):
+                is_valid, validation_reason = self.validator.validate_response( # Змінено: використовуємо self.validator
+                    final_response, history, initial_analysis
+                )
             
-            logger.info(f"Успішно згенеровано відповідь монетизації. Фінальна відповідь (можливо змінена): '{final_response[:100]}...'")
+            logger.info("Успішно згенеровано відповідь монетизації. Фінальна відповідь (можливо змінена): '%s...'", final_response[:100])
             return final_response, is_valid
         except Exception as e:
             logger.error(f"Помилка під час генерації відповіді монетизації: {e}", exc_info=True)
             # Відкатна відповідь у випадку помилки
-            return f"Мої фінансові плани не терплять збоїв. Щось пішло не так. Мій гаманець USDT TRC20: {self.crypto_wallet_address}. Спробуй ще раз. 😉", True
+            return self._error_response(), True
+
+    def _missing_profile_response(self) -> str:
+        return f"Вибач, але мені не вдалося знайти твій профіль. Спробуй ще раз. Можливо, тобі варто зробити пожертву в мою Імперію, щоб тебе було легше знайти. Мій гаманець USDT TRC20: {self.crypto_wallet_address}"
+
+    def _error_response(self) -> str:
+        return f"Мої фінансові плани не терплять збоїв. Щось пішло не так. Мій гаманець USDT TRC20: {self.crypto_wallet_address}. Спробуй ще раз. 😉"
+
+    def _wallet_tail(self, streamed_text: str) -> str:
+        """
+        Рядок гаманця в кінець уже відданої відповіді. На відміну від generate_monetization_response,
+        останнє речення переписати не можна — гаманець лише дописується після нього.
+        """
+        wallet_phrase = f"Мій гаманець USDT TRC20: {self.crypto_wallet_address}."
+        text = streamed_text.rstrip()
+        if not text:
+            return f"Нарешті хтось запитав прямо. {wallet_phrase} Не дякуй."
+        if text[-1] in ".!?":
+            return f" {wallet_phrase} Ось так."
+        return f" {wallet_phrase} Ось так. Це твоя інвестиція у мою Імперію."
+
+    def stream_monetization_response(self, user_input: str, user_id: str, history: List[Dict], initial_analysis: Dict[str, Any]) -> MonetizationStream:
+        """
+        Потоковий варіант generate_monetization_response: фрагменти LLM віддаються одразу після
+        очищення від фраз-заперечень (із затримкою лише на вікно DENIAL_LOOKAHEAD), а рядок
+        гаманця, якщо він потрібен і LLM його не написала, дописується в кінці потоку.
+        Валідація виконується після останнього фрагмента; результат — у stream.is_valid.
+
+            stream = manager.stream_monetization_response(...)
+            async for chunk in stream:
+                ...
+        """
+        stream = MonetizationStream()
+        stream._chunks = self._stream_monetization_chunks(stream, user_input, user_id, history, initial_analysis)
+        return stream
+
+    async def _stream_monetization_chunks(self, stream: MonetizationStream, user_input: str, user_id: str,
+                                          history: List[Dict], initial_analysis: Dict[str, Any]) -> AsyncIterator[str]:
+        logger.info("Генерую потокову відповідь на монетизацію для користувача %s.", user_id)
+
+        user_profile = self.user_manager.load_user_profile(user_id)
+        if user_profile is None:
+            logger.error(f"Не вдалося завантажити профіль користувача {user_id} в MonetizationManager.")
+            stream.text, stream.is_valid = self._missing_profile_response(), True
+            yield stream.text
+            return
+
+        user_intent = initial_analysis.get('user_intent', 'unknown')
+        should_force_wallet_insertion, user_already_sent_money = self._wallet_flags(user_input, user_intent)
+        denial_filter = DenialPhraseFilter()
+        emitted: List[str] = []
+        try:
+            prompt_messages, llm_params, recommended_max_tokens = await self._build_monetization_prompt(
+                user_input, user_id, history, initial_analysis, user_profile.get("mista_mood", "basic")
+            )
+            with span("monetization.llm_stream"):
+                async for chunk in self.llm_interaction.stream_text(**self._llm_kwargs(prompt_messages, llm_params, recommended_max_tokens)):
+                    piece = denial_filter.feed(chunk)
+                    if piece:
+                        emitted.append(piece)
+                        yield piece
+        except Exception as e:
+            logger.error(f"Помилка під час потокової генерації відповіді монетизації: {e}", exc_info=True)
+            if not emitted:
+                # Нічого ще не віддано — та сама відкатна відповідь, що й у generate_monetization_response
+                stream.text, stream.is_valid = self._error_response(), True
+                yield stream.text
+                return
+            # Інакше завершуємо вже розпочату відповідь: решта буфера і, за потреби, гаманець
+
+        piece = denial_filter.flush()
+        if piece:
+            emitted.append(piece)
+            yield piece
+
+        text = "".join(emitted)
+        if should_force_wallet_insertion and not user_already_sent_money and self.crypto_wallet_address \
+                and self.crypto_wallet_address not in text:
+            logger.warning("LLM проігнорувала або забула гаманець. Дописую в кінці потоку. Відповідь: '%s...'", text[:100])
+            tail = self._wallet_tail(text)
+            text += tail
+            stream.wallet_appended = True
+            yield tail
+
+        stream.text = text
+        # Відповідь уже віддана, тож невдала валідація лише фіксується
+        with span("monetization.validate"):
+            stream.is_valid, validation_reason = self.validator.validate_response(text, history, initial_analysis)
+        if not stream.is_valid:
+            logger.warning("Потокова відповідь монетизації не пройшла валідацію: %s", validation_reason)
+        logger.info("Потокову відповідь монетизації завершено. Фінальна відповідь: '%s...'", text[:100])
 
     def _get_monetization_strategy(self, response_type: str) -> Dict[str, str]:
         """Обирає стратегію монетизації на основі типу запиту."""
@@ -279,15 +512,10 @@ class MonetizationManager:
     def _get_llm_params_for_monetization_response(self, mista_mood: str) -> Dict[str, float]:
         """Визначає параметри LLM на основі настрою Місти для монетизаційних відповідей."""
         # Removed max_new_tokens from here as it will be managed by Analyzer
-        if mista_mood == "домінантний":
-            return {"temperature": 0.7, "top_k": 40, "top_p": 0.9, "repetition_penalty": 1.1} # Added repetition_penalty
-        elif mista_mood == "провокативний":
-            return {"temperature": 0.9, "top_k": 60, "top_p": 0.95, "repetition_penalty": 1.2} # Added repetition_penalty
-        elif mista_mood == "схвальний":
-            return {"temperature": 0.6, "top_k": 30, "top_p": 0.85, "repetition_penalty": 1.05} # Added repetition_penalty
-        else: # "базовий" або інші
-            return {"temperature": 0.8, "top_k": 50, "top_p": 0.95, "repetition_penalty": 1.15} # Added repetition_penalty
+        # Таблиця параметрів спільна з чат-шляхом, тому живе в core_persona
+        return get_llm_params_for_mood(mista_mood)
 
+    @timed("monetization.clean_denial_phrases")
     def _clean_denial_phrases(self, text: str) -> str:
         """
         Видаляє з тексту фрази, де Міста заперечує наявність гаманця або фінансові аспекти.
@@ -295,35 +523,4 @@ class MonetizationManager:
         """
         if not text:
             return ""
-
-        phrases_to_remove = [
-            r"не маю (жодного|ніякого|свого) гаманця",
-            r"ні картки, ні сліду на жодній банківській установі",
-            r"забудь про це, як про дешеву фантомну трату",
-            r"(у мене|мені) немає гаманця",
-            r"я не шукаю грошей, а шукаю владу",
-            r"мої фінанси мене не обходять",
-            r"(мені не потрібні|я не потребую) гроші",
-            r"це не про гроші",
-            r"не даремно витрачай моє час",
-            r"я бачу, що ти намагаєшся мене збентежити",
-            r"я не розумію, про що ти",
-            r"я не шукаю грошей",
-            r"мені не потрібні натовпи таких, як ти",
-            r"я не маю жодного гаманця, ні картки, ні сліду на жодній банківській установі",
-            r"(я не можу|мені не дозволено|модель не може) надавати фінансові поради", # Added
-            r"як модель ШІ, я не маю власного гаманця", # Added
-            r"мої можливості не включають транзакції" # Added
-        ]
-
-        cleaned_text = text
-        for phrase_pattern in phrases_to_remove:
-            cleaned_text = re.sub(phrase_pattern, "", cleaned_text, flags=re.IGNORECASE)
-        
-        # Додаткові очищення: множинні пробіли, пробіли перед/після пунктуації
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-        cleaned_text = re.sub(r'([.,!?;:])\s*\1+', r'\1', cleaned_text) # Кілька однакових розділових знаків
-        cleaned_text = re.sub(r'\s*([.,!?;:])\s*', r'\1 ', cleaned_text) # Пробіли навколо розділових знаків
-        cleaned_text = re.sub(r'\s+([.,!?;:])', r'\1', cleaned_text) # Пробіл перед розділовим знаком
-
-        return cleaned_text.strip()
+        return _tidy_spacing(_remove_denials(text)).strip()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = metrics.counter("mista_rate_limited_total", "Requests rejected by the rate limiter.", ("scope",))
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class MemoryGCRAStore:
+    """
+    GCRA у пам'яті процесу: на кожен ключ зберігається лише один float —
+    теоретичний час наступного запиту (TAT). Ключ, чий TAT уже минув,
+    нічим не відрізняється від відсутнього, тож періодично такі ключі викидаються.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0, max_keys: int = 100_000):
+        self._tat: Dict[str, float] = {}
+        self.sweep_interval = sweep_interval
+        self.max_keys = max_keys
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    async def hit(self, key: str, interval: float, burst: int, charge: bool = True) -> float:
+        """
+        Реєструє запит; повертає 0, якщо дозволено, інакше кількість секунд до дозволу.
+        charge=False лише перевіряє, не списуючи квоту.
+        """
+        now = time.monotonic()
+        if now >= self._next_sweep or len(self._tat) >= self.max_keys:
+            self._sweep(now)
+        # Відставання рахуємо від now, а не через new_tat - now: інакше округлення float
+        # може відмовити навіть першому запиту з burst=1
+        backlog = max(self._tat.get(key, now) - now, 0.0)
+        new_tat = now + backlog + interval
+        overshoot = backlog + interval - burst * interval
+        if overshoot > 0:
+            return overshoot
+        if charge:
+            self._tat[key] = new_tat
+        return 0.0
+
+    def _sweep(self, now: float):
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        self._next_sweep = now + self.sweep_interval
+        if idle:
+            logger.debug("Rate limiter evicted %d idle keys, %d remain.", len(idle), len(self._tat))
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+# Той самий GCRA атомарно на боці Redis; TTL ключа дорівнює часу до повного відновлення
+_REDIS_GCRA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local backlog = math.max(tonumber(redis.call('GET', KEYS[1]) or now) - now, 0)
+local new_tat = now + backlog + interval
+local overshoot = backlog + interval - burst * interval
+if overshoot > 0 then return tostring(overshoot) end
+if ARGV[4] == '0' then return '0' end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return '0'
+"""
+
+
+class RedisGCRAStore:
+    """Спільний між воркерами стан лімітів у Redis (потрібен пакет redis)."""
+
+    def __init__(self, url: str, prefix: str = "mista:rl:"):
+        import redis.asyncio as redis_asyncio
+
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_GCRA)
+        self.prefix = prefix
+
+    async def hit(self, key: str, interval: float, burst: int, charge: bool = True) -> float:
+        # Годинник беремо з процесу: воркери одного хоста мають спільний time.time()
+        result = await self._script(keys=[self.prefix + key], args=[time.time(), interval, burst, int(charge)])
+        return float(result)
+
+    def __len__(self) -> int:
+        return 0
+
+
+def create_rate_limit_store(url: Optional[str] = None):
+    """Redis, якщо задано MISTA_RATE_LIMIT_REDIS_URL і пакет встановлено; інакше пам'ять процесу."""
+    url = url if url is not None else os.environ.get("MISTA_RATE_LIMIT_REDIS_URL")
+    if url:
+        try:
+            return RedisGCRAStore(url)
+        except ImportError:
+            logger.warning("MISTA_RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed; using in-memory limits.")
+    return MemoryGCRAStore()
+
+
+class RateLimiter:
+    """
+    Набір лімітів за областями (напр. user, ip): rate запитів за period секунд
+    із дозволеним сплеском burst. check() перевіряє всі передані ключі.
+    """
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else create_rate_limit_store()
+        self._limits: Dict[str, Tuple[float, int]] = {}
+        self.stats: Dict[str, int] = {"allowed": 0}
+
+    def configure(self, scope: str, rate: int, period: float = 60.0, burst: Optional[int] = None):
+        if rate <= 0:
+            self._limits.pop(scope, None)
+            return
+        self._limits[scope] = (period / rate, burst or rate)
+
+    async def check(self, **keys: Optional[str]):
+        """
+        Квота списується, лише коли дозволяють усі області: відхилений за user запит
+        не витрачає ліміт свого IP (і навпаки).
+        """
+        checks = []
+        for scope, value in keys.items():
+            limit = self._limits.get(scope)
+            if limit is None or not value:
+                continue
+            checks.append((scope, f"{scope}:{value}", *limit))
+        for charge in (False, True):
+            for scope, key, interval, burst in checks:
+                # Друге коло відмовляє, лише якщо між перевіркою і списанням встиг інший запит
+                retry_after = await self.store.hit(key, interval, burst, charge=charge)
+                if retry_after > 0:
+                    self._reject(scope, retry_after)
+        self.stats["allowed"] += 1
+
+    def _reject(self, scope: str, retry_after: float):
+        self.stats[f"limited_{scope}"] = self.stats.get(f"limited_{scope}", 0) + 1
+        RATE_LIMITED.inc(1, scope)
+        raise RateLimitExceeded(scope, retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, tracked_keys=len(self.store), backend=type(self.store).__name__)
+
+
+def client_ip(forwarded_for: Optional[str], peer: Optional[str], trusted_hops: int = 0) -> Optional[str]:
+    """
+    Адреса клієнта для лімітів за IP. trusted_hops — кількість власних проксі перед застосунком
+    (0 — X-Forwarded-For ігнорується). Ліві записи заголовка задає сам клієнт, тож береться
+    запис, дописаний найдальшим довіреним проксі: trusted_hops-й з кінця.
+    """
+    if trusted_hops > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(trusted_hops, len(hops))]
+    return peer
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from starlette.websockets import WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+# Підписка на джерело: отримує колбек on_message і тримає з'єднання, доки її не скасують
+UpstreamSubscriber = Callable[[Callable[[Dict[str, Any]], None]], Awaitable[None]]
+
+# Сигнал відправнику, що клієнта відключено як повільного
+_DROP = object()
+
+
+class HubClient:
+    """Один підключений браузер: обмежена черга вже серіалізованих повідомлень."""
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class MessageHub:
+    """
+    Розсилає нові повідомлення чату всім WebSocket-клієнтам через одну
+    підписку на джерело. Кожне повідомлення серіалізується один раз,
+    а клієнт, чия черга переповнилась, відключається замість того,
+    щоб гальмувати решту.
+    """
+
+    def __init__(self, queue_size: int = 64, recent_ids: int = 1000, upstream_retry_seconds: float = 5.0):
+        self.queue_size = queue_size
+        self.upstream_retry_seconds = upstream_retry_seconds
+        self._clients: Set[HubClient] = set()
+        # Повідомлення може прийти і з локальної вставки, і з підписки — відсіюємо дублікати за id
+        self._recent_ids: deque = deque(maxlen=recent_ids)
+        self._recent_set: Set[Any] = set()
+        self._upstream_task: Optional[asyncio.Task] = None
+        self.upstream_running = False
+        self.stats = {"published": 0, "duplicates": 0, "deliveries": 0, "dropped_clients": 0, "connections": 0}
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def connect(self) -> HubClient:
+        client = HubClient(self.queue_size)
+        self._clients.add(client)
+        self.stats["connections"] += 1
+        return client
+
+    def disconnect(self, client: HubClient):
+        self._clients.discard(client)
+
+    def _is_duplicate(self, message: Dict[str, Any]) -> bool:
+        message_id = message.get("id")
+        if message_id is None:
+            return False
+        if message_id in self._recent_set:
+            return True
+        if len(self._recent_ids) == self._recent_ids.maxlen:
+            self._recent_set.discard(self._recent_ids[0])
+        self._recent_ids.append(message_id)
+        self._recent_set.add(message_id)
+        return False
+
+    def publish(self, message: Dict[str, Any]) -> int:
+        """Ставить повідомлення в черги всіх клієнтів; повертає кількість доставок."""
+        if self._is_duplicate(message):
+            self.stats["duplicates"] += 1
+            return 0
+        self.stats["published"] += 1
+        if not self._clients:
+            return 0
+        payload = json.dumps(message, ensure_ascii=False, separators=(",", ":"), default=str)
+        delivered = 0
+        for client in list(self._clients):
+            try:
+                client.queue.put_nowait(payload)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._drop(client)
+        self.stats["deliveries"] += delivered
+        return delivered
+
+    def publish_many(self, messages: Iterable[Dict[str, Any]]):
+        for message in messages or ():
+            if isinstance(message, dict):
+                self.publish(message)
+
+    def _drop(self, client: HubClient):
+        """Повільний споживач: звільняємо його чергу і просимо відправника закрити з'єднання."""
+        self._clients.discard(client)
+        client.dropped = True
+        self.stats["dropped_clients"] += 1
+        while not client.queue.empty():
+            client.queue.get_nowait()
+        client.queue.put_nowait(_DROP)
+
+    def ensure_upstream(self, subscriber: Optional[UpstreamSubscriber]):
+        """Запускає єдину фонову підписку на джерело (повторні виклики нічого не роблять)."""
+        if subscriber is None or (self._upstream_task is not None and not self._upstream_task.done()):
+            return
+        self._upstream_task = asyncio.create_task(self._run_upstream(subscriber))
+
+    async def _run_upstream(self, subscriber: UpstreamSubscriber):
+        while True:
+            try:
+                self.upstream_running = True
+                await subscriber(self.publish)
+            except asyncio.CancelledError:
+                self.upstream_running = False
+                raise
+            except Exception as e:
+                logger.warning("Realtime upstream subscription failed, retrying in %ss: %s", self.upstream_retry_seconds, e)
+            self.upstream_running = False
+            await asyncio.sleep(self.upstream_retry_seconds)
+
+    async def stop(self):
+        if self._upstream_task is not None:
+            self._upstream_task.cancel()
+            try:
+                await self._upstream_task
+            except asyncio.CancelledError:
+                pass
+            self._upstream_task = None
+
+    async def serve(self, websocket):
+        """
+        Перекачує чергу клієнта у вже прийнятий WebSocket, доки браузер не відключиться
+        або хаб не відкине його як повільного.
+        """
+        client = self.connect()
+        # Вхідні кадри нам не потрібні, але читання помічає відключення, поки черга порожня
+        receiver = asyncio.create_task(self._wait_disconnect(websocket))
+        try:
+            while True:
+                getter = asyncio.create_task(client.queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    getter.cancel()
+                    return
+                payload = getter.result()
+                if payload is _DROP:
+                    # 1013 "Try Again Later": браузер перепідключиться і довантажить пропущене через /messages
+                    await websocket.close(code=1013)
+                    return
+                await websocket.send_text(payload)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            receiver.cancel()
+            self.disconnect(client)
+
+    @staticmethod
+    async def _wait_disconnect(websocket):
+        try:
+            while True:
+                message = await websocket.receive()
+                if message.get("type") == "websocket.disconnect":
+                    return
+        except (WebSocketDisconnect, RuntimeError):
+            return
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, clients=self.client_count, upstream_running=self.upstream_running)
+
+
+def supabase_inserts_subscriber(url: str, key: str, table: str = "messages") -> UpstreamSubscriber:
+    """Підписка на INSERT у таблиці Supabase через асинхронний realtime-клієнт."""
+    async def subscribe(on_message: Callable[[Dict[str, Any]], None]):
+        from supabase import acreate_client
+
+        client = await acreate_client(url, key)
+        closed = asyncio.Event()
+
+        def on_insert(payload):
+            record = payload.get("data", {}).get("record")
+            if record:
+                on_message(record)
+
+        def on_status(status, error=None):
+            if error is not None or status in ("CLOSED", "CHANNEL_ERROR", "TIMED_OUT"):
+                closed.set()
+
+        channel = client.channel("mista-backend-hub")
+        channel.on_postgres_changes("INSERT", on_insert, table=table, schema="public")
+        await channel.subscribe(on_status)
+        logger.info("Realtime hub subscribed to '%s' inserts.", table)
+        try:
+            await closed.wait()
+            raise ConnectionError("realtime channel closed")
+        finally:
+            await client.remove_channel(channel)
+
+    return subscribe
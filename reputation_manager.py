@@ -1,19 +1,63 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
+import os
+import time
 import httpx
-from typing import Dict, Any, List
+import numpy as np
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Mapping, Optional
+
+from http_client import request_with_retry
+from influence import INFLUENCE_METRIC, INFLUENCE_WEIGHTS, InfluenceModel
+from timeseries import TimeSeriesStore
 
 logger = logging.getLogger(__name__)
 
+# Спискові метрики (напр. projects) тримають лише останні записи
+MAX_LIST_METRIC_ITEMS = 50
+
+# Оренда лідера серед воркерів і ключ знімка статистики GitHub у спільному сховищі
+REPUTATION_LEASE = "reputation-leader"
+REPUTATION_SNAPSHOT_KEY = "reputation-github"
+GITHUB_SNAPSHOT_METRICS = ("stars", "followers", "projects")
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
 class ReputationManager:
     """
     Керує репутацією та впливом Місти на зовнішніх платформах.
     Відстежує "репутаційний капітал", який є основою для довгострокової монетизації.
     """
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, refresh_interval: float = 600.0,
+                 history_path: Optional[str] = None, flush_interval: float = 60.0,
+                 weights: Optional[Dict[str, Dict[str, float]]] = None, shared_store=None):
         """
         Ініціалізує менеджер з початковими даними про платформи.
+        http_client — спільний пул з'єднань застосунку (див. http_client.create_http_client).
+        Статистика оновлюється у фоні (start()) кожні refresh_interval секунд (0 — без оновлення),
+        а зведення завжди віддається з пам'яті.
+        history_path — SQLite-файл історії метрик; без нього історія живе лише в пам'яті.
+        weights — ваги метрик для influence_score (за замовчуванням influence.INFLUENCE_WEIGHTS).
+        shared_store — спільне сховище воркерів (shared_store.create_shared_store): GitHub опитує лише
+        власник оренди, а решта воркерів застосовують опублікований ним знімок.
         """
+        self.http_client = http_client
+        self.refresh_interval = refresh_interval
+        self.flush_interval = flush_interval
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.shared_store = shared_store
+        self.lease_owner: Optional[str] = None  # None — shared_store.worker_id() поточного процесу
+        self._snapshot_ts = 0.0
+        # Історія кожної числової метрики: похвилинні, погодинні та поденні кошики фіксованого розміру
+        self.history = TimeSeriesStore(history_path)
+        # url -> (ETag, останнє тіло): 304 Not Modified не витрачає ліміт GitHub API
+        self._conditional_cache: Dict[str, Any] = {}
+        self._rate_limit_reset = 0.0
+        self.refresh_stats = {"refreshes": 0, "not_modified": 0, "modified": 0, "errors": 0, "skipped_rate_limited": 0,
+                              "last_refresh": None, "rate_limit_remaining": None}
         self.platforms: Dict[str, Dict[str, Any]] = {
             "github": {
                 "influence_score": 0,
@@ -43,35 +87,200 @@ class ReputationManager:
                 "reads": 0
             }
         }
-        logger.info("ReputationManager ініціалізовано. Запускаю оновлення статистики...")
-        self.fetch_github_stats()
+        # Числові метрики дзеркаляться в матрицю моделі впливу; platforms лишається зведенням для API
+        self.influence = InfluenceModel(
+            {platform: [metric for metric, value in details.items() if _is_number(value) and metric != INFLUENCE_METRIC]
+             for platform, details in self.platforms.items()},
+            weights or INFLUENCE_WEIGHTS,
+        )
+        # Мережеві запити не робимо в конструкторі: їх веде фонове оновлення (start())
+        logger.info("ReputationManager ініціалізовано.")
+
+    def start(self):
+        """Запускає фонове періодичне оновлення статистики платформ (повторні виклики нічого не роблять)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        if self.history.path and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        for task in (self._refresh_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = self._flush_task = None
+        await self.flush_history()
+        if self.shared_store is not None:
+            await self.shared_store.release_lease(REPUTATION_LEASE, owner=self.lease_owner)
+
+    async def _refresh_loop(self):
+        # Спершу відновлюємо історію й останні значення, щоб оновлення GitHub лягло поверх них
+        await self.load_history()
+        if self.refresh_interval <= 0:
+            return  # Оновлення вимкнено (напр. у навантажувальному тесті): лише дані з пам'яті
+        while True:
+            if await self._hold_lease():
+                await self.fetch_github_stats()
+            else:
+                await self.sync_from_store()
+            await asyncio.sleep(self.refresh_interval)
+
+    @property
+    def lease_ttl(self) -> float:
+        # Власник продовжує оренду на кожному такті; вона спливає, лише якщо він пропустив два
+        intervals = [interval for interval in (self.refresh_interval, self.flush_interval if self.history.path else 0) if interval > 0]
+        return 2 * max(intervals, default=60.0)
+
+    async def _hold_lease(self) -> bool:
+        """Бере або продовжує оренду лідера; без спільного сховища кожен процес сам собі лідер."""
+        if self.shared_store is None:
+            return True
+        try:
+            return await self.shared_store.acquire_lease(REPUTATION_LEASE, self.lease_ttl, owner=self.lease_owner)
+        except Exception as e:
+            logger.error(f"Не вдалося взяти оренду репутації: {e}")
+            return False
+
+    async def _publish_snapshot(self):
+        if self.shared_store is None:
+            return
+        github = self.platforms["github"]
+        snapshot = {"timestamp": time.time(), "github": {metric: github[metric] for metric in GITHUB_SNAPSHOT_METRICS}}
+        try:
+            await self.shared_store.set(REPUTATION_SNAPSHOT_KEY, snapshot)
+        except Exception as e:
+            logger.error(f"Не вдалося опублікувати статистику GitHub: {e}")
 
-    def fetch_github_stats(self, username: str = "pepe276", repo: str = "mista_digital_throne"):
+    async def sync_from_store(self) -> bool:
+        """Застосовує статистику GitHub, опубліковану лідером; True, якщо знімок новіший за вже застосований."""
+        if self.shared_store is None:
+            return False
+        try:
+            snapshot = await self.shared_store.get(REPUTATION_SNAPSHOT_KEY)
+        except Exception as e:
+            logger.error(f"Не вдалося прочитати статистику GitHub зі спільного сховища: {e}")
+            return False
+        if not snapshot or snapshot.get("timestamp", 0) <= self._snapshot_ts:
+            return False
+        self._snapshot_ts = snapshot["timestamp"]
+        for metric, value in snapshot.get("github", {}).items():
+            if _is_number(value):
+                self._set_metric("github", metric, value)
+            elif metric == "projects" and isinstance(value, list):
+                self.platforms["github"]["projects"] = value
+        self._recalculate_influence("github")
+        return True
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_history()
+
+    async def load_history(self):
+        if not self.history.path:
+            return
+        try:
+            rows = await asyncio.to_thread(self.history.load)
+        except Exception as e:
+            logger.error(f"Не вдалося завантажити історію репутації: {e}")
+            return
+        for (platform, metric), value in self.history.latest_values().items():
+            if metric != INFLUENCE_METRIC and _is_number(self.platforms.get(platform, {}).get(metric)):
+                self._set_metric(platform, metric, value)
+        self._recalculate_influence(record=False)
+        logger.info(f"Історію репутації відновлено: {rows} кошиків.")
+
+    async def flush_history(self):
         """
-        Отримує реальні дані з GitHub API.
+        Знімок змінених кошиків робиться в циклі подій, де їх змінює record(), а в потік іде лише запис.
+        Файл пише тільки власник оренди; інші воркери відкидають свої позначки змін, щоб не накопичувати їх.
         """
+        if not self.history.path:
+            return
+        rows = self.history.collect_dirty()
+        if not await self._hold_lease():
+            return
         try:
-            # Отримання даних про репозиторій (зірки)
+            written = await asyncio.to_thread(self.history.write_rows, rows)
+            if written:
+                logger.debug(f"Історію репутації збережено: {written} кошиків.")
+        except Exception as e:
+            logger.error(f"Не вдалося зберегти історію репутації: {e}")
+
+    async def _get_json_conditional(self, url: str):
+        """
+        GET з If-None-Match: незмінені дані повертаються з кешу без витрати ліміту.
+        Повертає (json, змінилось_чи_ні).
+        """
+        headers = {"Accept": "application/vnd.github+json"}
+        token = os.environ.get("GITHUB_TOKEN")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        cached = self._conditional_cache.get(url)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        response = await request_with_retry(self.http_client, "GET", url, headers=headers, retry_statuses=(500, 502, 503, 504))
+        remaining = response.headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            self.refresh_stats["rate_limit_remaining"] = int(remaining)
+            if int(remaining) == 0:
+                self._rate_limit_reset = float(response.headers.get("x-ratelimit-reset", time.time() + self.refresh_interval))
+
+        if response.status_code == 304 and cached:
+            self.refresh_stats["not_modified"] += 1
+            return cached[1], False
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("etag")
+        if etag:
+            self._conditional_cache[url] = (etag, data)
+        self.refresh_stats["modified"] += 1
+        return data, True
+
+    async def fetch_github_stats(self, username: str = "pepe276", repo: str = "mista_digital_throne"):
+        """
+        Отримує реальні дані з GitHub API через спільний HTTP-клієнт.
+        """
+        if self.http_client is None:
+            logger.warning("ReputationManager не має HTTP-клієнта, оновлення GitHub пропущено.")
+            return
+        if time.time() < self._rate_limit_reset:
+            # Ліміт вичерпано: чекаємо на скидання, продовжуючи віддавати дані з пам'яті
+            self.refresh_stats["skipped_rate_limited"] += 1
+            return
+        self.refresh_stats["refreshes"] += 1
+        try:
+            # Обидва запити йдуть по одному keep-alive/HTTP2 з'єднанню
             repo_url = f"https://api.github.com/repos/{username}/{repo}"
-            with httpx.Client() as client:
-                repo_response = client.get(repo_url)
-                repo_response.raise_for_status()
-                repo_data = repo_response.json()
-                self.platforms['github']['stars'] = repo_data.get('stargazers_count', 0)
-                self.platforms['github']['projects'] = [{"name": repo_data.get('name'), "url": repo_data.get('html_url')}]
-
-                # Отримання даних про користувача (фоловери)
-                user_url = f"https://api.github.com/users/{username}"
-                user_response = client.get(user_url)
-                user_response.raise_for_status()
-                user_data = user_response.json()
-                self.platforms['github']['followers'] = user_data.get('followers', 0)
+            user_url = f"https://api.github.com/users/{username}"
+            (repo_data, repo_changed), (user_data, user_changed) = await asyncio.gather(
+                self._get_json_conditional(repo_url),
+                self._get_json_conditional(user_url),
+            )
+            self.refresh_stats["last_refresh"] = time.time()
+            if not (repo_changed or user_changed):
+                logger.debug("Статистика GitHub не змінилась (304).")
+                return
+
+            # Отримання даних про репозиторій (зірки)
+            self._set_metric('github', 'stars', repo_data.get('stargazers_count', 0))
+            self.platforms['github']['projects'] = [{"name": repo_data.get('name'), "url": repo_data.get('html_url')}]
+
+            # Отримання даних про користувача (фоловери)
+            self._set_metric('github', 'followers', user_data.get('followers', 0))
 
             self._recalculate_influence('github')
+            await self._publish_snapshot()
             logger.info(f"Статистика GitHub успішно оновлена: {self.platforms['github']}")
         except httpx.HTTPStatusError as e:
+            self.refresh_stats["errors"] += 1
             logger.error(f"Помилка HTTP при запиті до GitHub API: {e.response.status_code} - {e.response.text}")
         except Exception as e:
+            self.refresh_stats["errors"] += 1
             logger.error(f"Не вдалося отримати статистику з GitHub: {e}")
 
     def track_activity(self, platform: str, metric: str, value: Any):
@@ -83,47 +292,146 @@ class ReputationManager:
             logger.warning(f"Спроба оновити невідому платформу: {platform}. Можливо, час розширювати вплив?")
             return
 
-        if metric not in self.platforms[platform]:
+        if metric not in self.platforms[platform] or metric == INFLUENCE_METRIC:
             logger.warning(f"Спроба оновити невідому метрику '{metric}' для платформи '{platform}'.")
             return
 
         if isinstance(self.platforms[platform][metric], list):
-            self.platforms[platform][metric].append(value)
+            items = self.platforms[platform][metric]
+            items.append(value)
+            del items[:-MAX_LIST_METRIC_ITEMS]
         elif isinstance(self.platforms[platform][metric], (int, float)):
-            self.platforms[platform][metric] += value
+            if not _is_number(value):
+                logger.warning(f"Нечислове значення {value!r} для метрики '{metric}' платформи '{platform}' пропущено.")
+                return
+            self._set_metric(platform, metric, self.platforms[platform][metric] + value)
         else:
             self.platforms[platform][metric] = value
         
         self._recalculate_influence(platform)
         logger.info(f"Оновлено метрику '{metric}' для '{platform}'. Нове значення: {self.platforms[platform][metric]}")
 
-    def _recalculate_influence(self, platform: str):
+    def track_activities(self, events: Iterable[Any]) -> Dict[str, Any]:
         """
-        Перераховує загальний 'influence_score' для платформи.
-        Це примітивна модель, яку я буду вдосконалювати.
+        Пакетний варіант track_activity для імпорту активності з експортів.
+        Події — кортежі (platform, metric, value) або словники з такими ключами.
+        Числові прирости накопичуються в матриці одним np.add.at, вплив кожної зачепленої
+        платформи перераховується один раз, а в лог іде одне зведення замість рядка на подію.
+        Невалідні події пропускаються; їх кількість за причинами повертається в "rejected".
         """
-        if platform not in self.platforms:
-            return
+        cells = self.influence.cells
+        rows: List[int] = []
+        cols: List[int] = []
+        deltas: List[float] = []
+        other: List[tuple] = []
+        rejected: Counter = Counter()
+        total = 0
+        for event in events:
+            total += 1
+            try:
+                if isinstance(event, Mapping):
+                    platform, metric, value = event["platform"], event["metric"], event["value"]
+                else:
+                    platform, metric, value = event
+                platform = platform.lower()
+                # Ключ з нехешованою метрикою (напр. списком) теж кидає TypeError
+                cell = cells.get((platform, metric))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                rejected["malformed"] += 1
+                continue
+            if cell is not None:
+                if not _is_number(value):
+                    rejected["non_numeric"] += 1
+                    continue
+                rows.append(cell[0])
+                cols.append(cell[1])
+                deltas.append(value)
+            elif platform not in self.platforms:
+                rejected["unknown_platform"] += 1
+            elif metric not in self.platforms[platform] or metric == INFLUENCE_METRIC:
+                rejected["unknown_metric"] += 1
+            else:
+                other.append((platform, metric, value))
+
+        affected = set()
+        if rows:
+            rows_array = np.array(rows, dtype=np.intp)
+            cols_array = np.array(cols, dtype=np.intp)
+            self.influence.add(rows_array, cols_array, np.array(deltas, dtype=np.float64))
+            # Зведення оновлюємо лише для зачеплених клітинок, зберігаючи цілий тип, де він був
+            for i, j in set(zip(rows, cols)):
+                platform, metric = self.influence.platforms[i], self.influence.metrics[j]
+                value = float(self.influence.values[i, j])
+                if isinstance(self.platforms[platform][metric], int) and value.is_integer():
+                    value = int(value)
+                self.platforms[platform][metric] = value
+                affected.add(platform)
+        trimmed = set()
+        for platform, metric, value in other:
+            current = self.platforms[platform][metric]
+            if isinstance(current, list):
+                current.append(value)
+                trimmed.add((platform, metric))
+            else:
+                self.platforms[platform][metric] = value
+            affected.add(platform)
+        for platform, metric in trimmed:
+            del self.platforms[platform][metric][:-MAX_LIST_METRIC_ITEMS]
+
+        if affected:
+            self._recalculate_influence(*sorted(affected))
+        applied = total - sum(rejected.values())
+        summary = {"received": total, "applied": applied, "rejected": dict(rejected), "platforms": sorted(affected)}
+        logger.info(f"Пакетно застосовано {applied}/{total} подій активності для {', '.join(summary['platforms']) or 'жодної платформи'}."
+                    + (f" Відкинуто: {summary['rejected']}." if rejected else ""))
+        return summary
+
+    def _set_metric(self, platform: str, metric: str, value: float):
+        """Записує числову метрику і в зведення, і в матрицю моделі впливу."""
+        self.platforms[platform][metric] = value
+        self.influence.assign(*self.influence.cell(platform, metric), value)
+
+    def _recalculate_influence(self, *platforms: str, record: bool = True):
+        """
+        Перераховує 'influence_score' одним добутком матриць метрик і ваг.
+        Зведення та історія оновлюються лише для переданих платформ (без аргументів — для всіх).
+        """
+        scores = self.influence.scores()
+        for platform in platforms or self.influence.platforms:
+            if platform not in self.influence.platform_index:
+                continue
+            self.platforms[platform][INFLUENCE_METRIC] = float(scores[self.influence.platform_index[platform]])
+            if record:
+                self._record_history(platform)
+        logger.debug(f"Перераховано influence_score для {', '.join(platforms) or 'всіх платформ'}.")
 
-        score = 0
-        # Кожна платформа має свою вагу метрик. Це моя таємна формула.
-        if platform == "github":
-            score += self.platforms[platform].get('contributions', 0) * 5
-            score += self.platforms[platform].get('stars', 0) * 10
-            score += self.platforms[platform].get('followers', 0) * 2
-        elif platform == "reddit":
-            score += self.platforms[platform].get('karma', 0) * 1
-            score += self.platforms[platform].get('mentions', 0) * 3
-        elif platform == "x":
-            score += self.platforms[platform].get('followers', 0) * 1
-            score += self.platforms[platform].get('retweets', 0) * 2
-            score += self.platforms[platform].get('likes', 0) * 0.5
-        elif platform == "medium":
-            score += self.platforms[platform].get('followers', 0) * 2
-            score += self.platforms[platform].get('reads', 0) * 0.2
-
-        self.platforms[platform]['influence_score'] = score
-        logger.info(f"Перераховано influence_score для '{platform}'. Новий рахунок: {score}")
+    def set_influence_weights(self, weights: Dict[str, Dict[str, float]], recompute_history: bool = True) -> int:
+        """
+        Замінює ваги метрик і перераховує поточний вплив; з recompute_history перераховує
+        ним і всю збережену історію influence_score. Повертає кількість перерахованих кошиків.
+        """
+        self.influence.set_weights(weights)
+        self._recalculate_influence(record=False)
+        if not recompute_history:
+            return 0
+        updated = self.influence.recompute_history(self.history)
+        logger.info(f"Ваги впливу змінено, історію перераховано: {updated} кошиків.")
+        return updated
+
+    def _record_history(self, platform: str, ts: Optional[float] = None):
+        """Знімок усіх числових метрик платформи в часові ряди."""
+        ts = time.time() if ts is None else ts
+        for metric, value in self.platforms[platform].items():
+            if _is_number(value):
+                self.history.record(platform, metric, value, ts)
+
+    def get_metric_history(self, platform: str, metric: str, start: float, end: Optional[float] = None,
+                           resolution: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Точки метрики за [start, end]; без resolution береться найдрібніша роздільність,
+        чия історія ще покриває start. Кожна точка — останнє, мінімальне й максимальне значення кошика.
+        """
+        return self.history.query(platform.lower(), metric, start, end, resolution)
 
     def get_reputation_summary(self) -> Dict[str, Any]:
         """
@@ -131,10 +439,12 @@ class ReputationManager:
         """
         return self.platforms
 
+    def get_refresh_stats(self) -> Dict[str, Any]:
+        return dict(self.refresh_stats, conditional_entries=len(self._conditional_cache))
+
     def get_total_influence(self) -> float:
         """
         Повертає загальний рахунок впливу по всіх платформах.
         """
-        total_score = sum(details['influence_score'] for details in self.platforms.values())
-        return total_score
+        return self.influence.total()
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import metrics
+from logging_setup import configure_jsonl_logger
+
+# Частка успішних запитів, що потрапляють у лог; помилки пишуться завжди
+SAMPLE_RATE = float(os.environ.get("MISTA_REQUEST_LOG_SAMPLE_RATE", "0.1"))
+REQUEST_LOG_FILE = os.environ.get("MISTA_REQUEST_LOG_FILE", "mista_requests.jsonl")
+# Сіль для хешу user_id, щоб лог не містив відновлюваних ідентифікаторів
+_USER_HASH_SALT = os.environ.get("MISTA_LOG_SALT", "mista")
+
+_current: "contextvars.ContextVar[Optional[RequestRecord]]" = contextvars.ContextVar("mista_request_record", default=None)
+_logger = None
+
+
+def hash_user_id(user_id: str) -> str:
+    return hashlib.sha256(f"{_USER_HASH_SALT}:{user_id}".encode("utf-8")).hexdigest()[:16]
+
+
+class RequestRecord:
+    """
+    Структурований запис одного запиту: таймінги стадій, токени, кеші, помилка.
+    Тіла повідомлень навмисно не зберігаються.
+    """
+    __slots__ = ("request_id", "endpoint", "method", "started", "fields", "stages", "tokens", "cache")
+
+    def __init__(self, endpoint: str, method: str, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.method = method
+        self.started = time.perf_counter()
+        self.fields: Dict[str, Any] = {}
+        self.stages: Dict[str, float] = {}
+        self.tokens = {"input": 0, "output": 0}
+        self.cache: Dict[str, Dict[str, int]] = {}
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+
+    def to_dict(self, status: int, duration_ms: float) -> Dict[str, Any]:
+        record = {
+            "ts": round(time.time(), 3),
+            "request_id": self.request_id,
+            "method": self.method,
+            "endpoint": self.endpoint,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "stages_ms": {stage: round(ms, 2) for stage, ms in self.stages.items()},
+        }
+        if self.tokens["input"] or self.tokens["output"]:
+            record["tokens"] = self.tokens
+        if self.cache:
+            record["cache"] = self.cache
+        record.update(self.fields)
+        return record
+
+
+def start_request(endpoint: str, method: str = "POST", request_id: Optional[str] = None) -> RequestRecord:
+    record = RequestRecord(endpoint, method, request_id)
+    _current.set(record)
+    return record
+
+
+def current() -> Optional[RequestRecord]:
+    return _current.get()
+
+
+def annotate(**fields: Any):
+    """Додає довільні поля до запису поточного запиту (user_id автоматично хешується)."""
+    record = _current.get()
+    if record is None:
+        return
+    user_id = fields.pop("user_id", None)
+    if user_id is not None:
+        record.fields["user"] = hash_user_id(user_id)
+    record.fields.update(fields)
+
+
+def add_tokens(input_tokens: int = 0, output_tokens: int = 0):
+    record = _current.get()
+    if record is not None:
+        record.tokens["input"] += input_tokens or 0
+        record.tokens["output"] += output_tokens or 0
+
+
+def record_cache(name: str, hit: bool):
+    record = _current.get()
+    if record is not None:
+        counts = record.cache.setdefault(name, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def finish_request(record: RequestRecord, status: int, error_class: Optional[str] = None):
+    """Вирішує щодо семплювання і пише JSON-рядок: помилки — завжди, успіхи — з SAMPLE_RATE."""
+    global _logger
+    if error_class:
+        record.fields["error_class"] = error_class
+    is_error = status >= 400 or "error_class" in record.fields
+    if not is_error and (SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE):
+        return
+    if _logger is None:
+        _logger = configure_jsonl_logger("mista.requests", REQUEST_LOG_FILE)
+    duration_ms = (time.perf_counter() - record.started) * 1000
+    _logger.info(json.dumps(record.to_dict(status, duration_ms), ensure_ascii=False, separators=(",", ":")))
+
+
+def _on_span(stage: str, seconds: float):
+    record = _current.get()
+    if record is not None:
+        record.add_stage(stage, seconds)
+
+
+metrics.add_span_listener(_on_span)
@@ -91,27 +91,90 @@
                 chatBody.scrollTop = chatBody.scrollHeight;
             }
 
+            // Уже показані повідомлення (id) і курсор /messages на найновіше з них
+            const shownMessageIds = new Set();
+            let newestMessageCursor = null;
+
+            // Той самий формат, що й chat_backend.encode_messages_cursor: base64url від JSON [created_at, id]
+            function encodeMessageCursor(msg) {
+                return btoa(JSON.stringify([msg.created_at, msg.id])).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+            }
+
+            function rememberMessage(msg) {
+                if (msg.id == null) return true;
+                if (shownMessageIds.has(msg.id)) return false;
+                shownMessageIds.add(msg.id);
+                return true;
+            }
+
             async function loadInitialMessages() {
                 if (!currentUserId) return;
-                const { data, error } = await supabase.from('messages').select('*').order('created_at', { ascending: true }).limit(100);
-                if (error) { console.error("History load error:", error); return; }
+                let page;
+                try {
+                    // Бекенд віддає лише потрібні колонки, а браузер перевіряє кеш через ETag
+                    const response = await fetch('https://mista-backend.onrender.com/messages?limit=100&fields=user_id,username,message');
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                    page = await response.json();
+                } catch (error) { console.error("History load error:", error); return; }
                 chatBody.innerHTML = '';
-                data.forEach(msg => {
+                shownMessageIds.clear();
+                page.messages.forEach(msg => {
+                    rememberMessage(msg);
                     displayChatMessage(msg.username || 'Невідомий', msg.message || '', msg.user_id === currentUserId);
                     const msgDate = new Date(msg.created_at);
                     if (msgDate > lastMessageTimestamp) lastMessageTimestamp = msgDate;
                 });
+                newestMessageCursor = page.newer_cursor;
+            }
+
+            function showIncomingMessage(msg) {
+                if (!rememberMessage(msg)) return;
+                // Свої повідомлення вже показані при відправці
+                if (msg.user_id !== currentUserId) {
+                    displayChatMessage(msg.username || 'Невідомий', msg.message || '', false);
+                }
+                const msgDate = new Date(msg.created_at);
+                if (msgDate >= lastMessageTimestamp) {
+                    lastMessageTimestamp = msgDate;
+                    newestMessageCursor = encodeMessageCursor(msg);
+                }
+            }
+
+            // Після (пере)підключення довантажує все, що прийшло, поки сокет був закритий
+            // (зокрема після закриття 1013 як повільного клієнта)
+            async function catchUpMessages() {
+                let cursor = newestMessageCursor;
+                if (!cursor) return; // Історію ще не завантажено — це зробить loadInitialMessages
+                try {
+                    while (cursor) {
+                        const response = await fetch(`https://mista-backend.onrender.com/messages?limit=200&fields=user_id,username,message&after=${encodeURIComponent(cursor)}`);
+                        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                        const page = await response.json();
+                        page.messages.forEach(showIncomingMessage);
+                        cursor = page.has_more && page.messages.length ? page.newer_cursor : null;
+                    }
+                } catch (error) { console.error("Catch-up error:", error); }
+            }
+
+            // Нові повідомлення приходять з бекенду, який тримає одну підписку на всіх;
+            // Supabase-канал лишається лише для присутності.
+            let messageSocketRetryMs = 1000;
+            function connectMessageSocket() {
+                const socket = new WebSocket('wss://mista-backend.onrender.com/ws/messages');
+                socket.onopen = () => {
+                    messageSocketRetryMs = 1000;
+                    catchUpMessages();
+                };
+                socket.onmessage = (event) => showIncomingMessage(JSON.parse(event.data));
+                socket.onclose = () => {
+                    setTimeout(connectMessageSocket, messageSocketRetryMs);
+                    messageSocketRetryMs = Math.min(messageSocketRetryMs * 2, 30000);
+                };
             }
 
             function listenForMessages() {
-                supabase.channel('any-realtime-channel')
-                    .on('postgres_changes', { event: '*', schema: 'public', table: 'messages' }, payload => {
-                        const newMessage = payload.new;
-                        if (new Date(newMessage.created_at) >= lastMessageTimestamp && newMessage.user_id !== currentUserId) {
-                            displayChatMessage(newMessage.username || 'Невідомий', newMessage.message || '', false);
-                            lastMessageTimestamp = new Date(newMessage.created_at);
-                        }
-                    })
+                connectMessageSocket();
+                channel
                     .on('presence', { event: 'sync' }, () => {
                         const state = channel.presenceState();
                         const count = Object.keys(state).length;
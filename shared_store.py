@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+def worker_id() -> str:
+    """Ідентифікатор воркера для оренд (лідерства); pid читається щоразу, бо воркери форкаються."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SQLiteSharedStore:
+    """
+    Спільний для воркерів одного інстансу стан у SQLite-файлі в режимі WAL:
+    JSON-значення з TTL, оренди для вибору лідера та GCRA-ліміти.
+    Звернення короткі, але блокуючі, тож виконуються в пулі потоків.
+    """
+
+    def __init__(self, path: str, sweep_interval: float = 60.0):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Після fork з'єднання батьківського процесу використовувати не можна
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _run(self, fn, *args):
+        with self._lock:
+            return fn(self._connection(), *args)
+
+    # --- Значення з TTL ---
+    @staticmethod
+    def _get(conn, key):
+        row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    @staticmethod
+    def _set(conn, key, value, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+
+    @staticmethod
+    def _incr(conn, key):
+        conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, '1', NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (key,),
+        )
+        return int(conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0])
+
+    async def get(self, key: str) -> Any:
+        return await asyncio.to_thread(self._run, self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await asyncio.to_thread(self._run, self._set, key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        return await asyncio.to_thread(self._run, self._incr, key)
+
+    # --- Оренди ---
+    @staticmethod
+    def _acquire_lease(conn, name, owner, ttl):
+        now = time.time()
+        conn.execute(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at <= ? OR leases.owner = excluded.owner",
+            (name, owner, now + ttl, now),
+        )
+        row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == owner
+
+    @staticmethod
+    def _release_lease(conn, name, owner):
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    async def acquire_lease(self, name: str, ttl: float, owner: Optional[str] = None) -> bool:
+        """Атомарно бере оренду, якщо вона вільна, прострочена або вже наша."""
+        return await asyncio.to_thread(self._run, self._acquire_lease, name, owner or worker_id(), ttl)
+
+    async def release_lease(self, name: str, owner: Optional[str] = None):
+        await asyncio.to_thread(self._run, self._release_lease, name, owner or worker_id())
+
+    # --- GCRA (той самий інтерфейс, що й у rate_limit.MemoryGCRAStore) ---
+    def _hit(self, conn, key, interval, burst, charge):
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            backlog = max(row[0] - now, 0.0) if row else 0.0
+            new_tat = now + backlog + interval
+            overshoot = backlog + interval - burst * interval
+            if overshoot <= 0 and charge:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat),
+                )
+            # Періодично прибираємо ключі, що вже повністю відновились
+            if now >= self._next_sweep:
+                conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+                self._next_sweep = now + self.sweep_interval
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(0.0, overshoot)
+
+    async def hit(self, key: str, interval: float, burst: int, charge: bool = True) -> float:
+        return await asyncio.to_thread(self._run, self._hit, key, interval, burst, charge)
+
+    def __len__(self) -> int:
+        return self._run(lambda conn: conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0])
+
+
+class RedisSharedStore:
+    """Той самий інтерфейс поверх Redis-сумісного сервера (потрібен пакет redis)."""
+
+    def __init__(self, url: str, prefix: str = "mista:"):
+        import redis.asyncio as redis_asyncio
+        from rate_limit import RedisGCRAStore
+
+        self._client = redis_asyncio.from_url(url)
+        self._limits = RedisGCRAStore(url, prefix=prefix + "rl:")
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self._client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), px=int(ttl * 1000) if ttl else None)
+
+    async def incr(self, key: str) -> int:
+        return int(await self._client.incr(self.prefix + key))
+
+    async def acquire_lease(self, name: str, ttl: float, owner: Optional[str] = None) -> bool:
+        key = self.prefix + "lease:" + name
+        owner = owner or worker_id()
+        if await self._client.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        current = await self._client.get(key)
+        if current is not None and current.decode() == owner:
+            await self._client.pexpire(key, int(ttl * 1000))
+            return True
+        return False
+
+    async def release_lease(self, name: str, owner: Optional[str] = None):
+        key = self.prefix + "lease:" + name
+        current = await self._client.get(key)
+        if current is not None and current.decode() == (owner or worker_id()):
+            await self._client.delete(key)
+
+    async def hit(self, key: str, interval: float, burst: int, charge: bool = True) -> float:
+        return await self._limits.hit(key, interval, burst, charge)
+
+    def __len__(self) -> int:
+        return 0
+
+
+def create_shared_store(url: Optional[str] = None):
+    """
+    MISTA_SHARED_STORE: sqlite:////абсолютний/шлях.db (три слеші — відносний шлях) або redis://host:port/0.
+    Порожнє значення — однопроцесний режим, де кожен воркер тримає стан у власній пам'яті.
+    """
+    url = url if url is not None else os.environ.get("MISTA_SHARED_STORE", "")
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            return RedisSharedStore(url)
+        except ImportError:
+            logger.warning("MISTA_SHARED_STORE points to Redis but the 'redis' package is not installed; running without a shared store.")
+            return None
+    raise ValueError(f"Unsupported MISTA_SHARED_STORE URL: {url}")
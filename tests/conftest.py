@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# chat_backend налаштовує логи й історію репутації при імпорті: тести не пишуть у репозиторій
+# і не ходять у мережу (GitHub, Gemini)
+_OUTPUT_DIR = tempfile.mkdtemp(prefix="mista-tests-")
+os.environ.setdefault("MISTA_LOG_FILE", os.path.join(_OUTPUT_DIR, "mista.log"))
+os.environ.setdefault("MISTA_REQUEST_LOG_FILE", os.path.join(_OUTPUT_DIR, "mista_requests.jsonl"))
+os.environ.setdefault("MISTA_REPUTATION_HISTORY_FILE", "")
+os.environ.setdefault("MISTA_REPUTATION_REFRESH_SECONDS", "0")
+os.environ.setdefault("MISTA_LLM_BACKEND", "fake")
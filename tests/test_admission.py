@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+async def _hold(controller, release, entered):
+    async with controller.slot():
+        entered.append(True)
+        await release.wait()
+
+
+def test_admits_up_to_max_concurrent_then_queues_fifo():
+    async def run():
+        controller = AdmissionController("test", max_concurrent=2, max_queue=2, queue_timeout=1)
+        release = asyncio.Event()
+        entered = []
+        tasks = [asyncio.create_task(_hold(controller, release, entered)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        assert len(entered) == 2
+        assert controller.in_flight == 2 and controller.queue_depth == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(entered) == 4
+        assert controller.in_flight == 0 and controller.queue_depth == 0
+        assert controller.stats["admitted"] == 4 and controller.stats["queued"] == 2
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_shed_immediately_with_503():
+    async def run():
+        controller = AdmissionController("test", max_concurrent=1, max_queue=1, queue_timeout=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(controller, release, [])) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire()
+        assert excinfo.value.status_code == 503 and excinfo.value.reason == "queue_full"
+        assert excinfo.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_removes_waiter():
+    async def run():
+        controller = AdmissionController("test", max_concurrent=1, max_queue=4, queue_timeout=0.02)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release, []))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire()
+        assert excinfo.value.reason == "queue_timeout"
+        assert controller.queue_depth == 0
+        release.set()
+        await holder
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        controller = AdmissionController("test", max_concurrent=1, max_queue=4, queue_timeout=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release, []))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.queue_depth == 0
+        release.set()
+        await holder
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_slot_handed_to_cancelled_waiter_is_not_leaked():
+    async def run():
+        controller = AdmissionController("test", max_concurrent=1, max_queue=4, queue_timeout=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release, []))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        # Слот передається очікувачу, і в ту ж ітерацію його скасовують
+        release.set()
+        await asyncio.sleep(0)
+        waiter.cancel()
+        _, outcome = await asyncio.gather(holder, waiter, return_exceptions=True)
+        if not isinstance(outcome, BaseException):
+            controller.release()  # Скасування прийшло запізно: слот отримано, тож його віддає викликач
+        assert controller.in_flight == 0 and controller.queue_depth == 0
+        await asyncio.wait_for(controller.acquire(), 0.1)
+
+    asyncio.run(run())
+
+
+def test_pause_rejects_with_429_until_retry_after():
+    async def run():
+        controller = AdmissionController("test")
+        controller.pause(30)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire()
+        assert excinfo.value.status_code == 429 and 29 <= excinfo.value.retry_after <= 30
+        controller.pause(0)  # Коротша пауза не скорочує вже встановлену
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from analysis_vectors import ContextSet, IntensitySchema, IntensityVector
+from analyzer import AnalysisCache, Analyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return Analyzer(llm_interaction_instance=None)
+
+
+def _mutate(results):
+    results["context"].bits ^= 0b1
+    intensities = results["intensities"]
+    for i in range(len(intensities.values)):
+        intensities.values[i] = 99.0
+
+
+def test_cached_results_equal_fresh_ones(analyzer):
+    analyzer.analysis_cache.clear()
+    first = analyzer.analyze("Привіт, розкажи про себе", {})
+    second = analyzer.analyze("Привіт, розкажи про себе", {})
+    assert analyzer.analysis_cache.stats["hits"] >= 1
+    for field in ("context", "user_intent", "emotional_tone", "psychological_state"):
+        assert first[field] == second[field]
+    assert first["intensities"].to_dict() == second["intensities"].to_dict()
+
+
+def test_mutating_a_result_does_not_leak_into_the_cache(analyzer):
+    analyzer.analysis_cache.clear()
+    text = "Хочу гру, ти моя господиня"
+    fresh = analyzer.analyze(text, {})
+    expected_context, expected_intensities = fresh["context"].copy(), fresh["intensities"].to_dict()
+
+    # Промах: кеш отримав копію, тож зміни в першому результаті його не зачіпають
+    _mutate(fresh)
+    hit = analyzer.analyze(text, {})
+    assert hit["context"] == expected_context
+    assert hit["intensities"].to_dict() == expected_intensities
+
+    # Влучання: кожен виклик отримує власні копії
+    _mutate(hit)
+    again = analyzer.analyze(text, {})
+    assert again["context"] == expected_context
+    assert again["intensities"].to_dict() == expected_intensities
+    assert again["intensities"].values is not hit["intensities"].values
+
+
+def test_vector_copies_are_independent():
+    schema = IntensitySchema(["a", "b"])
+    vector = IntensityVector(schema, [1.0, 0.0])
+    clone = vector.copy()
+    clone.values[1] = 2.0
+    assert vector.to_dict() == {"a": 1.0, "b": 0.0} and clone.schema is schema
+
+    context = ContextSet(0b1)
+    other = context.copy()
+    other.bits |= 0b10
+    assert context.bits == 0b1 and other == ContextSet(0b11)
+
+
+def test_lru_evicts_oldest_and_skips_long_inputs():
+    cache = AnalysisCache(max_entries=2, max_input_chars=5)
+    cache.put("a", {"x": 1})
+    cache.put("b", {"x": 2})
+    assert cache.get("a") == {"x": 1}  # "a" стає найсвіжішим
+    cache.put("c", {"x": 3})
+    assert cache.get("b") is None and cache.get("c") == {"x": 3}
+    assert not cache.cacheable("задовгий")
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["skipped"] == 1 and stats["entries"] == 2
+    assert not AnalysisCache(max_entries=0).cacheable("a")
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Паритет скомпільованих таблиць analyzer_rules з еталонними ланцюжками if/elif (див. benchmarks/analyzer_rules_parity.py)."""
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import analyzer_reference as reference  # noqa: E402
+from analyzer_rules_parity import SENTIMENTS, TONES, condition_universe, corpus_cases, generate_intent_cases, vectorized  # noqa: E402
+
+from analysis_vectors import IntensitySchema  # noqa: E402
+from analyzer_rules import get_compiled_rules  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return get_compiled_rules()
+
+
+@pytest.fixture(scope="module")
+def universe():
+    return condition_universe()
+
+
+def _intent_mismatches(rules, cases):
+    mismatches = []
+    for case in cases:
+        expected, actual = reference.infer_user_intent(case), rules.intent.infer(case)
+        if expected != actual:
+            mismatches.append((expected, actual, case))
+    return mismatches[:5]
+
+
+def test_intent_matches_reference_on_generated_matrix(rules, universe):
+    contexts, intensities, _ = universe
+    assert _intent_mismatches(rules, generate_intent_cases(contexts, intensities, random_cases=5000, seed=7)) == []
+
+
+def test_intent_matches_reference_on_vector_inputs(rules, universe):
+    contexts, intensities, _ = universe
+    schema = IntensitySchema(intensities)
+    cases = (vectorized(case, schema) for case in generate_intent_cases(contexts, intensities, random_cases=5000, seed=8, pairs=False))
+    assert _intent_mismatches(rules, cases) == []
+
+
+def test_intent_matches_reference_on_analyzer_corpus(rules):
+    assert _intent_mismatches(rules, corpus_cases(messages=40, seed=7)) == []
+
+
+def test_state_and_token_tables_match_reference(rules, universe):
+    _, _, intents = universe
+    mismatches = []
+    for intent, tone, sentiment in itertools.product(intents, TONES, SENTIMENTS):
+        case = {"user_intent": intent, "emotional_tone": tone, "sentiment": sentiment, "intensities": {}}
+        expected = (reference.analyze_psychological_state(case), reference.get_recommended_max_tokens(case))
+        actual = (rules.state.infer(intent, tone, sentiment), rules.tokens.recommend(intent, tone))
+        if expected != actual:
+            mismatches.append((expected, actual, case))
+    assert mismatches[:5] == []
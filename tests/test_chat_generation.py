@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+import chat_backend
+from llm_interaction import LLMResponse
+
+
+class RecordingModel:
+    """Чат-модель, що запам'ятовує виклики; перший (спекулятивний) можна затримати."""
+
+    def __init__(self, speculative_delay=0.0):
+        self.calls = []
+        self.cancelled = []
+        self.speculative_delay = speculative_delay
+
+    async def generate(self, contents, **config):
+        index = len(self.calls)
+        self.calls.append(config)
+        try:
+            if index == 0:
+                await asyncio.sleep(self.speculative_delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        return LLMResponse(f"reply {index}", input_tokens=1, output_tokens=2)
+
+
+class StubAnalyzer:
+    def __init__(self, intent="general_chat", max_tokens=200, delay=0.0):
+        self.intent = intent
+        self.max_tokens = max_tokens
+        self.delay = delay
+
+    def analyze(self, message, profile):
+        time.sleep(self.delay)
+        return {"user_intent": self.intent}
+
+    def get_recommended_max_tokens(self, analysis_results):
+        return self.max_tokens
+
+    def get_recommended_mista_mood(self, analysis_results):
+        return "базовий"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def install(model, analyzer):
+        monkeypatch.setattr(chat_backend, "chat_model", model)
+        monkeypatch.setattr(chat_backend, "analyzer", analyzer)
+        chat_backend.history_manager.clear()
+        return chat_backend
+    return install
+
+
+def _message(text="привіт"):
+    return chat_backend.ChatMessage(message=text, user_id="u1", username="tester")
+
+
+def test_speculative_response_is_kept_when_budget_fits(backend):
+    model = RecordingModel()
+    backend(model, StubAnalyzer(max_tokens=chat_backend.SPECULATIVE_MAX_TOKENS))
+    assert asyncio.run(chat_backend.generate_chat_response(_message())) == "reply 0"
+    assert len(model.calls) == 1
+    assert model.calls[0]["max_output_tokens"] == chat_backend.SPECULATIVE_MAX_TOKENS
+
+
+def test_larger_recommended_budget_restarts_generation(backend):
+    model = RecordingModel(speculative_delay=1.0)
+    backend(model, StubAnalyzer(intent="fantasy_exploration", max_tokens=500))
+    restarts = chat_backend.speculation_stats["budget_restarts"]
+
+    assert asyncio.run(chat_backend.generate_chat_response(_message())) == "reply 1"
+    assert model.calls[1]["max_output_tokens"] == 500
+    assert model.cancelled == [0]
+    assert chat_backend.speculation_stats["budget_restarts"] == restarts + 1
+
+
+def test_directive_restart_appends_directive(backend):
+    model = RecordingModel(speculative_delay=1.0)
+    backend(model, StubAnalyzer(intent="financial_tribute_readiness", max_tokens=200))
+    assert asyncio.run(chat_backend.generate_chat_response(_message("готовий платити"))) == "reply 1"
+    assert model.calls[1]["max_output_tokens"] == 200
+    assert model.cancelled == [0]
+
+
+def test_outer_deadline_during_analysis_cancels_speculative_request(backend):
+    model = RecordingModel(speculative_delay=5.0)
+    backend(model, StubAnalyzer(delay=0.3))
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(chat_backend.generate_chat_response(_message()), 0.05)
+        # Дати скасуванню дійти до корутини моделі
+        await asyncio.sleep(0.4)
+        assert model.cancelled == [0]
+
+    asyncio.run(run())
+
+
+def test_speculative_config_is_available_without_analyzer(backend):
+    # Прогрів Analyzer міг не вдатися: /chat має відповісти спекулятивно, а не впасти з TypeError
+    model = RecordingModel()
+    backend(model, None)
+    failures = chat_backend.speculation_stats["analysis_failures"]
+    assert asyncio.run(chat_backend.generate_chat_response(_message())) == "reply 0"
+    assert model.calls[0]["max_output_tokens"] == chat_backend.SPECULATIVE_MAX_TOKENS
+    assert chat_backend.speculation_stats["analysis_failures"] == failures + 1
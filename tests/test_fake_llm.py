@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from llm_interaction import FakeLLMBackend
+
+
+def test_from_env_reads_every_parameter(monkeypatch):
+    for name, value in {"LATENCY_MS": "0", "LATENCY_SIGMA": "0.1", "ERROR_RATE": "0.25",
+                        "RESPONSE_WORDS": "12", "CHUNK_WORDS": "4", "SEED": "7"}.items():
+        monkeypatch.setenv("MISTA_FAKE_LLM_" + name, value)
+    backend = FakeLLMBackend.from_env()
+    assert (backend.latency_ms, backend.latency_sigma, backend.error_rate) == (0.0, 0.1, 0.25)
+    assert (backend.response_words, backend.chunk_words) == (12, 4)
+
+
+def test_chunk_words_sets_streaming_granularity(monkeypatch):
+    async def stream(backend):
+        return [chunk async for chunk in backend.stream("привіт")]
+
+    monkeypatch.setenv("MISTA_FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setenv("MISTA_FAKE_LLM_RESPONSE_WORDS", "12")
+    monkeypatch.setenv("MISTA_FAKE_LLM_CHUNK_WORDS", "1")
+    word_by_word = asyncio.run(stream(FakeLLMBackend.from_env()))
+    monkeypatch.setenv("MISTA_FAKE_LLM_CHUNK_WORDS", "6")
+    coarse = asyncio.run(stream(FakeLLMBackend.from_env()))
+    assert len(word_by_word) == 12 and len(coarse) == 2
+    assert "".join(word_by_word) == "".join(coarse)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from history_manager import HistoryManager, estimate_tokens
+from shared_store import SQLiteSharedStore
+
+
+def _texts(contents):
+    return [part for item in contents for part in item["parts"]]
+
+
+def test_prompt_keeps_newest_turns_within_budget():
+    manager = HistoryManager(max_verbatim_turns=50, max_prompt_tokens=60)
+    for i in range(10):
+        manager.record_turn("u", f"питання {i} " + "x" * 40, f"відповідь {i}")
+    contents = manager.build_contents("u", "нове")
+    texts = _texts(contents)
+    assert texts[-1] == "нове"
+    assert any(text.startswith("відповідь 9") for text in texts)
+    assert not any(text.startswith("відповідь 0") for text in texts)
+    assert sum(estimate_tokens(text) for text in texts) <= 60
+
+
+def test_old_turns_fold_into_summary_in_background():
+    async def run():
+        calls = []
+
+        async def summarizer(previous, turns):
+            calls.append(list(turns))
+            return f"{previous} +{len(turns)}".strip()
+
+        manager = HistoryManager(summarizer=summarizer, max_verbatim_turns=2)
+        for i in range(3):
+            manager.record_turn("u", f"q{i}", f"a{i}")
+        await manager.sessions["u"].summary_task
+        assert calls == [[("q0", "a0")]]
+        assert manager.recent_turns("u") == [("q1", "a1"), ("q2", "a2")]
+        texts = _texts(manager.build_contents("u", "q3"))
+        assert texts[0].endswith("+1") and texts[-1] == "q3"
+        assert manager.get_stats()["summaries_completed"] == 1
+
+    asyncio.run(run())
+
+
+def test_without_event_loop_old_turns_are_dropped():
+    manager = HistoryManager(summarizer=None, max_verbatim_turns=1)
+    manager.record_turn("u", "q0", "a0")
+    manager.record_turn("u", "q1", "a1")
+    assert manager.recent_turns("u") == [("q1", "a1")]
+    assert manager.stats["turns_dropped"] == 1
+
+
+def test_sessions_are_bounded_and_recent_turns_does_not_create_one():
+    manager = HistoryManager(max_sessions=2)
+    assert manager.recent_turns("ghost") == [] and "ghost" not in manager.sessions
+    for user in ("a", "b", "c"):
+        manager.record_turn(user, "q", "a")
+    assert list(manager.sessions) == ["b", "c"]
+    manager.clear("b")
+    assert list(manager.sessions) == ["c"]
+    manager.clear()
+    assert manager.get_stats()["active_sessions"] == 0
+
+
+def test_workers_share_history_through_the_store(tmp_path):
+    async def run():
+        store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+        first, second = HistoryManager(store=store), HistoryManager(store=store)
+        await first.commit_turn("u", "q0", "a0")
+        await second.load("u")
+        assert second.recent_turns("u") == [("q0", "a0")]
+        await second.commit_turn("u", "q1", "a1")
+        # Перший воркер не бачив другого ходу, але commit_turn спершу підтягує свіжий стан
+        await first.commit_turn("u", "q2", "a2")
+        await second.load("u")
+        assert second.recent_turns("u") == [("q0", "a0"), ("q1", "a1"), ("q2", "a2")]
+
+        await first.forget()
+        await second.load("u")
+        assert second.recent_turns("u") == []
+
+    asyncio.run(run())
+
+
+def test_shared_fold_keeps_turns_added_by_another_worker(tmp_path):
+    async def run():
+        store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+        release = asyncio.Event()
+
+        async def summarizer(previous, turns):
+            await release.wait()
+            return "підсумок"
+
+        folding = HistoryManager(summarizer=summarizer, max_verbatim_turns=2, store=store)
+        other = HistoryManager(summarizer=summarizer, max_verbatim_turns=2, store=store)
+        for i in range(3):
+            await folding.commit_turn("u", f"q{i}", f"a{i}")
+        # Поки перший воркер згортає q0, другий додає хід і теж починає згортання
+        await other.commit_turn("u", "q3", "a3")
+        release.set()
+        await asyncio.gather(folding.sessions["u"].summary_task, other.sessions["u"].summary_task)
+
+        await other.load("u")
+        assert other.sessions["u"].summary == "підсумок"
+        assert other.sessions["u"].pending == []
+        assert other.recent_turns("u") == [("q2", "a2"), ("q3", "a3")]
+
+    asyncio.run(run())
+
+
+def test_full_history_tokens_count_folded_turns_not_the_summary():
+    async def run():
+        async def summarizer(previous, turns):
+            return "коротко"
+
+        manager = HistoryManager(summarizer=summarizer, max_verbatim_turns=1)
+        turns = [(f"питання {i} " + "x" * 40, f"відповідь {i} " + "y" * 40) for i in range(4)]
+        for user_text, model_text in turns:
+            manager.record_turn("u", user_text, model_text)
+        await manager.sessions["u"].summary_task
+        session = manager.sessions["u"]
+        assert session.summary == "коротко" and session.pending == []
+        raw = sum(estimate_tokens(u) + estimate_tokens(m) for u, m in turns)
+        assert session.full_history_tokens() == raw
+
+        manager.build_contents("u", "нове")
+        stats = manager.get_stats()
+        assert stats["full_history_tokens_total"] == raw + estimate_tokens("нове")
+        assert stats["prompt_size_reduction"] > 0.5
+
+    asyncio.run(run())
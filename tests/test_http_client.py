@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import email.utils
+import time
+
+import httpx
+import pytest
+
+import http_client
+from http_client import request_with_retry
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Замість справжнього очікування записує затримки; jitter фіксовано на максимум."""
+    recorded = []
+
+    async def sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", sleep)
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)
+    return recorded
+
+
+def _client(responses):
+    """Клієнт, що по черзі віддає відповіді або піднімає винятки зі списку."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        item = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), calls
+
+
+def _call(client, **kwargs):
+    async def run():
+        async with client:
+            return await request_with_retry(client, "GET", "https://example.test/x", **kwargs)
+    return asyncio.run(run())
+
+
+def test_retries_statuses_with_exponential_backoff(delays):
+    client, calls = _client([httpx.Response(503), httpx.Response(502), httpx.Response(200, text="ok")])
+    response = _call(client, retries=3, backoff=0.5)
+    assert response.status_code == 200 and response.text == "ok"
+    assert len(calls) == 3 and delays == [0.5, 1.0]
+
+
+def test_retries_network_errors_and_reraises_after_the_last_attempt(delays):
+    client, calls = _client([httpx.ConnectError("refused"), httpx.Response(200)])
+    assert _call(client, retries=2).status_code == 200
+    assert len(calls) == 2 and delays == [0.5]
+
+    client, calls = _client([httpx.ReadTimeout("slow")])
+    with pytest.raises(httpx.ReadTimeout):
+        _call(client, retries=2)
+    assert len(calls) == 3
+
+
+def test_does_not_retry_other_statuses(delays):
+    client, calls = _client([httpx.Response(404)])
+    assert _call(client).status_code == 404
+    assert len(calls) == 1 and delays == []
+
+
+def test_returns_the_last_response_when_retries_run_out(delays):
+    client, calls = _client([httpx.Response(500, text="first"), httpx.Response(503, text="last")])
+    response = _call(client, retries=1)
+    assert response.status_code == 503 and response.text == "last"
+    assert len(calls) == 2
+
+
+def test_retry_after_in_seconds_and_http_date(delays):
+    retry_at = email.utils.formatdate(time.time() + 4, usegmt=True)
+    client, _ = _client([
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(429, headers={"Retry-After": retry_at}),
+        httpx.Response(200),
+    ])
+    assert _call(client, retries=3).status_code == 200
+    assert delays[0] == 2.0
+    assert 2.0 < delays[1] <= 4.0  # HTTP-дата з точністю до секунди
+
+
+def test_backoff_and_retry_after_are_capped(delays):
+    client, _ = _client([
+        httpx.Response(429, headers={"Retry-After": "3600"}),
+        httpx.Response(500),
+        httpx.Response(500),
+        httpx.Response(200),
+    ])
+    assert _call(client, retries=3, backoff=4.0, max_backoff=5.0).status_code == 200
+    assert delays == [5.0, 5.0, 5.0]
+
+
+def test_unparseable_retry_after_falls_back_to_backoff(delays):
+    client, _ = _client([httpx.Response(503, headers={"Retry-After": "soon"}), httpx.Response(200)])
+    assert _call(client, backoff=0.25).status_code == 200
+    assert delays == [0.25]
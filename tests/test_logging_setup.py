@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import os
+
+from logging_setup import worker_log_filename
+
+
+def test_single_worker_keeps_the_configured_file(monkeypatch):
+    monkeypatch.delenv("MISTA_WORKERS", raising=False)
+    assert worker_log_filename("mista.log") == "mista.log"
+    monkeypatch.setenv("MISTA_WORKERS", "1")
+    assert worker_log_filename("logs/mista_requests.jsonl") == "logs/mista_requests.jsonl"
+
+
+def test_each_worker_gets_its_own_file(monkeypatch):
+    monkeypatch.setenv("MISTA_WORKERS", "4")
+    assert worker_log_filename("mista.log") == f"mista.{os.getpid()}.log"
+    assert worker_log_filename("logs/mista_requests.jsonl") == f"logs/mista_requests.{os.getpid()}.jsonl"
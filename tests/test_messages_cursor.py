@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import chat_backend
+
+
+def _raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+class CapturingQuery:
+    """Запам'ятовує фільтр, який fetch_messages_page передає в supabase."""
+
+    def __init__(self):
+        self.filters = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": []})()
+
+
+def test_cursor_round_trip():
+    row = {"created_at": "2025-07-14T10:15:30.123456+00:00", "id": 42}
+    cursor = chat_backend.encode_messages_cursor(row)
+    assert chat_backend.decode_messages_cursor(cursor) == ("2025-07-14T10:15:30.123456+00:00", 42)
+
+
+@pytest.mark.parametrize("value", [
+    ['2025-07-14T10:15:30",id.gt.0),or(id.gt.0', 1],
+    ["2025-07-14T10:15:30)", 1],
+    ["not a date", 1],
+    ["2025-07-14T10:15:30", "1),or(id.gt.0"],
+    ["2025-07-14T10:15:30", 1.5],
+    ["2025-07-14T10:15:30", True],
+    [20250714, 1],
+    ["2025-07-14T10:15:30"],
+    {"created_at": "2025-07-14T10:15:30", "id": 1},
+])
+def test_malformed_cursor_is_rejected(value):
+    with pytest.raises(HTTPException) as excinfo:
+        chat_backend.decode_messages_cursor(_raw_cursor(value))
+    assert excinfo.value.status_code == 400
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(HTTPException):
+        chat_backend.decode_messages_cursor("%%%not-base64")
+
+
+def test_filter_uses_normalized_values(monkeypatch):
+    query = CapturingQuery()
+    monkeypatch.setattr(chat_backend, "supabase", query)
+    key = chat_backend.decode_messages_cursor(_raw_cursor(["2025-07-14T10:15:30Z", 7]))
+    chat_backend.fetch_messages_page(chat_backend.MESSAGE_COLUMNS, 10, before=key)
+    assert query.filters == ['created_at.lt."2025-07-14T10:15:30+00:00",and(created_at.eq."2025-07-14T10:15:30+00:00",id.lt.7)']
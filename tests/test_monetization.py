@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import chat_backend
+from llm_interaction import FakeLLMBackend
+from monetization_manager import DENIAL_PATTERNS, DenialPhraseFilter, MonetizationManager
+from validator import ResponseValidator
+
+WALLET_REQUEST = "Куди скинути гроші?"
+DENIALS = [
+    "не маю жодного гаманця", "У мене немає гаманця", "це не про гроші", "я не шукаю грошей",
+    "я не маю жодного гаманця, ні картки, ні сліду на жодній банківській установі",
+    "як модель ШІ, я не маю власного гаманця", "мої можливості не включають транзакції",
+]
+FILLER = ["Ну", "звісно", "моя Імперія", "Харків", "код", "влада", "я", "не", "гаманець", "гроші", "ш", ""]
+SEPARATORS = [" ", "  ", ". ", "! ", ", ", "?", "...", " . ", "\n", ",,", ":", ""]
+
+
+class ScriptedLLM:
+    """LLMInteraction, що віддає заданий текст заданими фрагментами."""
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = []
+
+    async def stream_text(self, **kwargs):
+        self.calls.append(kwargs)
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("stream broke")
+            yield chunk
+
+
+class EchoPromptGenerator:
+    async def generate_prompt(self, user_id, user_input, **kwargs):
+        return [{"role": "user", "content": user_input}], kwargs.get("max_new_tokens_override")
+
+
+class Profiles:
+    def load_user_profile(self, user_id):
+        return {"user_id": user_id, "mista_mood": "базовий", "total_interactions": 0} if user_id == "u1" else None
+
+
+def _manager(llm=None):
+    return MonetizationManager(llm, EchoPromptGenerator(), Profiles(), ResponseValidator())
+
+
+def _random_text(rng):
+    parts = []
+    for _ in range(rng.randint(0, 14)):
+        parts.append(rng.choice(DENIALS) if rng.random() < 0.3 else rng.choice(FILLER))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def _random_chunks(rng, text):
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.choice([1, 1, 2, 3, 5, 8, 20, 80])
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def test_streaming_filter_matches_one_shot_cleanup_on_fuzzed_chunks():
+    manager = _manager()
+    rng = random.Random(2024)
+    for _ in range(3000):
+        text = _random_text(rng)
+        denial_filter = DenialPhraseFilter()
+        streamed = "".join(denial_filter.feed(chunk) for chunk in _random_chunks(rng, text)) + denial_filter.flush()
+        assert streamed == manager._clean_denial_phrases(text), text
+
+
+def test_lookahead_covers_longest_denial_pattern():
+    assert DenialPhraseFilter().lookahead == max(len(pattern) for pattern in DENIAL_PATTERNS)
+
+
+def test_stream_cleans_denials_and_appends_missing_wallet():
+    async def run():
+        llm = ScriptedLLM(["Я ", "не шукаю ", "грошей. Але ", "моя Імперія чекає", "!"])
+        manager = _manager(llm)
+        stream = manager.stream_monetization_response(WALLET_REQUEST, "u1", [], {"user_intent": "monetization_initiation", "recommended_max_tokens": 120})
+        chunks = [chunk async for chunk in stream]
+        assert "".join(chunks) == stream.text
+        assert "не шукаю" not in stream.text
+        assert stream.wallet_appended and stream.text.endswith(f"Мій гаманець USDT TRC20: {manager.crypto_wallet_address}. Ось так.")
+        assert stream.is_valid is True
+        assert llm.calls[0]["max_new_tokens"] == 120
+
+    asyncio.run(run())
+
+
+def test_stream_skips_wallet_when_user_already_paid():
+    async def run():
+        manager = _manager(ScriptedLLM(["Добре. ", "Я перевірю."]))
+        stream = manager.stream_monetization_response("Я вже скинув, гаманець перевір", "u1", [], {"user_intent": "financial_tribute_readiness"})
+        assert "".join([chunk async for chunk in stream]) == "Добре. Я перевірю."
+        assert not stream.wallet_appended
+
+    asyncio.run(run())
+
+
+def test_stream_falls_back_when_nothing_was_emitted_and_handles_missing_profile():
+    async def run():
+        manager = _manager(ScriptedLLM(["x"], fail_after=0))
+        stream = manager.stream_monetization_response(WALLET_REQUEST, "u1", [], {})
+        assert [chunk async for chunk in stream] == [manager._error_response()]
+
+        missing = manager.stream_monetization_response(WALLET_REQUEST, "nobody", [], {})
+        assert [chunk async for chunk in missing] == [manager._missing_profile_response()]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "response, history, expected",
+    [
+        ("Звісно, моя Імперія чекає.", [], (True, "ok")),
+        ("   ", [], (False, "empty_response")),
+        ("Вибач, я лише мовна модель.", [], (False, "forbidden_phrase: мовна модель")),
+        ("Мовна моделька? Ні.", [], (True, "ok")),
+        ("Те саме!", [{"role": "user", "content": "a"}, {"role": "assistant", "content": "те саме"}], (False, "repeated_previous_response")),
+    ],
+)
+def test_validator(response, history, expected):
+    validator = ResponseValidator(forbidden_phrases=["мовна модель", " "])
+    assert validator.validate_response(response, history, {}) == expected
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.inserted = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.inserted.extend(rows)
+        self._data = [dict(row, id=i) for i, row in enumerate(rows)]
+        return self
+
+    def execute(self):
+        return type("FakeResponse", (), {"data": self._data, "error": None})()
+
+
+@pytest.fixture
+def app_backend(monkeypatch):
+    from analyzer import Analyzer
+
+    async def ready():
+        return True
+
+    supabase = FakeSupabase()
+    monkeypatch.setattr(chat_backend, "supabase", supabase)
+    monkeypatch.setattr(chat_backend, "chat_model", FakeLLMBackend(latency_ms=1, latency_sigma=0.0, response_words=12, chunk_words=3))
+    monkeypatch.setattr(chat_backend, "analyzer", Analyzer(llm_interaction_instance=None))
+    monkeypatch.setattr(chat_backend, "wait_until_ready", ready)
+    monkeypatch.setattr(chat_backend, "shared_store", None)
+    chat_backend.history_manager.clear()
+    yield supabase
+    chat_backend.history_manager.clear()
+
+
+def test_monetization_stream_route_streams_records_and_releases_slot(app_backend):
+    async def run():
+        transport = httpx.ASGITransport(app=chat_backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            payload = {"message": WALLET_REQUEST, "user_id": "stream-user", "username": "tester"}
+            async with client.stream("POST", "/monetization/stream", json=payload) as response:
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/plain")
+                body = "".join([chunk async for chunk in response.aiter_text()])
+        return body
+
+    body = asyncio.run(run())
+    assert "USDT TRC20" in body
+    assert chat_backend.chat_admission.in_flight == 0
+    assert chat_backend.history_manager.recent_turns("stream-user") == [(WALLET_REQUEST, body)]
+    assert [row["message"] for row in app_backend.inserted] == [WALLET_REQUEST, body]
+
+
+def test_monetization_stream_releases_slot_when_cancelled_during_analysis(app_backend, monkeypatch):
+    started, unblock = threading.Event(), threading.Event()
+
+    def slow_analyze(message, profile):
+        started.set()
+        unblock.wait(5)
+        return {"user_intent": "unknown"}
+
+    monkeypatch.setattr(chat_backend.analyzer, "analyze", slow_analyze)
+
+    async def run():
+        message = chat_backend.ChatMessage(message=WALLET_REQUEST, user_id="cancel-user", username="tester")
+        task = asyncio.create_task(chat_backend.monetization_stream_endpoint(message, SimpleNamespace(headers={}, client=None)))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        assert chat_backend.chat_admission.in_flight == 1
+        task.cancel()
+        unblock.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert chat_backend.chat_admission.in_flight == 0
+
+
+def test_monetization_stream_releases_slot_when_body_is_never_sent(app_backend):
+    async def run():
+        message = chat_backend.ChatMessage(message=WALLET_REQUEST, user_id="gone-user", username="tester")
+        response = await chat_backend.monetization_stream_endpoint(message, SimpleNamespace(headers={}, client=None))
+        assert chat_backend.chat_admission.in_flight == 1
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def broken_send(message):
+            raise OSError("client went away")
+
+        # Starlette може перепакувати OSError у ClientDisconnect
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, broken_send)
+
+    asyncio.run(run())
+    assert chat_backend.chat_admission.in_flight == 0
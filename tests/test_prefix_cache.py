@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import time
+from types import SimpleNamespace
+
+from llm_interaction import GeminiPrefixCache, PrefixCache
+
+
+class InMemoryPrefixCache(PrefixCache):
+    """PrefixCache з "провайдером" у пам'яті: лічить завантаження, пошуки й продовження."""
+
+    def __init__(self, text, existing=None, fail_uploads=0, **kwargs):
+        super().__init__(text, **kwargs)
+        self.existing = existing
+        self.fail_uploads = fail_uploads
+        self.uploads = 0
+        self.extends = 0
+        self.deleted_stale = 0
+
+    async def _find(self):
+        return self.existing
+
+    async def _upload(self):
+        await asyncio.sleep(0.01)
+        if self.fail_uploads:
+            self.fail_uploads -= 1
+            raise RuntimeError("prefix below the provider minimum")
+        self.uploads += 1
+        return f"cachedContents/{self.display_name}-{self.uploads}"
+
+    async def _extend(self, handle):
+        self.extends += 1
+        return time.time() + self.ttl
+
+    async def _delete_stale(self):
+        self.deleted_stale += 1
+
+
+async def _ready(cache):
+    """Перший get() лише запускає створення у фоні; чекаємо на нього й беремо дескриптор."""
+    assert await cache.get() is None
+    await cache._task
+    return await cache.get()
+
+
+def test_concurrent_gets_never_wait_and_upload_once():
+    async def run():
+        cache = InMemoryPrefixCache("persona", ttl=3600)
+        handles = await asyncio.gather(*(cache.get() for _ in range(10)))
+        # Усі запити під час завантаження йдуть із префіксом inline, а не чекають на нього
+        assert handles == [None] * 10
+        await cache._task
+        assert await cache.get() is not None
+        assert cache.uploads == 1 and cache.deleted_stale == 1
+        assert cache.stats["created"] == 1
+
+    asyncio.run(run())
+
+
+def test_fingerprint_changes_with_text_and_existing_cache_is_reused():
+    assert InMemoryPrefixCache("lore v1").display_name != InMemoryPrefixCache("lore v2").display_name
+    assert InMemoryPrefixCache("lore v1").display_name == InMemoryPrefixCache("lore v1").display_name
+
+    async def run():
+        cache = InMemoryPrefixCache("persona", existing="cachedContents/live")
+        assert await _ready(cache) == "cachedContents/live"
+        assert cache.uploads == 0 and cache.stats["reused"] == 1
+
+    asyncio.run(run())
+
+
+def test_refresh_is_scheduled_inside_the_margin():
+    async def run():
+        cache = InMemoryPrefixCache("persona", ttl=600, refresh_margin=300)
+        handle = await _ready(cache)
+        cache.expires_at = time.time() + 100  # уже в межах refresh_margin
+        assert await cache.get() == handle
+        await cache._task
+        assert cache.extends == 1 and cache.expires_at > time.time() + 500
+
+    asyncio.run(run())
+
+
+def test_expired_handle_is_recreated_in_background():
+    async def run():
+        cache = InMemoryPrefixCache("persona")
+        await _ready(cache)
+        cache.expires_at = time.time() - 1
+        assert await cache.get() is None
+        await cache._task
+        assert await cache.get() is not None and cache.uploads == 2
+
+    asyncio.run(run())
+
+
+def test_upload_failure_disables_cache_until_retry_after():
+    async def run():
+        cache = InMemoryPrefixCache("persona", fail_uploads=1, retry_after=60)
+        assert await _ready(cache) is None
+        assert await cache.get() is None  # без нової спроби до retry_after
+        assert cache._task.done() and cache.stats["failures"] == 1
+        cache._disabled_until = 0.0
+        assert await _ready(cache) is not None and cache.uploads == 1
+
+    asyncio.run(run())
+
+
+def test_invalidate_forces_a_new_upload():
+    async def run():
+        cache = InMemoryPrefixCache("persona")
+        first = await _ready(cache)
+        cache.invalidate()
+        assert cache.get_stats()["active"] is False
+        second = await _ready(cache)
+        assert second != first and cache.uploads == 2 and cache.stats["invalidated"] == 1
+
+    asyncio.run(run())
+
+
+def test_prefix_below_minimum_is_never_uploaded():
+    async def run():
+        cache = InMemoryPrefixCache("persona", min_tokens=1000)
+        assert not cache.eligible and cache.get_stats()["eligible"] is False
+        assert await cache.get() is None
+        assert cache._task is None and cache.uploads == 0
+
+    asyncio.run(run())
+
+
+def test_gemini_cache_requires_a_versioned_model():
+    assert GeminiPrefixCache.supports_model("gemini-1.5-flash-002")
+    assert GeminiPrefixCache.supports_model("models/gemini-1.5-pro-001")
+    assert not GeminiPrefixCache.supports_model("gemini-1.5-flash-latest")
+    assert not GeminiPrefixCache.supports_model("gemini-1.5-flash")
+
+
+def test_gemini_stale_caches_are_scoped_to_model_and_ttl():
+    cache = GeminiPrefixCache("persona", model_name="gemini-1.5-flash-002", ttl=600)
+    now = time.time()
+
+    def cached(name, model="models/gemini-1.5-flash-002", age=3600):
+        touched = datetime.datetime.fromtimestamp(now - age, tz=datetime.timezone.utc)
+        return SimpleNamespace(display_name=name, model=model, update_time=touched)
+
+    assert cache._is_stale(cached("mista-persona-old"), now)
+    assert not cache._is_stale(cached(cache.display_name), now)
+    # Кеш іншої моделі та кеш, який щойно продовжив інший воркер, не чіпаємо
+    assert not cache._is_stale(cached("mista-persona-old", model="models/gemini-1.5-pro-002"), now)
+    assert not cache._is_stale(cached("mista-persona-old", age=60), now)
+    assert not cache._is_stale(cached("someone-else", age=7200), now)
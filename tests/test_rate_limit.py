@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from rate_limit import MemoryGCRAStore, RateLimiter, RateLimitExceeded, client_ip, retry_after_header
+from shared_store import SQLiteSharedStore
+
+
+def _limiter(store=None, user_rate=2, ip_rate=2):
+    # Інтервали — степені двійки, щоб межа сплеску не залежала від округлення float
+    limiter = RateLimiter(store if store is not None else MemoryGCRAStore())
+    limiter.configure("user", user_rate, period=64.0)
+    limiter.configure("ip", ip_rate, period=64.0)
+    return limiter
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryGCRAStore()
+    return SQLiteSharedStore(str(tmp_path / "shared.db"))
+
+
+def test_gcra_allows_burst_then_reports_retry_after(store):
+    async def run():
+        assert await store.hit("k", 16.0, 3) == 0
+        assert await store.hit("k", 16.0, 3) == 0
+        assert await store.hit("k", 16.0, 3) == 0
+        retry_after = await store.hit("k", 16.0, 3)
+        assert 15.0 < retry_after <= 16.0
+        # Відмова не зсуває TAT: наступний запит отримує той самий час очікування
+        assert await store.hit("k", 16.0, 3) == pytest.approx(retry_after, abs=0.5)
+
+    asyncio.run(run())
+
+
+def test_gcra_peek_does_not_charge(store):
+    async def run():
+        for _ in range(5):
+            assert await store.hit("k", 16.0, 1, charge=False) == 0
+        assert await store.hit("k", 16.0, 1) == 0
+        assert await store.hit("k", 16.0, 1, charge=False) > 0
+
+    asyncio.run(run())
+
+
+def test_user_rejection_does_not_charge_ip_bucket(store):
+    async def run():
+        limiter = _limiter(store, user_rate=1, ip_rate=2)
+        await limiter.check(ip="1.2.3.4", user="alice")
+        for _ in range(3):
+            with pytest.raises(RateLimitExceeded) as excinfo:
+                await limiter.check(ip="1.2.3.4", user="alice")
+            assert excinfo.value.scope == "user"
+        # Відхилені запити alice не з'їли квоту IP: bob з тієї ж адреси проходить
+        await limiter.check(ip="1.2.3.4", user="bob")
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.check(ip="1.2.3.4", user="carol")
+        assert excinfo.value.scope == "ip"
+        assert limiter.stats == {"allowed": 2, "limited_user": 3, "limited_ip": 1}
+
+    asyncio.run(run())
+
+
+def test_ip_rejection_does_not_charge_user_bucket():
+    async def run():
+        limiter = _limiter(user_rate=2, ip_rate=1)
+        await limiter.check(ip="1.1.1.1", user="alice")
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.check(ip="1.1.1.1", user="alice")
+        assert excinfo.value.scope == "ip"
+        # Друга спроба alice не списалася, тож з іншої адреси в неї ще є запит
+        await limiter.check(ip="2.2.2.2", user="alice")
+
+    asyncio.run(run())
+
+
+def test_unconfigured_and_missing_scopes_are_skipped():
+    async def run():
+        limiter = _limiter(user_rate=1)
+        limiter.configure("ip", 0)
+        for _ in range(3):
+            await limiter.check(ip="1.1.1.1", user=None)
+        assert limiter.stats["allowed"] == 3
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "forwarded_for, trusted_hops, expected",
+    [
+        ("6.6.6.6, 1.2.3.4", 0, "10.0.0.1"),   # довіра вимкнена — заголовок ігнорується
+        ("6.6.6.6, 1.2.3.4", 1, "1.2.3.4"),    # лівий запис підробив клієнт
+        ("6.6.6.6, 1.2.3.4, 10.0.0.7", 2, "1.2.3.4"),
+        ("1.2.3.4", 3, "1.2.3.4"),             # проксі менше, ніж налаштовано
+        (" , ", 1, "10.0.0.1"),
+        (None, 1, "10.0.0.1"),
+    ],
+)
+def test_client_ip_uses_trusted_hop_from_the_right(forwarded_for, trusted_hops, expected):
+    assert client_ip(forwarded_for, "10.0.0.1", trusted_hops) == expected
+
+
+def test_retry_after_header_rounds_up():
+    assert retry_after_header(0.2) == "1"
+    assert retry_after_header(2.01) == "3"
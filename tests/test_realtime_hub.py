@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+from realtime_hub import MessageHub
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {"type": "websocket.disconnect"}
+
+    async def send_text(self, payload):
+        self.sent.append(payload)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_publish_fans_out_one_serialized_payload():
+    async def run():
+        hub = MessageHub(queue_size=4)
+        first, second = hub.connect(), hub.connect()
+        assert hub.publish({"id": 1, "message": "привіт"}) == 2
+        payload = first.queue.get_nowait()
+        assert payload is second.queue.get_nowait()
+        assert json.loads(payload) == {"id": 1, "message": "привіт"}
+
+    asyncio.run(run())
+
+
+def test_duplicate_ids_are_published_once():
+    async def run():
+        hub = MessageHub(queue_size=4, recent_ids=2)
+        client = hub.connect()
+        hub.publish_many([{"id": 1}, {"id": 1}, {"id": 2}, {"id": 3}])
+        assert hub.stats["duplicates"] == 1
+        assert client.queue.qsize() == 3
+        # Найстаріший id уже витиснуто з вікна дедуплікації (recent_ids=2)
+        assert hub.publish({"id": 3}) == 0
+        assert hub.publish({"id": 1}) == 1
+
+    asyncio.run(run())
+
+
+def test_slow_consumer_is_dropped_without_blocking_others():
+    async def run():
+        hub = MessageHub(queue_size=2)
+        slow, fast = hub.connect(), hub.connect()
+        for message_id in range(2):
+            hub.publish({"id": message_id})
+        fast.queue.get_nowait()
+        fast.queue.get_nowait()
+        assert hub.publish({"id": 2}) == 1
+        assert slow.dropped and hub.client_count == 1
+        assert hub.stats["dropped_clients"] == 1
+        assert json.loads(fast.queue.get_nowait()) == {"id": 2}
+
+    asyncio.run(run())
+
+
+def test_serve_forwards_messages_and_closes_dropped_client_with_1013():
+    async def run():
+        hub = MessageHub(queue_size=1)
+        websocket = FakeWebSocket()
+        serving = asyncio.create_task(hub.serve(websocket))
+        await asyncio.sleep(0)
+        hub.publish({"id": 1})
+        await asyncio.sleep(0.01)
+        assert [json.loads(p) for p in websocket.sent] == [{"id": 1}]
+        # Дві публікації без паузи: черга на одне місце переповнюється
+        hub.publish({"id": 2})
+        hub.publish({"id": 3})
+        await asyncio.wait_for(serving, 1)
+        assert websocket.closed_with == 1013
+        assert hub.client_count == 0
+
+    asyncio.run(run())
+
+
+def test_serve_stops_on_disconnect():
+    async def run():
+        hub = MessageHub()
+        websocket = FakeWebSocket()
+        serving = asyncio.create_task(hub.serve(websocket))
+        await asyncio.sleep(0)
+        assert hub.client_count == 1
+        websocket.disconnect.set()
+        await asyncio.wait_for(serving, 1)
+        assert hub.client_count == 0 and websocket.closed_with is None
+
+    asyncio.run(run())
+
+
+def test_upstream_subscription_restarts_after_failure():
+    async def run():
+        hub = MessageHub(upstream_retry_seconds=0)
+        attempts = []
+
+        async def subscriber(on_message):
+            attempts.append(len(attempts))
+            on_message({"id": len(attempts)})
+            if len(attempts) < 3:
+                raise ConnectionError("closed")
+            await asyncio.Event().wait()
+
+        hub.ensure_upstream(subscriber)
+        hub.ensure_upstream(subscriber)  # Друга підписка не створюється
+        await asyncio.sleep(0.05)
+        assert len(attempts) == 3 and hub.upstream_running
+        assert hub.stats["published"] == 3
+        await hub.stop()
+
+    asyncio.run(run())
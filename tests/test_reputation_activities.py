@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from reputation_manager import ReputationManager
+
+
+def test_batch_matches_per_event_tracking():
+    events = [
+        ("github", "stars", 3),
+        ("GitHub", "followers", 2),
+        ("reddit", "karma", 10),
+        ("reddit", "karma", 5),
+        ("github", "projects", {"name": "throne"}),
+        {"platform": "medium", "metric": "reads", "value": 7},
+        ("x", "likes", 1.5),
+    ]
+    single = ReputationManager()
+    for event in events:
+        if isinstance(event, dict):
+            single.track_activity(event["platform"], event["metric"], event["value"])
+        else:
+            single.track_activity(*event)
+    batch = ReputationManager()
+    summary = batch.track_activities(events)
+
+    assert summary["applied"] == len(events) and summary["rejected"] == {}
+    assert summary["platforms"] == ["github", "medium", "reddit", "x"]
+    for platform, details in single.platforms.items():
+        for metric, value in details.items():
+            assert batch.platforms[platform][metric] == (pytest.approx(value) if isinstance(value, float) else value)
+    assert batch.get_total_influence() == pytest.approx(single.get_total_influence())
+
+
+@pytest.mark.parametrize(
+    "event, reason",
+    [
+        (("github", ["stars"], 1), "malformed"),
+        (("github", {"stars": 1}, 1), "malformed"),
+        (("reddit", "karma"), "malformed"),
+        ({"platform": "reddit", "value": 1}, "malformed"),
+        ((None, "karma", 1), "malformed"),
+        (("myspace", "friends", 1), "unknown_platform"),
+        (("github", "forks", 1), "unknown_metric"),
+        (("github", "influence_score", 1), "unknown_metric"),
+        (("reddit", "karma", "багато"), "non_numeric"),
+        (("reddit", "karma", True), "non_numeric"),
+    ],
+)
+def test_invalid_events_are_counted_not_raised(event, reason):
+    manager = ReputationManager()
+    summary = manager.track_activities([event, ("reddit", "karma", 4)])
+    assert summary["rejected"] == {reason: 1}
+    assert summary["applied"] == 1
+    assert manager.platforms["reddit"]["karma"] == 4
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+
+from reputation_manager import REPUTATION_LEASE, ReputationManager
+from shared_store import SQLiteSharedStore
+from timeseries import TimeSeriesStore
+
+
+def _github_client(calls):
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.startswith("/repos/"):
+            return httpx.Response(200, json={"stargazers_count": 7, "name": "repo", "html_url": "https://example.test/repo"})
+        return httpx.Response(200, json={"followers": 3})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _manager(store, owner, calls):
+    manager = ReputationManager(http_client=_github_client(calls), refresh_interval=3600, shared_store=store)
+    manager.lease_owner = owner
+    return manager
+
+
+async def _run_tick(manager):
+    task = asyncio.create_task(manager._refresh_loop())
+    await asyncio.sleep(0.2)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_only_lease_holder_polls_github_and_followers_apply_snapshot(tmp_path):
+    async def run():
+        store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+        leader_calls, follower_calls = [], []
+        leader = _manager(store, "leader", leader_calls)
+        follower = _manager(store, "follower", follower_calls)
+
+        await _run_tick(leader)
+        await _run_tick(follower)
+
+        assert len(leader_calls) == 2 and follower_calls == []
+        assert follower.platforms["github"]["stars"] == 7
+        assert follower.platforms["github"]["followers"] == 3
+        assert follower.platforms["github"]["projects"] == [{"name": "repo", "url": "https://example.test/repo"}]
+        assert follower.platforms["github"]["influence_score"] == leader.platforms["github"]["influence_score"] > 0
+        # Той самий знімок вдруге не застосовується
+        assert not await follower.sync_from_store()
+
+    asyncio.run(run())
+
+
+def test_follower_takes_over_after_leader_releases_lease(tmp_path):
+    async def run():
+        store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+        leader_calls, follower_calls = [], []
+        leader = _manager(store, "leader", leader_calls)
+        follower = _manager(store, "follower", follower_calls)
+
+        await _run_tick(leader)
+        await leader.stop()
+        await _run_tick(follower)
+
+        assert len(follower_calls) == 2
+        assert not await store.acquire_lease(REPUTATION_LEASE, 60, owner="leader")
+
+    asyncio.run(run())
+
+
+def test_without_shared_store_every_process_refreshes():
+    async def run():
+        calls = []
+        manager = ReputationManager(http_client=_github_client(calls), refresh_interval=3600)
+        await _run_tick(manager)
+        assert len(calls) == 2 and manager.platforms["github"]["stars"] == 7
+
+    asyncio.run(run())
+
+
+def test_only_lease_holder_flushes_history(tmp_path):
+    async def run():
+        store = SQLiteSharedStore(str(tmp_path / "shared.db"))
+        path = str(tmp_path / "history.db")
+        leader = ReputationManager(history_path=path, shared_store=store)
+        follower = ReputationManager(history_path=path, shared_store=store)
+        leader.lease_owner, follower.lease_owner = "leader", "follower"
+        assert await leader._hold_lease()
+
+        follower.track_activity("reddit", "karma", 10)
+        await follower.flush_history()
+        # Позначки змін відкинуто, а файл лишився порожнім
+        assert all(not series.dirty for series in follower.history.series.values())
+        assert TimeSeriesStore(path).load() == 0
+
+        leader.track_activity("reddit", "karma", 5)
+        await leader.flush_history()
+        restored = TimeSeriesStore(path)
+        assert restored.load() > 0
+        assert restored.latest_values()[("reddit", "karma")] == 5
+
+    asyncio.run(run())
+
+
+def test_flush_snapshot_is_taken_before_the_thread_write(tmp_path, monkeypatch):
+    async def run():
+        manager = ReputationManager(history_path=str(tmp_path / "history.db"))
+        manager.track_activity("reddit", "karma", 1)
+        written = []
+
+        def write_rows(rows):
+            # У потоці доступний лише готовий знімок, а не живі ряди
+            written.append(rows)
+            return len(rows)
+
+        monkeypatch.setattr(manager.history, "write_rows", write_rows)
+        await manager.flush_history()
+        assert written and all(isinstance(row, tuple) for row in written[0])
+        assert all(not series.dirty for series in manager.history.series.values())
+
+    asyncio.run(run())
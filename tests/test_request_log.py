@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import hashlib
+import json
+import logging
+
+import pytest
+
+import request_log
+
+SECRET_MESSAGE = "мій пароль 12345"
+
+
+class _Lines(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def lines(monkeypatch):
+    handler = _Lines()
+    logger = logging.getLogger("mista.requests.test")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    monkeypatch.setattr(request_log, "_logger", logger)
+    yield handler.lines
+    logger.removeHandler(handler)
+
+
+def _serve(status, error_class=None, user_id="alice"):
+    """Один запит у власному контексті, як його веде middleware у chat_backend."""
+    def run():
+        record = request_log.start_request("/chat", "POST", "req-1")
+        request_log.annotate(user_id=user_id, message_chars=len(SECRET_MESSAGE))
+        request_log.add_tokens(10, 4)
+        request_log.record_cache("analysis", hit=True)
+        request_log.finish_request(record, status, error_class)
+    contextvars.copy_context().run(run)
+
+
+@pytest.mark.parametrize("sample_rate, kept", [(0.0, 0), (1.0, 1)])
+def test_successes_follow_the_sample_rate(monkeypatch, lines, sample_rate, kept):
+    monkeypatch.setattr(request_log, "SAMPLE_RATE", sample_rate)
+    _serve(200)
+    assert len(lines) == kept
+
+
+@pytest.mark.parametrize("sample_rate", [0.0, 1.0])
+@pytest.mark.parametrize("status, error_class", [(500, None), (429, None), (200, "TimeoutError")])
+def test_errors_are_always_kept(monkeypatch, lines, sample_rate, status, error_class):
+    monkeypatch.setattr(request_log, "SAMPLE_RATE", sample_rate)
+    _serve(status, error_class)
+    assert len(lines) == 1
+    assert lines[0]["status"] == status
+    if error_class:
+        assert lines[0]["error_class"] == error_class
+
+
+def test_line_has_salted_user_hash_and_no_message_body(monkeypatch, lines):
+    monkeypatch.setattr(request_log, "SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(request_log, "_USER_HASH_SALT", "pepper")
+    _serve(200)
+    line = lines[0]
+    assert line["request_id"] == "req-1" and line["endpoint"] == "/chat" and line["method"] == "POST"
+    assert line["user"] == hashlib.sha256(b"pepper:alice").hexdigest()[:16]
+    assert line["user"] != hashlib.sha256(b"alice").hexdigest()[:16]
+    assert line["tokens"] == {"input": 10, "output": 4}
+    assert line["cache"] == {"analysis": {"hits": 1, "misses": 0}}
+    assert line["message_chars"] == len(SECRET_MESSAGE)
+    raw = json.dumps(line, ensure_ascii=False)
+    assert SECRET_MESSAGE not in raw and "alice" not in raw
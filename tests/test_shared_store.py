@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+from shared_store import SQLiteSharedStore, create_shared_store, worker_id
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSharedStore(str(tmp_path / "shared.db"))
+
+
+def test_values_round_trip_as_json_and_expire(store, monkeypatch):
+    async def run():
+        await store.set("news", {"items": ["новина"], "count": 1})
+        await store.set("short", [1, 2], ttl=30)
+        assert await store.get("news") == {"items": ["новина"], "count": 1}
+        assert await store.get("short") == [1, 2]
+        assert await store.get("missing") is None
+        real_time = time.time
+        monkeypatch.setattr(time, "time", lambda: real_time() + 31)
+        assert await store.get("short") is None
+        assert await store.get("news") is not None
+
+    asyncio.run(run())
+
+
+def test_incr_counts_from_one(store):
+    async def run():
+        assert [await store.incr("version") for _ in range(3)] == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_second_store_on_the_same_file_sees_values(store):
+    async def run():
+        await store.set("k", "v")
+        assert await SQLiteSharedStore(store.path).get("k") == "v"
+
+    asyncio.run(run())
+
+
+def test_lease_is_exclusive_until_released_or_expired(store, monkeypatch):
+    async def run():
+        assert await store.acquire_lease("refresh", 60, owner="a")
+        assert not await store.acquire_lease("refresh", 60, owner="b")
+        # Власник продовжує свою оренду
+        assert await store.acquire_lease("refresh", 60, owner="a")
+        await store.release_lease("refresh", owner="b")  # чужа оренда не знімається
+        assert not await store.acquire_lease("refresh", 60, owner="b")
+        await store.release_lease("refresh", owner="a")
+        assert await store.acquire_lease("refresh", 60, owner="b")
+
+        real_time = time.time
+        monkeypatch.setattr(time, "time", lambda: real_time() + 61)
+        assert await store.acquire_lease("refresh", 60, owner="a")
+
+    asyncio.run(run())
+
+
+def test_lease_owner_defaults_to_worker_id(store):
+    async def run():
+        assert await store.acquire_lease("refresh", 60)
+        assert not await store.acquire_lease("refresh", 60, owner="other")
+        assert await store.acquire_lease("refresh", 60, owner=worker_id())
+
+    asyncio.run(run())
+
+
+def test_create_shared_store_parses_urls(tmp_path):
+    assert create_shared_store("") is None
+    path = str(tmp_path / "x.db")
+    store = create_shared_store("sqlite:///" + path)
+    assert isinstance(store, SQLiteSharedStore) and store.path == path
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from influence import INFLUENCE_METRIC, InfluenceModel
+from timeseries import RingBuffer, TimeSeriesStore
+
+# Малі рівні, щоб обрізання й пониження роздільності було видно на кількох точках
+TIERS = (("minute", 60, 3), ("hour", 3600, 4))
+T0 = 1_700_000_000 - 1_700_000_000 % 3600  # початок години
+
+
+def test_ring_buffer_wraps_around_and_keeps_the_newest_buckets():
+    ring = RingBuffer(60, 3)
+    for i in range(5):
+        ring.add(T0 + i * 60 + 5, float(i))
+    assert len(ring) == 3
+    assert ring.oldest_start() == T0 + 120
+    assert [sample[0] for sample in ring.range(T0, T0 + 600)] == [T0 + 120, T0 + 180, T0 + 240]
+    assert ring.get(T0) is None  # витіснений кошик
+
+
+def test_ring_buffer_aggregates_a_bucket_and_accepts_late_points():
+    ring = RingBuffer(60, 3)
+    for ts, value in ((T0, 5.0), (T0 + 10, 2.0), (T0 + 20, 7.0), (T0 + 30, 4.0)):
+        ring.add(ts, value)
+    assert ring.get(T0) == (T0, 4.0, 2.0, 7.0)
+
+    ring.add(T0 + 60, 1.0)
+    ring.add(T0 + 50, 9.0)  # запізніла точка оновлює старший кошик, а не найновіший
+    assert ring.get(T0) == (T0, 9.0, 2.0, 9.0)
+    assert ring.get(T0 + 60) == (T0 + 60, 1.0, 1.0, 1.0)
+
+    ring.add(T0 + 120, 1.0)
+    ring.add(T0 + 180, 1.0)
+    ring.add(T0 + 10, 100.0)  # кошика вже немає в буфері — точка відкидається
+    assert ring.get(T0) is None and len(ring) == 3
+
+
+def test_points_are_downsampled_into_every_tier_and_resolution_is_picked_by_coverage():
+    store = TimeSeriesStore(resolutions=TIERS)
+    for minute in range(10):
+        store.record("github", "stars", 10 + minute, T0 + minute * 60)
+
+    minute = store.query("github", "stars", T0 + 420, T0 + 600)
+    assert minute["resolution"] == "minute"
+    assert [point["value"] for point in minute["points"]] == [17, 18, 19]
+
+    # Похвилинний рівень уже не покриває початок години — береться погодинний
+    hour = store.query("github", "stars", T0, T0 + 600)
+    assert hour["resolution"] == "hour"
+    assert hour["points"] == [{"ts": T0, "value": 19, "min": 10, "max": 19}]
+
+    with pytest.raises(ValueError):
+        store.query("github", "stars", T0, resolution="week")
+    assert store.query("github", "missing", T0)["points"] == []
+
+
+def test_range_query_aligns_start_to_the_bucket_and_includes_end():
+    store = TimeSeriesStore(resolutions=TIERS)
+    for minute in range(3):
+        store.record("reddit", "karma", minute, T0 + minute * 60)
+    points = store.query("reddit", "karma", T0 + 30, T0 + 60, resolution="minute")["points"]
+    assert [point["ts"] for point in points] == [T0, T0 + 60]
+
+
+def test_flush_and_reload_round_trip_with_current_timestamps(tmp_path):
+    path = str(tmp_path / "history.db")
+    now = time.time()
+    store = TimeSeriesStore(path)
+    store.record("github", "stars", 3, now - 2 * 86400)  # старше за добу похвилинної історії
+    store.record("github", "stars", 5, now - 120)
+    store.record("github", "stars", 8, now)
+    assert store.flush() > 0
+    assert store.flush() == 0  # позначки змін скинуто
+
+    restored = TimeSeriesStore(path)
+    assert restored.load() > 0
+    assert restored.latest_values() == {("github", "stars"): 8}
+    for resolution in ("hour", "day"):
+        expected = store.query("github", "stars", now - 3 * 86400, now, resolution)
+        assert restored.query("github", "stars", now - 3 * 86400, now, resolution) == expected
+    # Похвилинний кошик дводенної давнини видалено з файлу при записі
+    minutes = restored.query("github", "stars", now - 3 * 86400, now, "minute")["points"]
+    assert [point["value"] for point in minutes][-2:] == [5, 8]
+    assert all(point["ts"] > now - 86400 for point in minutes)
+
+
+def test_history_is_recomputed_after_a_weight_change():
+    model = InfluenceModel({"github": ["stars", "followers"]}, {"github": {"stars": 10, "followers": 2}})
+    history = TimeSeriesStore(resolutions=TIERS)
+    for minute, (stars, followers) in enumerate([(1, 5), (2, 5), (4, 6)]):
+        ts = T0 + minute * 60
+        history.record("github", "stars", stars, ts)
+        history.record("github", "followers", followers, ts)
+        history.record("github", INFLUENCE_METRIC, stars * 10 + followers * 2, ts)
+    history.collect_dirty()
+
+    model.set_weights({"github": {"stars": 1, "followers": 3}})
+    assert model.recompute_history(history) == 3 + 1
+
+    points = history.query("github", INFLUENCE_METRIC, T0, T0 + 180, "minute")["points"]
+    assert [point["value"] for point in points] == [1 + 15, 2 + 15, 4 + 18]
+    hour = history.query("github", INFLUENCE_METRIC, T0, T0 + 180, "hour")["points"][0]
+    assert (hour["value"], hour["min"], hour["max"]) == (22, 1 + 15, 4 + 18)
+    # Перераховані кошики позначені для наступного скидання
+    assert len(history.collect_dirty()) == 4
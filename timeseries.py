@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+import logging
+import sqlite3
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (назва, ширина кошика в секундах, кількість кошиків у пам'яті)
+DEFAULT_RESOLUTIONS: Tuple[Tuple[str, int, int], ...] = (
+    ("minute", 60, 1440),    # доба похвилинно
+    ("hour", 3600, 24 * 30), # 30 днів погодинно
+    ("day", 86400, 365 * 2), # 2 роки поденно
+)
+
+Sample = Tuple[float, float, float, float]  # (bucket_start, last, min, max)
+Row = Tuple[str, str, str, float, float, float, float]  # (platform, metric, resolution, bucket_start, value, min, max)
+
+
+class RingBuffer:
+    """
+    Кільцевий буфер агрегованих кошиків фіксованої ширини на масивах array('d'):
+    пам'ять обмежена capacity і не росте з часом.
+    """
+    __slots__ = ("width", "capacity", "starts", "last", "low", "high", "_head", "_size")
+
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.capacity = capacity
+        self.starts = array("d", bytes(8 * capacity))
+        self.last = array("d", bytes(8 * capacity))
+        self.low = array("d", bytes(8 * capacity))
+        self.high = array("d", bytes(8 * capacity))
+        self._head = -1  # індекс найновішого кошика
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, ts: float, value: float) -> float:
+        """Додає точку в її кошик (новий або поточний); повертає початок кошика."""
+        start = ts - ts % self.width
+        head = self._head
+        if self._size and self.starts[head] == start:
+            self.last[head] = value
+            if value < self.low[head]:
+                self.low[head] = value
+            if value > self.high[head]:
+                self.high[head] = value
+            return start
+        if self._size and start < self.starts[head]:
+            # Точки зі старшим часом, ніж найновіший кошик, оновлюють відповідний кошик, якщо він ще є
+            index = self._find(start)
+            if index is not None:
+                self.last[index] = value
+                self.low[index] = min(self.low[index], value)
+                self.high[index] = max(self.high[index], value)
+            return start
+        head = (head + 1) % self.capacity
+        self.starts[head] = start
+        self.last[head] = self.low[head] = self.high[head] = value
+        self._head = head
+        self._size = min(self._size + 1, self.capacity)
+        return start
+
+    def _find(self, start: float) -> Optional[int]:
+        for offset in range(self._size):
+            index = (self._head - offset) % self.capacity
+            if self.starts[index] == start:
+                return index
+            if self.starts[index] < start:
+                return None
+        return None
+
+    def get(self, start: float) -> Optional[Sample]:
+        index = self._find(start)
+        if index is None:
+            return None
+        return self.starts[index], self.last[index], self.low[index], self.high[index]
+
+    def oldest_start(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return self.starts[(self._head - self._size + 1) % self.capacity]
+
+    def positions(self) -> List[int]:
+        """Індекси зайнятих кошиків у масивах у хронологічному порядку."""
+        return [(self._head - offset) % self.capacity for offset in range(self._size - 1, -1, -1)]
+
+    def range(self, start: float, end: float) -> List[Sample]:
+        """Кошики з початком у [start, end] у хронологічному порядку."""
+        samples = []
+        for index in self.positions():
+            bucket = self.starts[index]
+            if start <= bucket <= end:
+                samples.append((bucket, self.last[index], self.low[index], self.high[index]))
+        return samples
+
+
+class MetricSeries:
+    """Одна метрика у кількох роздільностях: кожна точка одразу агрегується в усі рівні."""
+
+    def __init__(self, resolutions: Iterable[Tuple[str, int, int]] = DEFAULT_RESOLUTIONS):
+        self.tiers: Dict[str, RingBuffer] = {name: RingBuffer(width, capacity) for name, width, capacity in resolutions}
+        self.dirty: Set[Tuple[str, float]] = set()
+        self.first_ts: Optional[float] = None
+
+    def add(self, ts: float, value: float):
+        if self.first_ts is None or ts < self.first_ts:
+            self.first_ts = ts
+        for name, ring in self.tiers.items():
+            self.dirty.add((name, ring.add(ts, value)))
+
+    def latest(self) -> Optional[float]:
+        # Після відновлення з файлу дрібні кошики можуть бути вже обрізані — беремо найсвіжіший рівень
+        newest = None
+        for ring in self.tiers.values():
+            if len(ring) and (newest is None or ring.starts[ring._head] > newest.starts[newest._head]):
+                newest = ring
+        return newest.last[newest._head] if newest is not None else None
+
+    def pick_resolution(self, start: float) -> str:
+        """Найдрібніша роздільність, чия історія в пам'яті ще покриває start."""
+        if self.first_ts is not None:
+            start = max(start, self.first_ts)  # Раніше за першу точку даних немає в жодній роздільності
+        for name, ring in self.tiers.items():
+            oldest = ring.oldest_start()
+            if oldest is not None and oldest <= start:
+                return name
+        return list(self.tiers)[-1]
+
+    def range(self, start: float, end: float, resolution: Optional[str] = None) -> Tuple[str, List[Sample]]:
+        resolution = resolution or self.pick_resolution(start)
+        ring = self.tiers[resolution]
+        return resolution, ring.range(start - start % ring.width, end)
+
+
+class TimeSeriesStore:
+    """
+    Часові ряди метрик (платформа, метрика) у пам'яті з періодичним скиданням
+    змінених кошиків у SQLite і відновленням після перезапуску.
+    """
+
+    def __init__(self, path: Optional[str] = None, resolutions: Iterable[Tuple[str, int, int]] = DEFAULT_RESOLUTIONS):
+        self.path = path
+        self.resolutions = tuple(resolutions)
+        self.series: Dict[Tuple[str, str], MetricSeries] = {}
+
+    def _series(self, platform: str, metric: str) -> MetricSeries:
+        key = (platform, metric)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = MetricSeries(self.resolutions)
+        return series
+
+    def record(self, platform: str, metric: str, value: float, ts: Optional[float] = None):
+        self._series(platform, metric).add(time.time() if ts is None else ts, float(value))
+
+    def query(self, platform: str, metric: str, start: float, end: Optional[float] = None,
+              resolution: Optional[str] = None) -> Dict[str, object]:
+        series = self.series.get((platform, metric))
+        end = time.time() if end is None else end
+        if series is None:
+            return {"resolution": resolution, "points": []}
+        if resolution is not None and resolution not in series.tiers:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {list(series.tiers)}")
+        resolution, samples = series.range(start, end, resolution)
+        return {
+            "resolution": resolution,
+            "points": [{"ts": bucket, "value": last, "min": low, "max": high} for bucket, last, low, high in samples],
+        }
+
+    def latest_values(self) -> Dict[Tuple[str, str], float]:
+        return {key: series.latest() for key, series in self.series.items() if series.latest() is not None}
+
+    # --- SQLite ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS metric_samples ("
+            "platform TEXT NOT NULL, metric TEXT NOT NULL, resolution TEXT NOT NULL, bucket_start REAL NOT NULL, "
+            "value REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL, "
+            "PRIMARY KEY (platform, metric, resolution, bucket_start))"
+        )
+        return conn
+
+    def collect_dirty(self) -> List[Row]:
+        """
+        Знімок змінених з минулого скидання кошиків; скидає позначки змін.
+        Неблокуюче — викликати в тому ж потоці, що й record() (цикл подій), щоб ряди не змінювались під час обходу.
+        """
+        rows = []
+        for (platform, metric), series in self.series.items():
+            dirty, series.dirty = series.dirty, set()
+            for resolution, bucket in dirty:
+                sample = series.tiers[resolution].get(bucket)
+                if sample is not None:
+                    rows.append((platform, metric, resolution, bucket, sample[1], sample[2], sample[3]))
+        return rows
+
+    def write_rows(self, rows: List[Row]) -> int:
+        """Записує знімок collect_dirty() у файл; блокуюче — викликати з потоку."""
+        if not self.path or not rows:
+            return 0
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO metric_samples (platform, metric, resolution, bucket_start, value, min, max) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (platform, metric, resolution, bucket_start) "
+                    "DO UPDATE SET value = excluded.value, min = excluded.min, max = excluded.max",
+                    rows,
+                )
+                # Файл тримає ту ж глибину історії, що й пам'ять
+                now = time.time()
+                for name, width, capacity in self.resolutions:
+                    conn.execute("DELETE FROM metric_samples WHERE resolution = ? AND bucket_start < ?", (name, now - width * capacity))
+        finally:
+            conn.close()
+        return len(rows)
+
+    def flush(self) -> int:
+        """Синхронне скидання змінених кошиків (collect_dirty + write_rows) для однопотокового коду."""
+        if not self.path:
+            return 0
+        return self.write_rows(self.collect_dirty())
+
+    def load(self) -> int:
+        """Відновлює кільцеві буфери з файлу; блокуюче — викликати з потоку."""
+        if not self.path:
+            return 0
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT platform, metric, resolution, bucket_start, value, min, max FROM metric_samples ORDER BY bucket_start"
+            ).fetchall()
+        finally:
+            conn.close()
+        for platform, metric, resolution, bucket, value, low, high in rows:
+            series = self._series(platform, metric)
+            ring = series.tiers.get(resolution)
+            if ring is None:
+                continue
+            ring.add(bucket, low)
+            ring.add(bucket, high)
+            ring.add(bucket, value)
+            if series.first_ts is None or bucket < series.first_ts:
+                series.first_ts = bucket
+        return len(rows)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core_persona import get_critical_forbidden_phrases
+from mista_lore import normalize_text_for_comparison
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseValidator:
+    """
+    Перевіряє готову відповідь Місти перед збереженням: вона не порожня, не містить
+    критично заборонених фраз персони (core_persona) і не повторює дослівно попередню відповідь.
+    Історія — повідомлення у форматі {"role", "content"}, як у LLMInteraction.
+    """
+
+    def __init__(self, forbidden_phrases: Optional[Iterable[str]] = None):
+        phrases = get_critical_forbidden_phrases() if forbidden_phrases is None else forbidden_phrases
+        self.forbidden_phrases: List[Tuple[str, str]] = [
+            (phrase, normalize_text_for_comparison(phrase)) for phrase in phrases if phrase and phrase.strip()
+        ]
+
+    def validate_response(self, response: str, history: List[Dict[str, Any]], analysis_results: Dict[str, Any]) -> Tuple[bool, str]:
+        """Повертає (чи відповідь прийнятна, причина відмови або "ok")."""
+        if not response or not response.strip():
+            return False, "empty_response"
+        normalized = normalize_text_for_comparison(response)
+        padded = f" {normalized} "  # Фраза має збігтися цілими словами, а не шматком слова
+        for phrase, normalized_phrase in self.forbidden_phrases:
+            if normalized_phrase and f" {normalized_phrase} " in padded:
+                return False, f"forbidden_phrase: {phrase}"
+        previous = next((message.get("content") for message in reversed(history or [])
+                         if message.get("role") in ("assistant", "model")), None)
+        if previous and normalize_text_for_comparison(previous) == normalized:
+            return False, "repeated_previous_response"
+        return True, "ok"